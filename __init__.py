@@ -133,6 +133,9 @@ class ZImagePowerNodesExtension(ComfyExtension):
         from .nodes.zsampler_turbo_2_advanced import ZSamplerTurbo2Advanced
         _register_node( ZSamplerTurbo2Advanced, nodes, subcategory )
 
+        from .nodes.zsampler_turbo_2_variations import ZSamplerTurbo2Variations
+        _register_node( ZSamplerTurbo2Variations, nodes, subcategory )
+
         from .nodes.style_prompt_encoder_2 import StylePromptEncoder2
         _register_node( StylePromptEncoder2, nodes, subcategory )
 
@@ -0,0 +1,82 @@
+"""
+File    : cancellation.py
+Purpose : Cooperative cancellation of the generations of the Z-Sampler Turbo nodes.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import threading
+import comfy.model_management
+from typing import Any
+
+
+class GenerationCancelled(Exception):
+    """
+    Raised when a generation is cancelled through a `CancellationToken`.
+
+    Attributes:
+        latent: ComfyUI LATENT with the draft resulting from the last completed stage,
+                or None if no stage ended with a noise-free latent before the cancellation.
+        stage : The stage the draft comes from (0 when there is no draft).
+    """
+    def __init__(self, message: str = "generation cancelled", *, latent: dict[str, Any] | None = None, stage: int = 0):
+        super().__init__(message)
+        self.latent = latent
+        self.stage  = stage
+
+
+class CancellationToken:
+    """
+    Token used to cancel a generation cooperatively.
+
+    The generation polls the token between its sampling calls and raises
+    `GenerationCancelled` once the token is cancelled; `cancel()` can be called
+    from any thread (e.g. by a headless caller enforcing a deadline).
+
+    Args:
+        follow_interrupts: If `True` (default), an interrupt requested in ComfyUI (the
+                           cancel button) also cancels the token. The interrupt is then
+                           consumed by the token, so the workflow is not stopped when the
+                           generation returns its draft.
+    """
+    def __init__(self, *, follow_interrupts: bool = True):
+        self.follow_interrupts = follow_interrupts
+        self.interrupted       = False  #< True if the token was cancelled by a ComfyUI interrupt
+        self._event = threading.Event()
+
+
+    def cancel(self) -> None:
+        """Cancels the generation using this token."""
+        self._event.set()
+
+
+    @property
+    def is_cancelled(self) -> bool:
+        """True once the token was cancelled (reading it has no side effects, see `poll()`)."""
+        return self._event.is_set()
+
+
+    def poll(self) -> bool:
+        """
+        Returns whether the token is cancelled, checking ComfyUI's interrupt first.
+
+        When the token follows interrupts and one was requested, the interrupt
+        is consumed and the token is cancelled. This is the call made by the
+        generation between its sampling calls.
+        """
+        if self.follow_interrupts and not self._event.is_set() and comfy.model_management.processing_interrupted():
+            comfy.model_management.interrupt_current_processing(False)
+            self.interrupted = True
+            self._event.set()
+        return self._event.is_set()
+
+
+    def raise_if_cancelled(self) -> None:
+        """Raises `GenerationCancelled` if the token was cancelled (polling ComfyUI's interrupt)."""
+        if self.poll():
+            raise GenerationCancelled()
@@ -175,6 +175,103 @@ def normalize_images(images: torch.Tensor,
     return images
 
 
+
+def parse_seed_list(text: str, /,*, max_seeds: int = 4096) -> list[int]:
+    """
+    Parses a list of seeds written as comma-separated values and ranges.
+
+    Values can also be separated by semicolons or spaces, and ranges are
+    inclusive, written with a dash or two dots, e.g. "1, 5, 9-12" or "100..103".
+
+    Args:
+        text           (str): The text containing the list of seeds.
+        max_seeds (optional): The maximum number of seeds allowed. Defaults to 4096.
+    Returns:
+        A list with the seeds in the same order they were written,
+        or an empty list if the text does not contain any seed.
+    Raises:
+        ValueError: If the text contains an invalid value or too many seeds.
+    """
+    seeds: list[int] = []
+    for item in re.split(r"[,;\s]+", text.strip()):
+        if not item:
+            continue
+        match = re.fullmatch(r"(\d+)(?:(?:-|\.\.)(\d+))?", item)
+        if not match:
+            raise ValueError(f"Invalid seed '{item}' in seed list '{text}'")
+        first = int(match.group(1))
+        last  = int(match.group(2)) if match.group(2) is not None else first
+        step  = 1 if last >= first else -1
+        if len(seeds) + abs(last-first) + 1 > max_seeds:
+            raise ValueError(f"Seed list '{text}' contains more than {max_seeds} seeds")
+        seeds.extend( range(first, last+step, step) )
+    return seeds
+
+
+def resolve_seed(seed: int, seed_list: str | None, /) -> int | list[int]:
+    """
+    Resolves the seed of a sampler node that also has a "seed list" input.
+
+    A non-empty seed list replaces the seed and fills the batch with one image per seed.
+    Args:
+        seed      (int): The seed of the node.
+        seed_list (str): The text of the seed list input, may be empty or None.
+    Returns:
+        The list of seeds parsed from `seed_list`, or `seed` when the list is empty.
+    Raises:
+        ValueError: If the seed list contains an invalid value or too many seeds.
+    """
+    return parse_seed_list(seed_list or "") or seed
+
+
+def mask_crop_box(mask: torch.Tensor,
+                  /,*,
+                  margin  : int = 0,
+                  min_size: int = 0,
+                  align   : int = 1,
+                  ) -> tuple[int, int, int, int] | None:
+    """
+    Calculates the region of an image that contains all the masked pixels.
+
+    The bounding box of the pixels with a mask value greater than zero is expanded
+    by `margin` pixels of context, grown around its center up to `min_size`, and
+    aligned to multiples of `align`, always staying within the image.
+
+    Args:
+        mask       (Tensor): The mask, the last two dimensions are its height and width;
+                             all the masks of a batch are combined.
+        margin   (optional): Pixels of context added around the masked pixels. Defaults to 0.
+        min_size (optional): Minimum height/width of the region. Defaults to 0.
+        align    (optional): Alignment of the position and size of the region. Defaults to 1.
+    Returns:
+        A tuple (top, left, bottom, right) with the region, or None if the mask is empty.
+    """
+    height, width = int(mask.shape[-2]), int(mask.shape[-1])
+    masked = (mask > 0).reshape(-1, height, width).any(dim=0)
+    rows   = torch.nonzero( masked.any(dim=1) ).flatten()
+    cols   = torch.nonzero( masked.any(dim=0) ).flatten()
+    if rows.numel() == 0:
+        return None
+    top , bottom = _expand_span(int(rows[0]), int(rows[-1])+1, height, margin, min_size, align)
+    left, right  = _expand_span(int(cols[0]), int(cols[-1])+1, width , margin, min_size, align)
+    return top, left, bottom, right
+
+
+def _expand_span(start: int, end: int, size: int, margin: int, min_size: int, align: int) -> tuple[int, int]:
+    """Expands the span [start, end) as described in `mask_crop_box(..)`."""
+    start, end = start - margin, end + margin
+    if end - start < min_size:
+        extra = min_size - (end - start)
+        start, end = start - extra//2, end + (extra - extra//2)
+    if start < 0:
+        start, end = 0, end - start
+    if end > size:
+        start, end = max(0, start - (end - size)), size
+    start = start // align * align
+    end   = min(size, -(-end // align) * align)
+    return start, end
+
+
 @cache
 def get_project_root() -> Path:
     return Path(__file__).parent.parent.parent.absolute()
@@ -0,0 +1,118 @@
+"""
+File    : helpers_conditioning.py
+Purpose : Helper functions to stack and slice batched ComfyUI conditionings.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+
+  A "stacked" conditioning is a regular ComfyUI conditioning whose tensor
+  has one row per image of the batch, e.g. [[tensor(B, L, D), {...}]].
+  ComfyUI pairs each row with the latent image at the same position, so
+  several prompts can be denoised together in a single sampler call.
+
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import torch
+import torch.nn.functional as F
+from typing import Any, TypeAlias
+ComfyConditioning: TypeAlias = list[ tuple[torch.Tensor,dict] ]
+
+
+def stack_conditionings(conditionings: list[ComfyConditioning]) -> ComfyConditioning:
+    """
+    Stacks several single-prompt conditionings into one conditioning with a row per prompt.
+
+    The sequences of the prompts are padded with zeros up to the longest one, and an
+    `attention_mask` marking the real tokens of each row is attached to the options
+    (the same key used by ComfyUI's text encoders for Lumina2/Z-Image models).
+    Other tensors in the options with one row per prompt (e.g. `pooled_output`) are
+    stacked as well; any other option is taken from the first conditioning.
+
+    Args:
+        conditionings: The conditionings to stack, each one must contain a single
+                       entry with a tensor of shape (1, tokens, features).
+    Returns:
+        A ComfyUI conditioning containing a single entry with a tensor of shape
+        (num_prompts, max_tokens, features).
+    Raises:
+        ValueError: If a conditioning has several entries or incompatible shapes.
+    """
+    if not conditionings:
+        raise ValueError("At least one conditioning is required to build a stacked conditioning")
+    if len(conditionings) == 1:
+        return conditionings[0]
+
+    entries = []
+    for conditioning in conditionings:
+        if len(conditioning) != 1:
+            raise ValueError("Only conditionings with a single entry can be stacked (scheduled or combined conditionings are not supported)")
+        tensor, options = conditioning[0]
+        if tensor.ndim != 3 or tensor.shape[0] != 1:
+            raise ValueError(f"Expected a conditioning tensor of shape (1, tokens, features), got {tuple(tensor.shape)}")
+        entries.append( (tensor, options) )
+
+    features = entries[0][0].shape[-1]
+    if any( tensor.shape[-1] != features for tensor, _ in entries ):
+        raise ValueError("All the stacked conditionings must have the same number of features")
+
+    # pad every sequence up to the longest one, masking the padding tokens
+    max_tokens = max( tensor.shape[1] for tensor, _ in entries )
+    tensors    = []
+    masks      = []
+    for tensor, options in entries:
+        num_tokens = tensor.shape[1]
+        mask       = options.get("attention_mask")
+        mask       = mask.reshape(1, -1) if isinstance(mask, torch.Tensor) else \
+                     torch.ones((1, num_tokens), dtype=torch.long, device=tensor.device)
+        tensors.append( F.pad(tensor, (0, 0, 0, max_tokens - num_tokens)) )
+        masks.append  ( F.pad(mask  , (0, max_tokens - mask.shape[1])) )
+
+    stacked_options: dict[str, Any] = dict(entries[0][1])
+    for key, value in entries[0][1].items():
+        if key == "attention_mask" or not isinstance(value, torch.Tensor) or value.shape[0] != 1:
+            continue
+        values = [ options.get(key) for _, options in entries ]
+        if all( isinstance(v, torch.Tensor) and v.shape == value.shape for v in values ):
+            stacked_options[key] = torch.cat(values)
+
+    has_padding = any( tensor.shape[1] != max_tokens for tensor, _ in entries )
+    if has_padding or "attention_mask" in stacked_options:
+        stacked_options["attention_mask"] = torch.cat( [mask.to(masks[0].device) for mask in masks] )
+    return [ [torch.cat(tensors), stacked_options] ]
+
+
+def conditioning_batch_size(conditioning: ComfyConditioning | None) -> int:
+    """Returns the number of rows of a conditioning (1 for regular conditionings and `None`)."""
+    if not conditioning:
+        return 1
+    return max( tensor.shape[0] for tensor, _ in conditioning )
+
+
+def select_conditioning_rows(conditioning: ComfyConditioning | None,
+                             rows        : list[int],
+                             batch_size  : int,
+                             ) -> ComfyConditioning | None:
+    """
+    Returns the conditioning containing only the given rows of a batch.
+
+    Only the entries with one row per image of the batch (`batch_size` rows)
+    are sliced, along with the tensors of their options that also have one row
+    per image; a regular conditioning is shared by all images and is returned as is.
+    """
+    if conditioning_batch_size(conditioning) != batch_size or batch_size == 1:
+        return conditioning
+    selected = []
+    for tensor, options in conditioning:
+        if tensor.shape[0] == batch_size:
+            index   = torch.tensor(rows, device=tensor.device)
+            tensor  = tensor[index]
+            options = { key: value[ index.to(value.device) ]
+                             if isinstance(value, torch.Tensor) and value.ndim > 0 and value.shape[0] == batch_size else value
+                        for key, value in options.items() }
+        selected.append( [tensor, options] )
+    return selected
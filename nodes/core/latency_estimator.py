@@ -0,0 +1,104 @@
+"""
+File    : latency_estimator.py
+Purpose : Running in-memory estimate of the time taken by each model evaluation.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import threading
+from collections import OrderedDict
+from typing      import Callable, Hashable
+
+
+class LatencyEstimator:
+    """
+    Keeps a running estimate of the seconds taken by each model evaluation.
+
+    The estimates are stored per model and latent size (batch, height, width)
+    as an exponential moving average of the measured generations. A size that
+    was never measured is estimated from the closest measured size of the same
+    model, scaled by the ratio of latent pixels.
+
+    Args:
+        smoothing  : Weight of each new measurement in the moving average (0.0 - 1.0].
+        max_entries: Maximum number of sizes remembered (the least recently used are dropped).
+    """
+    def __init__(self, *, smoothing: float = 0.5, max_entries: int = 256):
+        self.smoothing   = smoothing
+        self.max_entries = max_entries
+        self._estimates: OrderedDict[tuple[Hashable, tuple[int,int,int]], float] = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def estimate(self, model_key: Hashable, size: tuple[int, int, int]) -> float | None:
+        """
+        Returns the estimated seconds per model evaluation for the given model and latent size,
+        or None if the model was never measured.
+        """
+        with self._lock:
+            seconds = self._estimates.get( (model_key, size) )
+            if seconds is not None:
+                return seconds
+            measured = [ (other_size, seconds) for (key, other_size), seconds in self._estimates.items()
+                         if key == model_key ]
+        if not measured:
+            return None
+        pixels = _num_pixels(size)
+        other_size, seconds = min(measured, key=lambda item: abs(_num_pixels(item[0]) - pixels))
+        return seconds * pixels / _num_pixels(other_size)
+
+
+    def update(self, model_key: Hashable, size: tuple[int, int, int], seconds: float, evaluations: int) -> float:
+        """
+        Adds the measurement of a generation that took `seconds` for `evaluations` model evaluations.
+        Returns the updated estimate of seconds per model evaluation.
+        """
+        measured = seconds / max(evaluations, 1)
+        with self._lock:
+            key      = (model_key, size)
+            previous = self._estimates.pop(key, None)
+            estimate = measured if previous is None else previous + self.smoothing * (measured - previous)
+            self._estimates[key] = estimate
+            while self.max_entries > 0 and len(self._estimates) > self.max_entries:
+                self._estimates.popitem(last=False)
+        return estimate
+
+
+    def clear(self) -> None:
+        """Forgets all the measurements."""
+        with self._lock:
+            self._estimates.clear()
+
+
+def steps_for_time_budget(budget     : float,
+                          latency    : float,
+                          evaluations: Callable[[int], int],
+                          *,
+                          min_steps  : int = 3,
+                          max_steps  : int = 20,
+                          ) -> int:
+    """
+    Returns the largest number of steps whose model evaluations fit within a time budget.
+
+    Args:
+        budget     : The time budget in seconds.
+        latency    : The estimated seconds per model evaluation.
+        evaluations: Function returning the number of model evaluations for a number of steps.
+        min_steps  : The minimum number of steps, returned even if it does not fit. Defaults to 3.
+        max_steps  : The maximum number of steps. Defaults to 20.
+    """
+    steps = min_steps
+    for candidate in range(min_steps, max_steps+1):
+        if evaluations(candidate) * latency <= budget:
+            steps = candidate
+    return steps
+
+
+def _num_pixels(size: tuple[int, int, int]) -> int:
+    batch, height, width = size
+    return max(batch * height * width, 1)
@@ -0,0 +1,236 @@
+"""
+File    : metrics.py
+Purpose : Small in-process registry of metrics exposed in the Prometheus text format.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+
+  The metrics of the project are defined at the end of this file and served
+  by the "/zi_power/metrics" route. Each metric has its own lock, held only
+  for the few additions of an update, so the code being measured is never
+  blocked by the rendering of the metrics or by other metrics.
+
+  Prometheus text format:
+  - https://prometheus.io/docs/instrumenting/exposition_formats/#text-based-format
+
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import math
+import bisect
+import threading
+
+# content type of the Prometheus text format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Counter:
+    """
+    Metric that only goes up (e.g. the number of generations).
+
+    Args:
+        name      : The name of the metric, by convention ending in "_total".
+        help      : A short description of the metric.
+        labelnames: The names of the labels that split the metric, if any.
+    """
+    TYPE = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name       = name
+        self.help       = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Increments the counter of the given label values by `amount`."""
+        key = _label_values(self, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        """Returns the current samples of the metric as (name, labels, value) tuples."""
+        with self._lock:
+            values = list(self._values.items())
+        return [ (self.name, dict(zip(self.labelnames, key)), value) for key, value in values ]
+
+
+class Histogram:
+    """
+    Metric that counts observed values in buckets (e.g. the seconds taken by each stage).
+
+    Args:
+        name      : The name of the metric.
+        help      : A short description of the metric.
+        buckets   : The upper bounds of the buckets, in increasing order ("+Inf" is always added).
+        labelnames: The names of the labels that split the metric, if any.
+    """
+    TYPE = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...], labelnames: tuple[str, ...] = ()):
+        self.name       = name
+        self.help       = help
+        self.buckets    = tuple( sorted(float(bound) for bound in buckets if not math.isinf(bound)) )
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], list[float]] = {}  #< [count per bucket..., count in +Inf, sum]
+        self._lock = threading.Lock()
+
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Adds an observed value to the histogram of the given label values."""
+        key   = _label_values(self, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(self.buckets) + 2)
+            values[index] += 1
+            values[-1]    += value
+
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        """Returns the current samples of the metric as (name, labels, value) tuples."""
+        with self._lock:
+            values = [ (key, list(v)) for key, v in self._values.items() ]
+        samples = []
+        for key, v in values:
+            labels, cumulative = dict(zip(self.labelnames, key)), 0
+            for bound, count in zip( (*self.buckets, math.inf), v[:-1] ):
+                cumulative += count
+                samples.append( (f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative) )
+            samples.append( (f"{self.name}_sum"  , labels, v[-1]     ) )
+            samples.append( (f"{self.name}_count", labels, cumulative) )
+        return samples
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._lock = threading.Lock()
+
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        """Creates and registers a new `Counter`."""
+        return self._register( Counter(name, help, labelnames) )
+
+
+    def histogram(self, name: str, help: str, buckets: tuple[float, ...], labelnames: tuple[str, ...] = ()) -> Histogram:
+        """Creates and registers a new `Histogram`."""
+        return self._register( Histogram(name, help, buckets, labelnames) )
+
+
+    def render(self) -> str:
+        """Returns all the registered metrics in the Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.help, quotes=False)}")
+            lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    label_text = ",".join( f'{label}="{_escape(text)}"' for label, text in labels.items() )
+                    lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+
+#============================= HELPER FUNCTIONS ============================#
+
+def _label_values(metric: Counter | Histogram, labels: dict[str, str]) -> tuple[str, ...]:
+    """Returns the values of the labels of a metric in the order of its label names."""
+    if len(labels) != len(metric.labelnames):
+        raise ValueError(f"Metric '{metric.name}' expects the labels {metric.labelnames}, got {tuple(labels)}")
+    return tuple( str(labels[name]) for name in metric.labelnames )
+
+
+def _escape(text: str, quotes: bool = True) -> str:
+    """Escapes a label value (or a help text when `quotes` is False) for the Prometheus text format."""
+    text = text.replace("\\", "\\\\").replace("\n", "\\n")
+    return text.replace('"', '\\"') if quotes else text
+
+
+def _format_value(value: float) -> str:
+    """Formats a sample value (or a bucket bound) for the Prometheus text format."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+#============================ PROJECT METRICS ==============================#
+
+METRICS = MetricsRegistry()
+
+SAMPLER_GENERATIONS = METRICS.counter(
+    "zi_power_sampler_generations_total",
+    "Generations run by the Z-Sampler Turbo nodes, by outcome (completed, draft, cancelled).",
+    labelnames = ("outcome",) )
+
+SAMPLER_STAGE_SECONDS = METRICS.histogram(
+    "zi_power_sampler_stage_seconds",
+    "Wall time of each section of a Z-Sampler Turbo generation (estimation, stage1, stage2, stage3, ...).",
+    buckets    = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80),
+    labelnames = ("stage",) )
+
+SAMPLER_GENERATION_SECONDS = METRICS.histogram(
+    "zi_power_sampler_generation_seconds",
+    "Wall time of the three stages of each Z-Sampler Turbo generation (or micro-batch), by whether they were "
+    "sampled within a single sampling session (on, off).",
+    buckets    = (0.5, 1, 2.5, 5, 10, 20, 40, 80, 160),
+    labelnames = ("session",) )
+
+SAMPLER_SEGMENTS = METRICS.counter(
+    "zi_power_sampler_segments_total",
+    "Denoising segments (sampling calls) run by the Z-Sampler Turbo nodes, by whether they were sampled "
+    "within a single sampling session (on, off).",
+    labelnames = ("session",) )
+
+SAMPLER_STEPS = METRICS.histogram(
+    "zi_power_sampler_steps",
+    "Number of steps requested to the Z-Sampler Turbo nodes.",
+    buckets = (3, 4, 5, 6, 7, 8, 9, 10, 12, 15, 20) )
+
+SAMPLER_BATCH_SIZE = METRICS.histogram(
+    "zi_power_sampler_batch_size",
+    "Number of images generated by each Z-Sampler Turbo generation.",
+    buckets = (1, 2, 4, 8, 16, 32, 64) )
+
+NOISE_ESTIMATIONS = METRICS.counter(
+    "zi_power_noise_estimations_total",
+    "Estimations of the initial noise bias, by result (run, cached, predicted, skipped when resuming a stage).",
+    labelnames = ("result",) )
+
+SAVE_IMAGE_BYTES = METRICS.counter(
+    "zi_power_save_image_bytes_total",
+    "Bytes of the image files written by the Save Image node.",
+    labelnames = ("type",) )
+
+SAVE_IMAGE_ENCODE_SECONDS = METRICS.histogram(
+    "zi_power_save_image_encode_seconds",
+    "Time taken to encode and write each image file by the Save Image node.",
+    buckets    = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+    labelnames = ("type",) )
+
+ROUTE_REQUESTS = METRICS.counter(
+    "zi_power_route_requests_total",
+    "Requests served by the style and palette routes, by route and HTTP status.",
+    labelnames = ("route", "status") )
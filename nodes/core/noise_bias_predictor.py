@@ -0,0 +1,226 @@
+"""
+File    : noise_bias_predictor.py
+Purpose : Lightweight regressor predicting the initial noise features without a model pass.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+
+  The estimation of the initial noise features denoises a pure noise sample
+  and measures the mean (bias) and standard deviation (scale) of each channel
+  of the result. This module predicts both values from a calibration record:
+
+    width, height : size of the noise sample in latent pixels
+    sigmas        : the sigma pair of the estimation [start, end]
+    seed          : the seed of the noise sample (informative only)
+    noise_mean    : mean of each channel of the noise sample
+    noise_std     : standard deviation of each channel of the noise sample
+    cond_mean     : mean of the positive conditioning
+    cond_std      : standard deviation of the positive conditioning
+    cond_abs_mean : mean of the absolute values of the positive conditioning
+    cond_tokens   : number of tokens of the positive conditioning
+    bias, scale   : the estimated values of each channel (only to fit/evaluate)
+
+  The seed itself is not used as a feature: its only influence on the result
+  is through the noise it generates, which is summarized by the statistics of
+  each channel of the noise sample (cheap to compute without the model).
+
+  This module depends only on NumPy, so the calibration tool in `scripts/`
+  can use it outside of ComfyUI.
+
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import json
+import math
+import hashlib
+import numpy as np
+from pathlib import Path
+from typing  import Any, Iterable
+_FORMAT  = "zi_power_noise_bias_predictor"
+_VERSION = 1
+
+# names of the features computed for each channel of a calibration record
+FEATURE_NAMES = ( "intercept", "log_pixels", "log_aspect", "sigma_start", "sigma_end",
+                  "noise_mean", "noise_std",
+                  "cond_mean", "cond_std", "cond_abs_mean", "log_cond_tokens" )
+
+# the sampler uses the ratio bias/scale clamped to this limit as initial noise bias
+EFFECTIVE_BIAS_LIMIT = 0.005
+
+
+class NoiseBiasPredictor:
+    """
+    Ridge regression from a calibration record to the bias and scale of each channel.
+
+    Each channel has its own weights, applied to the features of the record
+    standardized with the mean and deviation of the calibration data.
+
+    Args:
+        bias_weights : Weights predicting the bias, shape [channels, features].
+        scale_weights: Weights predicting the scale, shape [channels, features].
+        feature_mean : Mean of each feature in the calibration data.
+        feature_std  : Standard deviation of each feature in the calibration data.
+        info         : Additional JSON-serializable values describing the fit.
+    """
+    def __init__(self,
+                 bias_weights : np.ndarray,
+                 scale_weights: np.ndarray,
+                 feature_mean : np.ndarray,
+                 feature_std  : np.ndarray,
+                 info         : dict[str, Any] | None = None,
+                 ):
+        self.bias_weights  = np.asarray(bias_weights , dtype=np.float64)
+        self.scale_weights = np.asarray(scale_weights, dtype=np.float64)
+        self.feature_mean  = np.asarray(feature_mean , dtype=np.float64)
+        self.feature_std   = np.asarray(feature_std  , dtype=np.float64)
+        self.info          = dict(info or {})
+        self.digest        = hashlib.sha1( json.dumps(self._weights_as_dict(), sort_keys=True).encode() ).hexdigest()
+
+
+    @property
+    def num_channels(self) -> int:
+        return self.bias_weights.shape[0]
+
+
+    @classmethod
+    def fit(cls, records: Iterable[dict[str, Any]], *, alpha: float = 1.0) -> "NoiseBiasPredictor":
+        """
+        Fits the predictor to calibration records.
+
+        Args:
+            records: The calibration records, each one with its estimated `bias` and `scale`.
+            alpha  : Strength of the ridge regularization (on the standardized features).
+        Returns:
+            The fitted `NoiseBiasPredictor`.
+        """
+        records = list(records)
+        if not records:
+            raise ValueError("At least one calibration record is required to fit the predictor")
+
+        features = np.stack([ record_features(record) for record in records ])       # [N, C, F]
+        bias     = np.stack([ np.asarray(r["bias"] , np.float64) for r in records ])  # [N, C]
+        scale    = np.stack([ np.asarray(r["scale"], np.float64) for r in records ])  # [N, C]
+
+        # the intercept is neither standardized nor regularized
+        flat         = features.reshape(-1, features.shape[-1])
+        feature_mean = flat.mean(axis=0)
+        feature_std  = flat.std (axis=0)
+        feature_mean[0], feature_std[0] = 0.0, 1.0
+        feature_std[feature_std < 1e-12] = 1.0
+        features     = (features - feature_mean) / feature_std
+        penalty      = np.full(features.shape[-1], float(alpha))
+        penalty[0]   = 0.0
+
+        bias_weights, scale_weights = [], []
+        for channel in range(features.shape[1]):
+            x = features[:, channel, :]
+            a = x.T @ x + np.diag(penalty)
+            bias_weights .append( np.linalg.lstsq(a, x.T @ bias [:, channel], rcond=None)[0] )
+            scale_weights.append( np.linalg.lstsq(a, x.T @ scale[:, channel], rcond=None)[0] )
+
+        return cls(np.stack(bias_weights), np.stack(scale_weights), feature_mean, feature_std,
+                   info = {"samples": len(records), "alpha": float(alpha)})
+
+
+    def predict(self, record: dict[str, Any]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Predicts the bias and scale of each channel for a calibration record.
+        Returns:
+            A tuple (bias, scale) with one value per channel.
+        """
+        features = (record_features(record) - self.feature_mean) / self.feature_std
+        if features.shape[0] != self.num_channels:
+            raise ValueError(f"The predictor was fitted for {self.num_channels} channels, "
+                             f"but the record has {features.shape[0]}")
+        bias  = np.einsum("cf,cf->c", features, self.bias_weights )
+        scale = np.einsum("cf,cf->c", features, self.scale_weights)
+        return bias, np.maximum(scale, 1e-6)
+
+
+    def save(self, path: str | Path) -> None:
+        """Writes the predictor to a JSON file."""
+        content = { "format": _FORMAT, "version": _VERSION, **self._weights_as_dict(), "info": self.info }
+        Path(path).write_text( json.dumps(content, indent=2) )
+
+
+    @classmethod
+    def load(cls, path: str | Path) -> "NoiseBiasPredictor":
+        """Reads a predictor from a JSON file written by `save(..)`."""
+        content = json.loads( Path(path).read_text() )
+        if content.get("format") != _FORMAT or content.get("version") != _VERSION:
+            raise ValueError(f"'{path}' is not a noise bias predictor")
+        if tuple(content["features"]) != FEATURE_NAMES:
+            raise ValueError(f"'{path}' was fitted with different features")
+        return cls(content["bias_weights"], content["scale_weights"],
+                   content["feature_mean"], content["feature_std"], content.get("info"))
+
+
+    def __repr__(self) -> str:
+        return f"NoiseBiasPredictor({self.digest})"
+
+
+    def _weights_as_dict(self) -> dict[str, Any]:
+        return { "features"     : list(FEATURE_NAMES),
+                 "feature_mean" : self.feature_mean .tolist(),
+                 "feature_std"  : self.feature_std  .tolist(),
+                 "bias_weights" : self.bias_weights .tolist(),
+                 "scale_weights": self.scale_weights.tolist() }
+
+
+
+def record_features(record: dict[str, Any]) -> np.ndarray:
+    """Returns the features of a calibration record, shape [channels, features]."""
+    width, height           = float(record["width"]), float(record["height"])
+    sigma_start, sigma_end  = ( float(sigma) for sigma in record["sigmas"] )
+    noise_mean = np.asarray(record["noise_mean"], dtype=np.float64)
+    noise_std  = np.asarray(record["noise_std" ], dtype=np.float64)
+    common     = [ 1.0, math.log(width * height), math.log(width / height), sigma_start, sigma_end ]
+    cond       = [ float(record["cond_mean"]), float(record["cond_std"]), float(record["cond_abs_mean"]),
+                   math.log( max(float(record["cond_tokens"]), 1.0) ) ]
+    channels   = noise_mean.shape[0]
+    return np.column_stack([ np.tile(common, (channels, 1)), noise_mean, noise_std, np.tile(cond, (channels, 1)) ])
+
+
+def effective_bias(bias: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """Returns the initial noise bias used by the sampler (before applying the user's bias level)."""
+    return np.clip(bias / scale, -EFFECTIVE_BIAS_LIMIT, EFFECTIVE_BIAS_LIMIT)
+
+
+def prediction_errors(predictor: NoiseBiasPredictor | None, records: Iterable[dict[str, Any]]) -> dict[str, dict[str, float]]:
+    """
+    Measures the error of a predictor against the estimated values of calibration records.
+
+    Args:
+        predictor: The predictor to evaluate, or None to evaluate a constant prediction
+                   (the mean of the records), useful as a baseline.
+        records  : The calibration records, each one with its estimated `bias` and `scale`.
+    Returns:
+        A dictionary with the mean absolute error ("mae"), root mean squared error ("rmse")
+        and maximum absolute error ("max") of the "bias", the "scale" and the "effective"
+        bias used by the sampler.
+    """
+    records    = list(records)
+    true_bias  = np.stack([ np.asarray(r["bias"] , np.float64) for r in records ])
+    true_scale = np.stack([ np.asarray(r["scale"], np.float64) for r in records ])
+    if predictor is None:
+        pred_bias  = np.broadcast_to(true_bias .mean(axis=0), true_bias .shape)
+        pred_scale = np.broadcast_to(true_scale.mean(axis=0), true_scale.shape)
+    else:
+        predictions = [ predictor.predict(record) for record in records ]
+        pred_bias   = np.stack([ bias  for bias, _  in predictions ])
+        pred_scale  = np.stack([ scale for _, scale in predictions ])
+
+    errors = {}
+    for name, predicted, expected in ( ("bias"     , pred_bias , true_bias ),
+                                       ("scale"    , pred_scale, true_scale),
+                                       ("effective", effective_bias(pred_bias, pred_scale),
+                                                     effective_bias(true_bias, true_scale)) ):
+        difference = np.abs(predicted - expected)
+        errors[name] = { "mae" : float(difference.mean()),
+                         "rmse": float(np.sqrt((difference ** 2).mean())),
+                         "max" : float(difference.max()) }
+    return errors
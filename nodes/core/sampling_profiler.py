@@ -0,0 +1,109 @@
+"""
+File    : sampling_profiler.py
+Purpose : Per-stage timing and model-evaluation accounting of the Z-Sampler Turbo process.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import time
+import torch
+from typing import Any
+
+# key of the output LATENT dict where the records of a profiled generation are attached
+PROFILE_LATENT_KEY = "zi_power_profile"
+
+
+class SamplingProfiler:
+    """
+    Records where the time of a generation goes.
+
+    Each section of the generation (the noise estimation, each stage and its
+    pre-processing) is recorded between `start(..)` and `stop(..)` with its wall
+    time, the number of model evaluations counted while it was running, and the
+    shape and dtype of its resulting latent. Sections should not overlap (if they
+    are nested, the model evaluations are counted only in the innermost one).
+    When the profiler is disabled every method returns immediately, so the
+    instrumented code runs at full speed.
+
+    Args:
+        enabled : If `False`, nothing is recorded. Defaults to `True`.
+        detailed: If `False`, the sections are recorded without waiting for the GPU at their
+                  boundaries (cheap enough to always run, e.g. to feed the metrics), so the
+                  wall time of a section may include GPU work queued by the previous one.
+                  Defaults to `True`.
+    """
+    def __init__(self, *, enabled: bool = True, detailed: bool = True):
+        self.enabled     = enabled
+        self.detailed    = detailed
+        self.micro_batch = 0     #< index of the micro-batch added to the records
+        self.records     : list[dict[str, Any]] = []
+        self._open       : list[dict[str, Any]] = []
+
+
+    def start(self, name: str) -> None:
+        """Starts recording a section of the generation."""
+        if not self.enabled:
+            return
+        if self.detailed:
+            _synchronize()
+        self._open.append({ "name"       : name,
+                            "micro_batch": self.micro_batch,
+                            "seconds"    : time.perf_counter(),
+                            "evaluations": 0,
+                            "shape"      : None,
+                            "dtype"      : None })
+
+
+    def stop(self, latents: torch.Tensor | None = None) -> None:
+        """Finishes recording the last started section, along with its resulting latent (if any)."""
+        if not self.enabled or not self._open:
+            return
+        if self.detailed:
+            _synchronize()
+        record = self._open.pop()
+        record["seconds"] = time.perf_counter() - record["seconds"]
+        if latents is not None:
+            record["shape"] = list(latents.shape)
+            record["dtype"] = str(latents.dtype).removeprefix("torch.")
+        self.records.append(record)
+
+
+    @property
+    def evaluations(self) -> int:
+        """The model evaluations counted in all the recorded sections."""
+        return sum( record["evaluations"] for record in self.records )
+
+
+    @property
+    def seconds(self) -> float:
+        """The wall time of all the recorded sections (the time spent outside of them is not included)."""
+        return sum( record["seconds"] for record in self.records )
+
+
+    def add_evaluations(self, count: int) -> None:
+        """Adds model evaluations to the section being recorded."""
+        if self.enabled and self._open:
+            self._open[-1]["evaluations"] += count
+
+
+    def summary(self) -> str:
+        """Returns a human-readable table with all the recorded sections."""
+        lines = [ f"  {'section':<16} {'mb':>3} {'seconds':>9} {'evals':>6}  latent" ]
+        for record in self.records:
+            latent = f"{tuple(record['shape'])} {record['dtype']}" if record["shape"] is not None else "-"
+            lines.append(f"  {record['name']:<16} {record['micro_batch']:>3} {record['seconds']:>9.4f} "
+                         f"{record['evaluations']:>6}  {latent}")
+        lines.append( f"  {'total':<16} {'':>3} {self.seconds:>9.4f} {self.evaluations:>6}" )
+        return "\n".join(lines)
+
+
+
+def _synchronize() -> None:
+    """Waits for the queued GPU work, so the wall time is attributed to the section that queued it."""
+    if torch.cuda.is_available() and torch.cuda.is_initialized():
+        torch.cuda.synchronize()
@@ -0,0 +1,226 @@
+"""
+File    : sampling_session.py
+Purpose : Sampling session that keeps a model prepared across several denoising segments.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import torch
+import comfy.sample
+import comfy.samplers
+import comfy.sampler_helpers
+import comfy.model_management
+import comfy.model_patcher
+import comfy.patcher_extension
+import comfy.hooks
+from typing         import Any, TypeAlias
+from comfy.samplers import KSAMPLER
+from .system        import logger
+ComfyModel       : TypeAlias = Any
+ComfyConditioning: TypeAlias = list[ tuple[torch.Tensor,dict] ]
+
+
+class SamplingSession:
+    """
+    Keeps a ComfyUI model prepared for sampling across several denoising segments.
+
+    Every call to `comfy.sample.sample_custom(..)` loads the model into the
+    compute device, applies its patches/hooks, converts the conditionings and
+    cleans everything up again when the sampling finishes. The Z-Sampler runs
+    up to six of these calls per image, so this session performs the heavy
+    preparation only once in `open()` and reverts it in `close()`; each segment
+    sampled in between only pays for its own denoising steps.
+
+    If the session is not open (or it was created with `enabled=False`),
+    `sample(..)` falls back to `comfy.sample.sample_custom(..)`.
+
+    Args:
+        model        : ComfyUI MODEL obj representing the model to use for denoising.
+        conditionings: All the conditionings that will be sampled within the session.
+                       They are used to load any additional model they require in advance.
+        noise_shape  : Shape of the largest latent that will be sampled within the session,
+                       ComfyUI uses it to estimate the memory required by the model.
+        cfg          : Classifier-free guidance scale used for every segment.
+        enabled      : If `False`, the session never opens and every segment is sampled
+                       through `comfy.sample.sample_custom(..)`.
+    Example:
+        with SamplingSession(model, [positive], noise_shape=latents.shape, cfg=1.0) as session:
+            latents = session.sample(noise, latents, sampler, sigmas, positive, positive)
+    """
+    def __init__(self,
+                 model        : ComfyModel,
+                 conditionings: list[ComfyConditioning | None],
+                 *,
+                 noise_shape  : tuple[int, ...] | torch.Size,
+                 cfg          : float = 1.0,
+                 enabled      : bool  = True,
+                 ):
+        self.model         = model
+        self.noise_shape   = tuple(noise_shape)
+        self.cfg           = cfg
+        self.enabled       = enabled
+        self.segment_count = 0
+        self._conditionings = [cond for cond in conditionings if cond is not None]
+        self._converted     : dict[int, tuple]      = {}
+        self._guider        : Any                   = None
+        self._session_conds : dict[str, list[dict]] = {}
+        self._orig_model_options : Any = None
+        self._orig_hook_mode     : Any = None
+
+
+    def __enter__(self) -> "SamplingSession":
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+    @property
+    def is_open(self) -> bool:
+        """Returns True if the model is currently prepared by this session."""
+        return self._guider is not None
+
+
+    @property
+    def device(self) -> torch.device | None:
+        """The compute device used by the session, or None if the session is not open."""
+        return self.model.load_device if self._guider is not None else None
+
+
+    def open(self) -> None:
+        """
+        Prepares the model and all the conditionings for sampling.
+
+        Any error raised while preparing (e.g. an incompatible ComfyUI version)
+        leaves the session closed, so the sampling continues segment by segment.
+        """
+        if not self.enabled or self._guider is not None:
+            return
+
+        guider = comfy.samplers.CFGGuider(self.model)
+        guider.set_cfg(self.cfg)
+
+        # models wrapped by "outer sample" extensions expect to be sampled
+        # by ComfyUI's own loop; in that case the session remains closed
+        outer_wrappers = comfy.patcher_extension.get_all_wrappers(comfy.patcher_extension.WrappersMP.OUTER_SAMPLE,
+                                                                 guider.model_options, is_model_options=True)
+        if outer_wrappers:
+            logger.debug("Sampling session disabled: the model has outer-sample wrappers.")
+            return
+
+        # each distinct conditioning is converted once and shares an entry in
+        # the conds dict so that all of its additional models are loaded together
+        session_conds = { f"cond{i}": self._copy_of_converted(cond) for i, cond in enumerate(self._conditionings) }
+        comfy.samplers.preprocess_conds_hooks(session_conds)
+
+        self._orig_model_options = guider.model_options
+        self._orig_hook_mode     = self.model.hook_mode
+        guider.model_options     = comfy.model_patcher.create_model_options_clone(guider.model_options)
+        try:
+            if comfy.samplers.get_total_hook_groups_in_conds(session_conds) <= 1:
+                self.model.hook_mode = comfy.hooks.EnumHookMode.MinVram
+            comfy.sampler_helpers.prepare_model_patcher(self.model, session_conds, guider.model_options)
+            guider.inner_model, _, guider.loaded_models = \
+                comfy.sampler_helpers.prepare_sampling(self.model, self.noise_shape, session_conds, guider.model_options)
+            self.model.pre_run()
+        except Exception as e:
+            logger.debug(f"Sampling session disabled: unable to prepare the model ({e}).")
+            self.model.hook_mode = self._orig_hook_mode
+            self.model.restore_hook_patches()
+            return
+
+        self._session_conds = session_conds
+        self._guider        = guider
+
+
+    def close(self) -> None:
+        """Reverts all the preparation made by `open()`."""
+        guider, self._guider = self._guider, None
+        if guider is None:
+            return
+        try:
+            self.model.cleanup()
+            comfy.sampler_helpers.cleanup_models(self._session_conds, guider.loaded_models)
+        finally:
+            guider.model_options = self._orig_model_options
+            self.model.hook_mode = self._orig_hook_mode
+            self.model.restore_hook_patches()
+            self._session_conds = {}
+            self._converted     = {}
+
+
+    def sample(self,
+               noise       : torch.Tensor,
+               latent_image: torch.Tensor,
+               sampler     : KSAMPLER,
+               sigmas      : torch.Tensor,
+               positive    : ComfyConditioning,
+               negative    : ComfyConditioning,
+               *,
+               noise_mask  : torch.Tensor | None = None,
+               callback    : Any                 = None,
+               disable_pbar: bool                = False,
+               seed        : int | None          = None,
+               ) -> torch.Tensor:
+        """
+        Samples one denoising segment; equivalent to `comfy.sample.sample_custom(..)`.
+
+        Args:
+            noise       : The noise used to start the denoising process.
+            latent_image: The latent image to be denoised.
+            sampler     : ComfyUI object representing the sampler used for each denoising step.
+            sigmas      : Sigma values for each step of the segment.
+            positive    : Positive conditioning for the segment (it must be one of the
+                          conditionings provided when the session was created).
+            negative    : Negative conditioning for the segment.
+            noise_mask  : Optional tensor containing the inpainting mask.
+            callback    : Optional callback for tracking progress.
+            disable_pbar: If True, ComfyUI's own progress bar is not displayed.
+            seed        : The seed forwarded to the sampler.
+        Returns:
+            A tensor with the denoised latent image.
+        """
+        self.segment_count += 1
+        guider = self._guider
+        if guider is None:
+            return comfy.sample.sample_custom(self.model, noise, self.cfg, sampler, sigmas, positive, negative,
+                                              latent_image, noise_mask=noise_mask, callback=callback,
+                                              disable_pbar=disable_pbar, seed=seed)
+        if sigmas.shape[-1] == 0:
+            return latent_image
+
+        device = self.model.load_device
+        guider.conds = { "positive": self._copy_of_converted(positive),
+                         "negative": self._copy_of_converted(negative) }
+        comfy.samplers.preprocess_conds_hooks(guider.conds)
+
+        if noise_mask is not None:
+            noise_mask = comfy.sampler_helpers.prepare_mask(noise_mask, noise.shape, device)
+        noise        = noise.to(device)
+        latent_image = latent_image.to(device)
+        sigmas       = sigmas.to(device)
+        try:
+            samples = guider.inner_sample(noise, latent_image, device, sampler, sigmas,
+                                          noise_mask, callback, disable_pbar, seed)
+        finally:
+            del guider.conds
+        return samples.to(comfy.model_management.intermediate_device())
+
+
+    #__ internal functions ________________________________
+
+    def _copy_of_converted(self, conditioning: ComfyConditioning) -> list[dict]:
+        """Returns a copy of the conditioning converted to ComfyUI's internal format, caching the conversion."""
+        # (the conditioning is stored along with its conversion to keep its `id` alive)
+        _, converted = self._converted.get( id(conditioning), (None, None) )
+        if converted is None:
+            converted = comfy.sampler_helpers.convert_cond(conditioning)
+            self._converted[ id(conditioning) ] = (conditioning, converted)
+        return [ c.copy() for c in converted ]
+
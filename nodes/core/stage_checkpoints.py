@@ -0,0 +1,143 @@
+"""
+File    : stage_checkpoints.py
+Purpose : On-disk checkpoints of the stages of a Z-Sampler Turbo generation.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+
+  Each checkpoint is stored in two files named after its key:
+
+    zsampler_<key>.safetensors : the tensors resulting from the stage
+                                 (the latent, the noise bias, the sigmas)
+    zsampler_<key>.json        : a small manifest describing the checkpoint
+                                 (stage, seeds, sigmas, shapes, ...)
+
+  Both files are written to a temporary name and then renamed, the manifest
+  last, so a process killed while writing never leaves a checkpoint that
+  looks complete.
+
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import os
+import json
+import time
+import torch
+import safetensors.torch
+from pathlib import Path
+from typing  import Any
+from .system  import logger
+from .helpers import get_project_version
+_FORMAT  = "zi_power_stage_checkpoint"
+_VERSION = 1
+
+
+class StageCheckpoints:
+    """
+    Directory of on-disk checkpoints of the stages of Z-Sampler Turbo generations.
+
+    A checkpoint is identified by a key built from everything its stage depends on,
+    so an identical generation run again (e.g. after the process was killed) finds
+    the checkpoint of the last completed stage and resumes from it.
+
+    Args:
+        directory: The directory where the checkpoints are stored (created when needed).
+    """
+    def __init__(self, directory: str | os.PathLike):
+        self.directory = Path(directory)
+
+
+    def save(self,
+             key    : str,
+             stage  : int,
+             tensors: dict[str, torch.Tensor],
+             info   : dict[str, Any],
+             ) -> bool:
+        """
+        Writes the checkpoint of a stage.
+
+        Args:
+            key    : The key identifying the checkpoint.
+            stage  : The stage resulting in the checkpoint (1, 2 or 3).
+            tensors: The tensors to store, e.g. {"samples": ..., "noise_bias": ...}.
+            info   : Additional JSON-serializable values stored in the manifest.
+        Returns:
+            True if the checkpoint was written; a failure is only reported in the log,
+            as the generation can go on without its checkpoint.
+        """
+        tensors_path, manifest_path = self._paths(key)
+        manifest = {
+            "format"   : _FORMAT,
+            "version"  : _VERSION,
+            "key"      : key,
+            "stage"    : stage,
+            "tensors"  : { name: {"shape": list(t.shape), "dtype": str(t.dtype)} for name, t in tensors.items() },
+            "created"  : time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "generator": f"ComfyUI-ZImagePowerNodes {get_project_version()}",
+            **info,
+        }
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tensors = { name: t.detach().to("cpu").contiguous() for name, t in tensors.items() }
+            _replace_atomically(tensors_path, lambda path: safetensors.torch.save_file(
+                                    tensors, str(path), metadata={"format": _FORMAT, "key": key, "stage": str(stage)}) )
+            _replace_atomically(manifest_path, lambda path: path.write_text( json.dumps(manifest, indent=2, default=str) ))
+        except Exception as e:
+            logger.warning(f"Unable to write the checkpoint of stage {stage} to '{self.directory}' ({e}).")
+            return False
+        return True
+
+
+    def load(self, key: str) -> tuple[dict[str, torch.Tensor], dict[str, Any]] | None:
+        """
+        Reads a checkpoint.
+
+        Args:
+            key: The key identifying the checkpoint.
+        Returns:
+            A tuple (tensors, manifest), or None if there is no valid checkpoint for the key.
+        """
+        tensors_path, manifest_path = self._paths(key)
+        if not manifest_path.is_file():
+            return None
+        try:
+            manifest = json.loads( manifest_path.read_text() )
+            if manifest.get("format") != _FORMAT or manifest.get("version") != _VERSION or manifest.get("key") != key:
+                raise ValueError("the manifest does not describe this checkpoint")
+            tensors = safetensors.torch.load_file(str(tensors_path), device="cpu")
+            if any( list(tensors[name].shape) != description["shape"] for name, description in manifest["tensors"].items() ):
+                raise ValueError("the tensors do not match the manifest")
+        except Exception as e:
+            logger.warning(f"Ignoring the invalid checkpoint '{manifest_path}' ({e}).")
+            return None
+        return tensors, manifest
+
+
+    def remove(self, key: str) -> None:
+        """Deletes a checkpoint (if it exists)."""
+        for path in reversed(self._paths(key)):
+            try:
+                path.unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"Unable to delete the checkpoint '{path}' ({e}).")
+
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        """Returns the paths of the tensors file and the manifest of a checkpoint."""
+        return ( self.directory / f"zsampler_{key}.safetensors",
+                 self.directory / f"zsampler_{key}.json" )
+
+
+
+def _replace_atomically(path: Path, write_fn) -> None:
+    """Writes a file through `write_fn(temporary_path)` and then renames it to `path`."""
+    temporary_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        write_fn(temporary_path)
+        os.replace(temporary_path, path)
+    finally:
+        temporary_path.unlink(missing_ok=True)
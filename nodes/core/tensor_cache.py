@@ -0,0 +1,310 @@
+"""
+File    : tensor_cache.py
+Purpose : Bounded in-memory LRU cache for tensors and helpers to build its keys.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import uuid
+import hashlib
+import threading
+import torch
+from collections import OrderedDict
+from typing      import Any, Hashable
+
+
+class TensorCache:
+    """
+    Bounded LRU cache for tensors (or tuples of tensors).
+
+    Values are stored as detached CPU copies, so the cache never holds VRAM
+    and callers can modify the returned tensors freely. When any of the limits
+    is exceeded, the least recently used entries are evicted.
+
+    Args:
+        name       : Name of the cache, used only for reporting.
+        max_entries: Maximum number of entries in the cache (0 = unlimited).
+        max_bytes  : Maximum total size in bytes of all stored tensors (0 = unlimited).
+    """
+    def __init__(self, name: str, *, max_entries: int = 0, max_bytes: int = 0):
+        self.name        = name
+        self.max_entries = max_entries
+        self.max_bytes   = max_bytes
+        self.hits        = 0
+        self.misses      = 0
+        self.evictions   = 0
+        self._entries: OrderedDict[Hashable, tuple[Any,int]] = OrderedDict()
+        self._nbytes = 0
+        self._lock   = threading.Lock()
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    @property
+    def nbytes(self) -> int:
+        """Total size in bytes of all tensors stored in the cache."""
+        return self._nbytes
+
+
+    def get(self, key: Hashable | None) -> Any | None:
+        """
+        Returns a copy of the value stored under `key`, or None if it is not cached.
+        A `None` key is always a miss (used when the key could not be built).
+        """
+        with self._lock:
+            entry = self._entries.get(key) if key is not None else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _copy(entry[0])
+
+
+    def put(self, key: Hashable | None, value: Any) -> None:
+        """
+        Stores a copy of `value` under `key`, evicting old entries if needed.
+        Values that do not fit within `max_bytes` by themselves are not stored.
+        """
+        if key is None:
+            return
+        value  = _copy(value, to_cpu=True)
+        nbytes = _nbytes(value)
+        if self.max_bytes > 0 and nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry is not None:
+                self._nbytes -= old_entry[1]
+            self._entries[key] = (value, nbytes)
+            self._nbytes += nbytes
+            self._evict_over_limits()
+
+
+    def set_limits(self, *, max_entries: int | None = None, max_bytes: int | None = None) -> None:
+        """Changes the limits of the cache, evicting entries if the new limits are exceeded."""
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict_over_limits()
+
+
+    def clear(self) -> None:
+        """Removes all entries from the cache (the counters are preserved)."""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+
+    def stats(self) -> dict[str, int]:
+        """Returns a dictionary with the current counters of the cache."""
+        return { "entries"  : len(self._entries),
+                 "bytes"    : self._nbytes,
+                 "hits"     : self.hits,
+                 "misses"   : self.misses,
+                 "evictions": self.evictions }
+
+
+    #__ internal functions ________________________________
+
+    def _evict_over_limits(self) -> None:
+        """Evicts the least recently used entries until the cache is within its limits."""
+        while self._entries and (
+              (self.max_entries > 0 and len(self._entries) > self.max_entries) or
+              (self.max_bytes   > 0 and self._nbytes       > self.max_bytes  )):
+            _, (_, evicted_nbytes) = self._entries.popitem(last=False)
+            self._nbytes   -= evicted_nbytes
+            self.evictions += 1
+
+
+
+#=============================== CACHE KEYS ================================#
+
+def object_uid(obj: Any) -> str:
+    """
+    Returns a unique identifier permanently attached to the given object.
+
+    Unlike `id(obj)`, the identifier is never reused by another object after
+    the original one is garbage collected. Objects that do not accept new
+    attributes fall back to their `id`.
+    """
+    uid = getattr(obj, "_zi_power_uid", None)
+    if uid is None:
+        uid = uuid.uuid4().hex
+        try:
+            setattr(obj, "_zi_power_uid", uid)
+        except (AttributeError, TypeError):
+            uid = f"id:{id(obj)}"
+    return uid
+
+
+def tensor_fingerprint(tensor: torch.Tensor | None) -> tuple | None:
+    """Returns a hashable fingerprint of the tensor content, shape and dtype."""
+    if tensor is None:
+        return None
+    data = tensor.detach().to("cpu").contiguous()
+    if data.dtype == torch.bfloat16:
+        data = data.view(torch.int16)
+    digest = hashlib.sha1( data.numpy().tobytes() ).hexdigest()
+    return (tuple(tensor.shape), str(tensor.dtype), digest)
+
+
+def model_fingerprint(model: Any) -> tuple:
+    """
+    Returns a hashable fingerprint identifying a ComfyUI MODEL and its patches.
+
+    Two clones of the same model with identical patches (e.g. no LoRA changes)
+    share the same fingerprint.
+    """
+    return ( object_uid( getattr(model, "model", model) ),
+             str( getattr(model, "patches_uuid", "") ),
+             value_fingerprint( getattr(model, "model_options", None) ) )
+
+
+def persistent_model_fingerprint(model: Any, *, sampled_tensors: int = 8, sampled_elements: int = 4096) -> tuple:
+    """
+    Returns a fingerprint identifying a ComfyUI MODEL that is stable across processes.
+
+    Unlike `model_fingerprint(..)`, which identifies the model object in memory, the
+    model is identified by its class, its number of parameters and a sample of the
+    content of its first parameters, along with the keys, strengths and a sample of
+    each of its patches (e.g. LoRAs). The same weights and patches loaded in another
+    process produce the same fingerprint. The fingerprint is computed once per model
+    object and set of patches.
+    """
+    patches_uuid = str( getattr(model, "patches_uuid", "") )
+    cached = getattr(model, "_zi_power_persistent_fingerprint", None)
+    if cached is not None and cached[0] == patches_uuid:
+        return cached[1]
+
+    inner           = getattr(model, "model", model)
+    diffusion_model = getattr(inner, "diffusion_model", inner)
+    parameters      = list( diffusion_model.parameters() ) if hasattr(diffusion_model, "parameters") else []
+    digest          = hashlib.sha1()
+    for parameter in parameters[:sampled_tensors]:
+        digest.update( _sampled_bytes(parameter, sampled_elements) )
+    patches     = getattr(model, "patches", None) or {}
+    fingerprint = ( type(inner).__qualname__,
+                    type(diffusion_model).__qualname__,
+                    sum( parameter.numel() for parameter in parameters ),
+                    digest.hexdigest(),
+                    tuple( (str(key), _sampled_fingerprint(patches[key])) for key in sorted(patches, key=str) ),
+                    value_fingerprint( getattr(model, "model_options", None) ) )
+    try:
+        setattr(model, "_zi_power_persistent_fingerprint", (patches_uuid, fingerprint))
+    except (AttributeError, TypeError):
+        pass
+    return fingerprint
+
+
+def persistent_digest(*values: Any) -> str:
+    """
+    Returns a hexadecimal digest of the fingerprints of the given values (see `value_fingerprint`).
+
+    The digest is stable across processes as long as the values only contain basic values,
+    tensors, samplers and conditionings; any other object is identified by the object itself,
+    so its digest never matches the one of another process.
+    """
+    fingerprints = tuple( value_fingerprint(value) for value in values )
+    return hashlib.sha1( repr(fingerprints).encode("utf-8") ).hexdigest()
+
+
+def conditioning_fingerprint(conditioning: list | None) -> tuple | None:
+    """Returns a hashable fingerprint of a ComfyUI conditioning (tensors and options)."""
+    if conditioning is None:
+        return None
+    return tuple( (tensor_fingerprint(tensor), value_fingerprint(options))
+                  for tensor, options in conditioning )
+
+
+def sampler_fingerprint(sampler: Any) -> tuple:
+    """Returns a hashable fingerprint of a ComfyUI sampler object (KSAMPLER or similar)."""
+    if isinstance(sampler, str):
+        return ("name", sampler)
+    public_state = { name: value for name, value in getattr(sampler, "__dict__", {}).items()
+                     if name != "sampler_function" and name != "_zi_power_uid" }
+    sampler_function = getattr(sampler, "sampler_function", None)
+    if hasattr(sampler, "_inner_sampler"):
+        # custom samplers wrapping a comfyui sampler are identified by their class and their inner sampler
+        sampler_function = None
+    return ( type(sampler).__qualname__,
+             getattr(sampler_function, "__qualname__", None),
+             value_fingerprint(public_state) )
+
+
+def value_fingerprint(value: Any) -> Hashable:
+    """
+    Returns a hashable fingerprint for a nested structure of basic values,
+    tensors, samplers and conditionings. Any other object is identified by
+    the object itself (see `object_uid`).
+    """
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return value
+    if isinstance(value, torch.Tensor):
+        return tensor_fingerprint(value)
+    if isinstance(value, dict):
+        return ("dict",) + tuple( (str(k), value_fingerprint(v)) for k, v in sorted(value.items(), key=lambda kv: str(kv[0])) )
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple( value_fingerprint(v) for v in value )
+    if hasattr(value, "sampler_function"):
+        return sampler_fingerprint(value)
+    if hasattr(value, "__self__") and hasattr(value, "__func__"):
+        # bound methods are created on every access, so they are identified by their object and function
+        return ("method", object_uid(value.__self__), object_uid(value.__func__))
+    # any other object (controlnets, hooks, patches, etc) is identified by the object itself
+    return ("obj", type(value).__qualname__, object_uid(value))
+
+
+#============================ INTERNAL HELPERS =============================#
+
+def _copy(value: Any, to_cpu: bool = False) -> Any:
+    """Returns a copy of a tensor or a tuple/list of tensors."""
+    if isinstance(value, torch.Tensor):
+        return value.detach().to("cpu", copy=True) if to_cpu else value.clone()
+    if isinstance(value, (list, tuple)):
+        return type(value)( _copy(v, to_cpu) for v in value )
+    return value
+
+
+def _sampled_bytes(tensor: torch.Tensor, max_elements: int) -> bytes:
+    """Returns the bytes of the first elements of a tensor converted to float32."""
+    data = tensor.detach().flatten()[:max_elements].to("cpu", torch.float32)
+    return data.numpy().tobytes()
+
+
+def _sampled_fingerprint(value: Any, max_elements: int = 256) -> Hashable:
+    """
+    Returns a fingerprint of a nested structure where each tensor is identified by its shape,
+    dtype and a sample of its first elements (used for large tensors such as patch weights).
+    """
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return value
+    if isinstance(value, torch.Tensor):
+        digest = hashlib.sha1( _sampled_bytes(value, max_elements) ).hexdigest()
+        return (tuple(value.shape), str(value.dtype), digest)
+    if isinstance(value, dict):
+        return ("dict",) + tuple( (str(k), _sampled_fingerprint(v, max_elements)) for k, v in sorted(value.items(), key=lambda kv: str(kv[0])) )
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple( _sampled_fingerprint(v, max_elements) for v in value )
+    if hasattr(value, "weights"):
+        # weight adapters (e.g. LoRA) are identified by their class and their weights
+        return (type(value).__qualname__, _sampled_fingerprint(value.weights, max_elements))
+    return (type(value).__qualname__, getattr(value, "__qualname__", None))
+
+
+def _nbytes(value: Any) -> int:
+    """Returns the total size in bytes of a tensor or a tuple/list of tensors."""
+    if isinstance(value, torch.Tensor):
+        return value.numel() * value.element_size()
+    if isinstance(value, (list, tuple)):
+        return sum( _nbytes(v) for v in value )
+    return 0
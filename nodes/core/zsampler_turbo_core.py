@@ -10,18 +10,51 @@ License : MIT
          ComfyUI nodes designed specifically for the "Z-Image" model.
 _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
 """
+import os
+import json
+import math
+import time
+import logging
+import dataclasses
 import torch
 import torch.nn.functional as F
 import comfy.utils
+import comfy.model_management
 import comfy.sample
 import comfy.samplers
 import comfy.sampler_helpers
 from comfy.samplers import KSAMPLER
-from typing         import Any, TypeAlias, cast
+from typing         import Any, Callable, NamedTuple, TypeAlias, cast
+from .system        import logger
 from .progress_bar  import ProgressPreview
+from .cancellation  import CancellationToken, GenerationCancelled
+from .sampling_profiler       import SamplingProfiler, PROFILE_LATENT_KEY
+from .metrics                 import SAMPLER_GENERATIONS, SAMPLER_STAGE_SECONDS, SAMPLER_STEPS, \
+                                     SAMPLER_BATCH_SIZE, NOISE_ESTIMATIONS, \
+                                     SAMPLER_GENERATION_SECONDS, SAMPLER_SEGMENTS
+from .sampling_session        import SamplingSession
+from .stage_checkpoints       import StageCheckpoints
+from .noise_bias_predictor    import NoiseBiasPredictor
+from .helpers_conditioning    import conditioning_batch_size, \
+                                     select_conditioning_rows
+from .tensor_cache            import TensorCache, \
+                                     model_fingerprint, \
+                                     conditioning_fingerprint, \
+                                     sampler_fingerprint, \
+                                     tensor_fingerprint, \
+                                     value_fingerprint, \
+                                     persistent_model_fingerprint, \
+                                     persistent_digest
+from .helpers                 import mask_crop_box, get_project_root
 from .zsampler_turbo_corehelp import EulerAss, \
+                                     SubseedNoiseSampler, \
+                                     TiledSampler, \
+                                     ConvergenceSampler, \
+                                     CountingSampler, \
                                      sampler_from_name, \
                                      generate_noise, \
+                                     resolve_noise_device, \
+                                     offset_seed, \
                                      inject_freq_noise, \
                                      truncate_sigmas_by_step_range, \
                                      truncate_sigmas_by_value_range, \
@@ -31,12 +64,164 @@ from .zsampler_turbo_corehelp import EulerAss, \
 ComfyLatent      : TypeAlias = dict[str, Any]
 ComfyModel       : TypeAlias = Any
 ComfyConditioning: TypeAlias = list[ tuple[torch.Tensor,dict] ]
+
+# available sources of the initial noise bias:
+#  - "estimated": measured by denoising a pure noise sample (one extra model evaluation)
+#  - "predicted": predicted without the model by a regressor fitted offline with `scripts/noisebias.py`
+#                 (the noise bias is estimated as usual when there is no predictor available)
+NOISE_BIAS_SOURCES = ("estimated", "predicted")
+
+# environment variables used to calibrate the noise bias predictor:
+#  - ZIMAGE_NODES_NOISE_BIAS_LOG      : file where every estimation appends its calibration records
+#  - ZIMAGE_NODES_NOISE_BIAS_PREDICTOR: file of the predictor (default: "noise_bias_predictor.json"
+#                                       in the project root)
+NOISE_BIAS_LOG_ENV       = "ZIMAGE_NODES_NOISE_BIAS_LOG"
+NOISE_BIAS_PREDICTOR_ENV = "ZIMAGE_NODES_NOISE_BIAS_PREDICTOR"
 _DEFAULT_INJECT_NOISE_FREQS     = (  0,   0,   0)
 _DEFAULT_INJECT_NOISE_SCALES    = (0.0, 0.0, 0.0)
 _SCRAMBLE_COUNTS_DISABLED       = ( 0,  0,  0,  0)
 _SCRAMBLE_COUNTS_DEFAULT        = ( 1,  0,  1,  0)
 _SCRAMBLE_COUNTS_EVEN_SEED      = ( 2, -1,  2, -1)
 _SCRAMBLE_COUNTS_MULTIPLE_OF_10 = (-2, -2, -2, -2)
+_STAGE3_NOISE_SEED              = 696969
+_INPAINT_CROP_MIN_SIZE          = 512  # minimum size in pixels of the region denoised in cropped inpainting
+
+# rough ratio between the memory required to denoise an image and the size
+# of its latent, used only when the model cannot estimate it by itself
+_SAMPLE_MEMORY_FACTOR = 1024
+
+# results of the initial noise estimation, `(bias, scale)` tensors of
+# shape [batch_size, channels, 1, 1], reused while the inputs do not change
+_NOISE_FEATURES_CACHE = TensorCache("noise features", max_entries=64, max_bytes=16*1024*1024)
+
+# latents resulting from stage 1 and stage 2, reused when only the options of the
+# following stages change (disabled unless a memory budget is provided)
+_STAGE_PREFIX_CACHE = TensorCache("stage prefix")
+
+# profiler used when the generation is not profiled (it never records anything)
+_DISABLED_PROFILER = SamplingProfiler(enabled=False)
+
+# noise bias predictors already loaded, by path (along with the modification time of their file)
+_NOISE_BIAS_PREDICTORS: dict[str, tuple[float, NoiseBiasPredictor]] = {}
+
+
+class Stage3Variation(NamedTuple):
+    """
+    Parameters of the third stage (the refiner) for one variation of a fan-out.
+    Any parameter left as `None` takes the value used by a regular generation.
+    """
+    seed              : int | None               = None  #< seed of the stage 3 noise
+    sampler           : str | KSAMPLER | None     = None  #< sampler used for stage 3 (e.g. "dpmpp_sde")
+    extra_noise_freqs : tuple[int  ,...] | None  = None  #< frequencies of the extra noise of stage 3
+    extra_noise_scales: tuple[float,...] | None  = None  #< scales of the extra noise of stage 3
+
+
+@dataclasses.dataclass(frozen=True)
+class SamplingOptions:
+    """
+    Options of the sampling engine used by `zsampler_turbo_core(..)`.
+
+    They control how the generation is executed (noise generation, caching,
+    micro-batches, tiling, checkpoints and profiling) rather than the sigmas,
+    conditionings and noise levels of its stages, which remain arguments of
+    the sampling functions. The defaults reproduce a regular generation.
+
+    Attributes:
+        noise_bias_source       : How the initial noise bias is obtained, "estimated" (default) runs the model
+                                   on a noise sample, "predicted" uses the regressor fitted offline instead
+                                   (saving that model evaluation). See `NOISE_BIAS_SOURCES`.
+        noise_generator         : The random generator used for all the noise, "legacy" (default) reproduces the
+                                   noise of previous versions; "philox" computes the noise of each image in the batch
+                                   directly, making large `batch_index` values as cheap as small ones.
+        noise_device            : Where all the noise is generated, "reproducible" (default) generates it on CPU so
+                                   the result is the same on any machine; "fast" generates it directly on the compute
+                                   device, avoiding the host-side generation and the transfer at every stage.
+                                   With "fast" and a sampling session, the stage 2 scramble also runs on the
+                                   compute device (its result differs from the CPU one by float rounding).
+        use_sampling_session    : If `True`, the model and conditionings are prepared only once and every stage
+                                   is sampled within that single session. If `False` (default), each sampling call
+                                   goes through `comfy.sample.sample_custom(..)`, which prepares the model again.
+                                   The session reproduces the internals of `CFGGuider.outer_sample(..)`, so it is
+                                   opt-in until it is verified against every ComfyUI version supported.
+        stage_cache_mb          : Memory budget in megabytes for caching the latents resulting from stage 1 and
+                                   stage 2. When enabled, a generation that differs from a previous one only in
+                                   the options of the later stages resumes from the cached latent, producing the
+                                   same result. If zero (default), the cache is disabled.
+        batch_memory_mb         : Memory budget in megabytes for denoising a batch. When the estimated memory
+                                   required by the batch exceeds it, the batch is split into micro-batches that
+                                   are denoised one after another. Every random source is then keyed by the
+                                   position of each image (its `batch_index`), so the result is identical however
+                                   the batch is split. If zero (default), the whole batch is denoised at once.
+        batch_offset            : Optional position of the first image of the batch within a larger logical batch
+                                   (e.g. one split across several workers). The sub-seed of every image is shifted
+                                   by this offset and every random source is keyed by it, so any contiguous slice
+                                   of the logical batch renders exactly as in a single run of the whole batch with
+                                   `batch_offset=0`. With the "legacy" generator the cost of the noise grows with
+                                   the offset; "philox" makes any offset as cheap as zero.
+                                   If `None` (default), the images are keyed as usual. Ignored when `seed` is a list.
+        stage3_variations       : Optional list of variations of the third stage (see `Stage3Variation`).
+                                   Stages 1 and 2 are denoised only once and each image is then refined once per
+                                   variation; the output contains one image per variation for each input image
+                                   (variations of the same image are contiguous in the batch).
+                                   If `None` (default), every image is refined only once as usual.
+        composition_scale       : Fraction of the latent size at which stages 1 and 2 are denoised, e.g. 0.5
+                                   denoises the composition at half the width and height (about a quarter of the
+                                   tokens). The composed latent is then upscaled and stage 3 re-noises and refines
+                                   it at full size. Smaller values are faster but the fine details depend entirely
+                                   on stage 3, so the composition may lose small objects or thin structures.
+                                   Ignored when the generation does not start from pure noise or uses a noise mask.
+                                   If 1.0 (default), all the stages are denoised at full size.
+        tile_size               : Size in pixels of the tiles used by the model in the tiled stages. Each prediction
+                                   of the model is computed on overlapping tiles blended with feathered weights, so
+                                   the memory used by the model is bounded by the tile size instead of by the image
+                                   size. The noise is still generated for the whole image, so every position receives
+                                   the same noise whatever the tile layout. If zero (default), tiling is disabled.
+        tile_overlap            : Minimum overlap in pixels between neighbouring tiles. Defaults to 128.
+        tiled_stages            : Stages denoised tile by tile when `tile_size` is enabled, only stage 2 and stage 3
+                                   can be tiled (stage 1 defines the global composition). Defaults to (3,).
+        inpaint_crop_margin     : Optional margin in pixels for cropped inpainting. When the latent has a noise mask,
+                                   only the bounding box of the mask expanded by this margin of context (and at least
+                                   512px wide and high) is denoised, and the result is pasted back into the latent,
+                                   so small touch-ups on large images cost about as much as a small generation.
+                                   If `None` (default), the whole latent is denoised.
+        stage3_early_exit       : Convergence threshold for finishing the third stage early. After each step of
+                                   stage 3, the relative change of the predicted final image (mean absolute change
+                                   divided by its mean absolute value) is compared with this threshold; once every
+                                   image changes less than it, stage 3 finishes with a final denoise, skipping the
+                                   remaining steps. If zero (default), all the steps are always performed.
+        return_draft_on_cancel  : If `True`, a cancelled generation returns its draft instead of raising; images
+                                   of the batch not reached yet keep their input latent. Defaults to `False`.
+        checkpoint_dir          : Optional directory where a checkpoint is written after each stage (a safetensors
+                                   file with the latent, the noise bias and the sigmas, plus a JSON manifest with the
+                                   stage, seeds and sigmas). An identical generation run again, e.g. after the process
+                                   was killed, resumes from the last completed stage and produces the same result;
+                                   a generation whose final stage was checkpointed is restored without sampling.
+                                   Only the checkpoint of the final stage is kept once it is written.
+                                   If `None` (default), no checkpoint is written.
+        profile                 : If `True`, the wall time, number of model evaluations and resulting latent shape
+                                   and dtype of each section (noise estimation, stage 1, stage 2 scramble and
+                                   pre-processing, stage 2, upscale, stage 3) are recorded, logged at DEBUG level
+                                   and attached to the output LATENT under the key "zi_power_profile".
+                                   If `None` (default), the generation is profiled only when the logger shows
+                                   DEBUG messages.
+    """
+    noise_bias_source     : str                           = "estimated"
+    noise_generator       : str                           = "legacy"
+    noise_device          : str                           = "reproducible"
+    use_sampling_session  : bool                          = False
+    stage_cache_mb        : int                           = 0
+    batch_memory_mb       : int                           = 0
+    batch_offset          : int | None                    = None
+    stage3_variations     : list[Stage3Variation] | None  = None
+    composition_scale     : float                         = 1.0
+    tile_size             : int                           = 0
+    tile_overlap          : int                           = 128
+    tiled_stages          : tuple[int, ...]               = (3,)
+    inpaint_crop_margin   : int | None                    = None
+    stage3_early_exit     : float                         = 0.0
+    return_draft_on_cancel: bool                          = False
+    checkpoint_dir        : str | None                    = None
+    profile               : bool | None                   = None
 
 
 
@@ -44,7 +229,7 @@ def zsampler_turbo_core(latent_input             : ComfyLatent,
                         model                    : ComfyModel,
                         positive                 : ComfyConditioning,
                         *,
-                        seed                     : int,
+                        seed                     : int | list[int],
                         steps                    : int,
                         initial_noise_bias_level : float                                   = 0.0,
                         initial_noise_overdose   : float                                   = 0.0,
@@ -60,10 +245,13 @@ def zsampler_turbo_core(latent_input             : ComfyLatent,
                         positive_stg3            : ComfyConditioning | None                = None,
                         stage2_scramble          : bool                                    = False,
                         stage2_scramble_counts   : tuple[int,int,int,int] | None           = None,
-                        stage2_preproc_steps     : int                                     = 0,
+                        stage2_preproc_steps     : int | list[int]                         = 0,
                         extra_noise_freqs        : tuple[int  ,...] | None                 = None,
                         extra_noise_scales       : tuple[float,...] | None                 = None,
                         samplers                 : tuple[str|object, ...] | None           = None,
+                        options                  : SamplingOptions | None                  = None,
+                        cancel_token             : CancellationToken | None                = None,
+                        profiler                 : SamplingProfiler | None                 = None,
                         progress_preview         : ProgressPreview
                         ) -> dict[str, Any]:
     """
@@ -72,9 +260,20 @@ def zsampler_turbo_core(latent_input             : ComfyLatent,
     Args:
         latent_input            : ComfyUI LATENT dict containing the initial latent tensor to be denoised.
                                    Includes keys like "samples" and optional "noise_mask", "batch_index".
+                                   With a "batch_index", every random source is keyed by the sub-seed of each
+                                   image: the initial noise (as in ComfyUI) and also the noise bias estimation,
+                                   the extra noise and the noise of stochastic samplers. The last three were
+                                   positional in earlier versions, so workflows with a "batch_index" and a
+                                   stochastic sampler or extra noise produce different images than before.
         model                   : ComfyUI MODEL obj representing the model to use for denoising.
-        positive                : Positive conditioning for the denoising process.
+        positive                : Positive conditioning for the denoising process. A stacked conditioning
+                                   with one row per image (see `stack_conditionings`) pairs each row with the
+                                   image at the same position; a latent with a single image is repeated to
+                                   fill the batch. The same applies to the conditionings of each stage.
         seed                    : Seed for the deterministic RNG used throughout the sampler.
+                                   A list with one seed per image renders every image of the batch exactly as a
+                                   generation of that image alone with its seed; a latent with a single image
+                                   is repeated to fill the batch.
         steps                   : The total number of denoising steps. This value will
                                    be used internally to determine the sigmas values.
         initial_noise_bias_level: The proportion of the estimated noise bias to apply before the first
@@ -116,6 +315,8 @@ def zsampler_turbo_core(latent_input             : ComfyLatent,
         stage2_preproc_steps    : Optional number of steps to be performed as preprocessing in the second stage.
                                    This can improve coherence and reduce hallucinations.
                                    If zero (default), no preprocessing is performed.
+                                   A list with one value per image (e.g. one decided by the seed of each image
+                                   of a seed list) denoises the images with different values in separate batches.
         extra_noise_freqs       : Optional frequencies at which additional noise is injected into the latent image
                                    during each stage. The first two values correspond to stage1 and stage2, while all
                                    following values correspond to stage3. If `None` (default), no extra noise is injected.
@@ -129,12 +330,29 @@ def zsampler_turbo_core(latent_input             : ComfyLatent,
                                    values correspond to stage3. If `None` (default), no extra noise is injected.
         samplers                : Optional tuple of KSAMPLERs (or strings with the names of the samplers) to be
                                   used in each stage. If `None` (default) then "euler" is used in all stages.
+        options                 : Options of the sampling engine (noise generation, caching, micro-batches, tiling,
+                                   cancellation, checkpoints and profiling), see `SamplingOptions`.
+                                   If `None` (default), all of them take their default values.
+        cancel_token            : Optional `CancellationToken` checked between every sampling call (before the
+                                   noise estimation, each pre-processing step and each stage); once cancelled, the
+                                   generation raises `GenerationCancelled` carrying the latent of the last stage
+                                   that ended noise-free (for the micro-batch being denoised). Without a token,
+                                   only ComfyUI's interrupt is checked.
+        profiler                : Optional `SamplingProfiler` where the generation is recorded, so the caller can
+                                   read its sections afterwards (e.g. the model evaluations actually made, which
+                                   are fewer when a stage is restored from the cache or a checkpoint).
+                                   If `None` (default), the generation is recorded in a profiler of its own.
         progress_preview        : A `ProgressPreview` object for displaying progress during the denoising process.
 
     Returns:
         A ComfyUI LATENT object with the denoised latent output.
+    Raises:
+        GenerationCancelled: If `cancel_token` was cancelled and no draft is returned.
     """
 
+    if options is None:
+        options = SamplingOptions()
+
     # z-image turbo is a cfg-distilled model requiring CFG=1.0, which discard
     # negative conditioning, here we set it to `positive` for simplicity
     negative = positive
@@ -149,6 +367,22 @@ def zsampler_turbo_core(latent_input             : ComfyLatent,
     if len(sampler_objs) < 3:
         raise ValueError("If `samplers` parameter is specified, it should contain at least three valid samplers.")
 
+    # convert the sampler names of the stage 3 variations to sampler objects
+    # (variations with the same sampler name share the object, so they are refined together)
+    stage3_variations = options.stage3_variations
+    if stage3_variations is not None:
+        if len(stage3_variations) == 0:
+            raise ValueError("`stage3_variations` must be None or a non-empty list of `Stage3Variation`")
+        variation_samplers: dict[str, KSAMPLER] = {}
+        for variation in stage3_variations:
+            if isinstance(variation.sampler, str) and variation.sampler not in variation_samplers:
+                variation_samplers[variation.sampler] = sampler_from_name(variation.sampler)
+        stage3_variations = [ variation._replace(sampler=variation_samplers[variation.sampler])
+                              if isinstance(variation.sampler, str) else variation
+                              for variation in stage3_variations ]
+        options = dataclasses.replace(options, stage3_variations=stage3_variations)
+    num_variations = len(stage3_variations) if stage3_variations else 1
+
     # validate `inject_noise_freqs/scales`
     if extra_noise_freqs is not None:
         if not isinstance(extra_noise_freqs,tuple) or len(extra_noise_freqs) < 3:
@@ -157,6 +391,10 @@ def zsampler_turbo_core(latent_input             : ComfyLatent,
         if not isinstance(extra_noise_scales,tuple) or len(extra_noise_scales) < 3:
             raise ValueError("`inject_noise_scales` must be None or a tuple of at least 3 floats")
 
+    # validate `options.tiled_stages`
+    if not set(options.tiled_stages) <= {2, 3}:
+        raise ValueError("`options.tiled_stages` can only contain stage 2 and/or stage 3")
+
     # validate `stage2_scramble_counts`
     if stage2_scramble_counts is not None:
         if not isinstance(stage2_scramble_counts,tuple) or len(stage2_scramble_counts) != 4:
@@ -176,35 +414,44 @@ def zsampler_turbo_core(latent_input             : ComfyLatent,
     if extra_noise_scales is None:
         extra_noise_scales = _DEFAULT_INJECT_NOISE_SCALES
 
+    # a list of seeds fills the batch with one image per seed
+    # (a single seed in the list is just a regular seed)
+    if isinstance(seed, (list,tuple)):
+        if len(seed) == 0:
+            raise ValueError("`seed` must be an integer or a non-empty list of integers")
+        seed = int(seed[0]) if len(seed) == 1 else [ int(s) for s in seed ]
+    if isinstance(seed, list):
+        latent_input = _expand_batch(latent_input, len(seed), "number of seeds")
+
+    # a stacked conditioning (e.g. several prompts encoded together)
+    # fills the batch with one image per row of the conditioning
+    conditionings = (positive, positive_stg2_preproc, positive_stg2, positive_stg3)
+    latent_input  = _expand_batch(latent_input, max( conditioning_batch_size(c) for c in conditionings ),
+                                  "rows of the conditioning")
+    batch_size    = latent_input["samples"].shape[0]
+    if any( conditioning_batch_size(c) not in (1, batch_size) for c in conditionings ):
+        raise ValueError(f"All the stacked conditionings must have 1 or {batch_size} rows (one per image)")
+
+    # a list of preprocessing steps has one value per image
+    # (the same value for every image is just a regular value)
+    if isinstance(stage2_preproc_steps, (list,tuple)):
+        if len(stage2_preproc_steps) not in (1, batch_size):
+            raise ValueError(f"`stage2_preproc_steps` must be an integer or a list with one value per image ({batch_size})")
+        stage2_preproc_steps = [ int(steps) for steps in stage2_preproc_steps ] * (batch_size // len(stage2_preproc_steps))
+        if len(set(stage2_preproc_steps)) == 1:
+            stage2_preproc_steps = stage2_preproc_steps[0]
+
     # force `stage2_scramble_counts` to be a tuple of 4 integers
+    # (or a list with one tuple per image when there is a seed for each image)
     if not stage2_scramble:
         stage2_scramble_counts = _SCRAMBLE_COUNTS_DISABLED
     elif stage2_scramble_counts is None:
-        stage2_scramble_counts = _SCRAMBLE_COUNTS_MULTIPLE_OF_10 if (seed % 10) == 0 else \
-                                 _SCRAMBLE_COUNTS_EVEN_SEED      if (seed %  2) == 0 else \
-                                 _SCRAMBLE_COUNTS_DEFAULT
+        stage2_scramble_counts = [ _default_scramble_counts(s) for s in seed ] if isinstance(seed, list) else \
+                                 _default_scramble_counts(seed)
 
 
     # get the sigmas for the 3 stages from the preset name ("alpha" or "bravo")
-    sigma_preset = SIGMA_PRESETS_BY_NAME.get(sigma_preset_name) if sigma_preset_name else None
-    if not sigma_preset:
-        sigma_preset = SIGMA_PRESETS_BY_NAME["alpha"]
-    if len(sigma_preset) != 7:
-        raise ValueError(f"Sigma presets must have 7 elements but the \"{sigma_preset_name}\" preset has {len(sigma_preset)} elements")
-    index   = min(max( 3, steps), 9 ) - 3
-    sigmas1 = list(sigma_preset[index][0])
-    sigmas2 = list(sigma_preset[index][1])
-    sigmas3 = list(sigma_preset[index][2])
-
-    # when the number of steps is greater than 9, the same 9-step sigma
-    # sequence is used, but the Stage 2 and Stage 3 are refined to match
-    # the required number of steps
-    if steps>9:
-        additional_steps = (steps-9)
-        n1 = int( 0.4 + 0.6 * additional_steps )
-        n2 = additional_steps - n1
-        sigmas2 = refine_sigma_sequence(sigmas2, n1)
-        sigmas3 = refine_sigma_sequence(sigmas3, n2)
+    sigmas1, sigmas2, sigmas3 = _preset_sigmas(sigma_preset_name, steps)
 
     # add the values of sigmas_offset to each sigma in the 3 lists
     if sigma_offsets:
@@ -227,30 +474,176 @@ def zsampler_turbo_core(latent_input             : ComfyLatent,
     elif isinstance(noise_est_sample_size, (int,float)):
         sample_size = int(noise_est_sample_size)
 
-    # execute the 3-stage denoising process
-    return execute_3_stage_denoising(latent_input, model, positive, negative,
-                                     seed                     = seed,
-                                     cfg                      = 1.0,
-                                     samplers                 = sampler_objs,
-                                     sigmas1                  = sigmas1,
-                                     sigmas2                  = sigmas2,
-                                     sigmas3                  = sigmas3,
-                                     sigma_limits             = sigma_limits,
-                                     sigma_step_range         = sigma_step_range,
-                                     start_with_noise         = start_with_noise,
-                                     end_with_denoise         = end_with_denoise,
-                                     positive_stg2_preproc    = positive_stg2_preproc,
-                                     positive_stg2            = positive_stg2,
-                                     positive_stg3            = positive_stg3,
-                                     initial_noise_bias_level = initial_noise_bias_level,
-                                     initial_noise_overdose   = initial_noise_overdose,
-                                     noise_est_sample_size    = sample_size,
-                                     extra_noise_scales       = extra_noise_scales,
-                                     extra_noise_freqs        = extra_noise_freqs,
-                                     stage2_scramble_counts   = stage2_scramble_counts,
-                                     stage2_preproc_steps     = stage2_preproc_steps,
-                                     progress_preview = progress_preview,
-                                     )
+    # with the "predicted" source, the noise bias predictor replaces the estimation pass
+    if options.noise_bias_source not in NOISE_BIAS_SOURCES:
+        raise ValueError(f"Unknown noise bias source '{options.noise_bias_source}', expected one of {NOISE_BIAS_SOURCES}")
+    noise_bias_predictor = load_noise_bias_predictor() if options.noise_bias_source == "predicted" else None
+
+    # when the batch is a slice of a larger logical batch, the sub-seeds
+    # of its images are shifted to their global positions
+    # (with a list of seeds, each image is already identified by its own seed)
+    original_latent = latent_input
+    if options.batch_offset is not None and not isinstance(seed, list):
+        latent_input = _offset_batch_subseeds(latent_input, options.batch_offset)
+
+    # in cropped inpainting mode only the region around the noise mask is denoised,
+    # the rest of the latent is outside the mask and remains unchanged anyway
+    crop_box = None
+    if options.inpaint_crop_margin is not None and latent_input.get("noise_mask") is not None:
+        latent_input, crop_box = _crop_to_noise_mask(latent_input, options.inpaint_crop_margin)
+        if crop_box is not None:
+            logger.debug(f"Z-Sampler Turbo: inpainting the region {crop_box} (top, left, bottom, right) "
+                         f"of a latent of {tuple(original_latent['samples'].shape[-2:])}")
+
+    # images of the batch sharing the same seed, sub-seed, latent and mask
+    # always produce the same result, so only the unique ones are denoised
+    unique_rows, inverse = _unique_batch_rows(latent_input, [positive, positive_stg2_preproc, positive_stg2, positive_stg3],
+                                              batch_seeds = seed if isinstance(seed, list) else None)
+    if unique_rows is not None:
+        logger.debug(f"Z-Sampler Turbo: denoising {len(unique_rows)} unique images of a batch of {len(inverse)}")
+        latent_input           = _select_batch_rows(latent_input, unique_rows)
+        seed                   = _select_rows(seed, unique_rows)
+        stage2_scramble_counts = _select_rows(stage2_scramble_counts, unique_rows)
+        stage2_preproc_steps   = _select_rows(stage2_preproc_steps, unique_rows)
+        positive, positive_stg2_preproc, positive_stg2, positive_stg3 = \
+            ( select_conditioning_rows(c, unique_rows, batch_size) for c in conditionings )
+        batch_size = len(unique_rows)
+
+    # split the batch into micro-batches that fit within the memory budget,
+    # each one keeps the seeds/sub-seeds of its images so the noise does not change
+    # (images with a different number of preprocessing steps never share a micro-batch)
+    micro_batches = _split_into_micro_batches(latent_input, model, options.batch_memory_mb,
+                                              per_image_seeds = isinstance(seed, list),
+                                              rows_per_image  = num_variations,
+                                              row_groups      = stage2_preproc_steps if isinstance(stage2_preproc_steps, list) else None)
+    if len(micro_batches) > 1:
+        logger.debug(f"Z-Sampler Turbo: batch of {latent_input['samples'].shape[0]} images split "
+                     f"into {len(micro_batches)} micro-batches (budget: {options.batch_memory_mb} MB)")
+
+    # the wall time of each section is always recorded for the metrics, while the
+    # detailed profile is taken only when requested (or when the debug messages are shown)
+    profile = options.profile
+    if profile is None:
+        profile = logger.isEnabledFor(logging.DEBUG)
+    if profiler is None:
+        profiler = SamplingProfiler(detailed=profile)
+
+    # execute the 3-stage denoising process on each micro-batch
+    output_samples: list[torch.Tensor] = []
+    outcome = "completed"
+    for chunk_index, (latent_chunk, rows) in enumerate(micro_batches):
+        profiler.micro_batch = chunk_index
+        chunk_preview = progress_preview if len(micro_batches) == 1 else \
+                        ProgressPreview(100, parent=(progress_preview, 100*chunk_index/len(micro_batches),
+                                                                       100*(chunk_index+1)/len(micro_batches)))
+        chunk_positive, chunk_positive_stg2_preproc, chunk_positive_stg2, chunk_positive_stg3 = \
+            ( select_conditioning_rows(c, rows, batch_size) for c in (positive, positive_stg2_preproc, positive_stg2, positive_stg3) )
+        try:
+            chunk_output = execute_3_stage_denoising(latent_chunk, model, chunk_positive, chunk_positive,
+                                                     seed                     = _select_rows(seed, rows),
+                                                     cfg                      = 1.0,
+                                                     samplers                 = sampler_objs,
+                                                     sigmas1                  = sigmas1,
+                                                     sigmas2                  = sigmas2,
+                                                     sigmas3                  = sigmas3,
+                                                     sigma_limits             = sigma_limits,
+                                                     sigma_step_range         = sigma_step_range,
+                                                     start_with_noise         = start_with_noise,
+                                                     end_with_denoise         = end_with_denoise,
+                                                     positive_stg2_preproc    = chunk_positive_stg2_preproc,
+                                                     positive_stg2            = chunk_positive_stg2,
+                                                     positive_stg3            = chunk_positive_stg3,
+                                                     initial_noise_bias_level = initial_noise_bias_level,
+                                                     initial_noise_overdose   = initial_noise_overdose,
+                                                     noise_est_sample_size    = sample_size,
+                                                     noise_bias_predictor     = noise_bias_predictor,
+                                                     extra_noise_scales       = extra_noise_scales,
+                                                     extra_noise_freqs        = extra_noise_freqs,
+                                                     stage2_scramble_counts   = _select_rows(stage2_scramble_counts, rows),
+                                                     stage2_preproc_steps     = stage2_preproc_steps[rows[0]] if isinstance(stage2_preproc_steps, list) \
+                                                                                else stage2_preproc_steps,
+                                                     options                  = options,
+                                                     cancel_token             = cancel_token,
+                                                     profiler                 = profiler,
+                                                     progress_preview = chunk_preview,
+                                                     )
+        except GenerationCancelled as cancelled:
+            if not options.return_draft_on_cancel or (cancelled.latent is None and not output_samples):
+                _record_metrics(profiler, "cancelled", steps=steps)
+                if cancel_token is not None and cancel_token.interrupted:
+                    raise comfy.model_management.InterruptProcessingException() from cancelled
+                raise
+            logger.warning(f"Z-Sampler Turbo: generation cancelled, returning the draft of stage {cancelled.stage} "
+                           f"for micro-batch {chunk_index+1} of {len(micro_batches)}")
+            output_samples.extend( _draft_samples(model, micro_batches[chunk_index:], cancelled.latent, num_variations) )
+            outcome = "draft"
+            break
+        output_samples.append( chunk_output["samples"] )
+
+    # gather the results, scattering the unique images back to the original batch order
+    # (with stage 3 variations, each image is followed by all of its variations)
+    samples = torch.cat(output_samples) if len(output_samples) > 1 else output_samples[0]
+    chunks_rows = [ row for _, rows in micro_batches for row in rows ]
+    if chunks_rows != sorted(chunks_rows):
+        position = { row: index for index, row in enumerate(chunks_rows) }
+        rows     = [ position[row] * num_variations + k for row in range(len(chunks_rows)) for k in range(num_variations) ]
+        samples  = samples[ torch.tensor(rows, device=samples.device) ]
+    if unique_rows is not None:
+        rows    = [ index * num_variations + k for index in inverse for k in range(num_variations) ]
+        samples = samples[ torch.tensor(rows, device=samples.device) ]
+    if num_variations > 1:
+        original_batch_size = original_latent["samples"].shape[0]
+        original_latent = _select_batch_rows(original_latent, [ row for row in range(original_batch_size)
+                                                                    for _ in range(num_variations) ])
+    if crop_box is not None:
+        top, left, bottom, right = crop_box
+        full_samples = comfy.sample.fix_empty_latent_channels(model, original_latent["samples"])
+        full_samples = full_samples.to(device=samples.device, dtype=samples.dtype, copy=True)
+        full_samples[..., top:bottom, left:right] = samples
+        samples = full_samples
+    latent_output = original_latent.copy()
+    latent_output["samples"] = samples
+    if profile:
+        latent_output[PROFILE_LATENT_KEY] = profiler.records
+        logger.debug(f"Z-Sampler Turbo profile:\n{profiler.summary()}")
+    _record_metrics(profiler, outcome, steps=steps, batch_size=samples.shape[0])
+    return latent_output
+
+
+def count_model_evaluations(steps: int,
+                            *,
+                            sigma_preset_name   : str | None                              = None,
+                            sigma_limits        : tuple[float,float] | list[float] | None = None,
+                            noise_estimation    : bool                                    = True,
+                            stage2_preproc_steps: int                                     = 0,
+                            ) -> int:
+    """
+    Returns the number of model evaluations performed by `zsampler_turbo_core(..)`.
+
+    The count assumes samplers with one model evaluation per step (e.g. "euler")
+    and an initial noise estimation that is not found in the cache.
+
+    Args:
+        steps               : The total number of denoising steps.
+        sigma_preset_name   : Name of the predefined sigma schedule (e.g. "alpha", "bravo").
+        sigma_limits        : Optional tuple with minimum and maximum limits for sigma values.
+        noise_estimation    : `True` if the initial noise is estimated (non-zero noise bias level).
+        stage2_preproc_steps: Number of steps performed as preprocessing in the second stage.
+    Returns:
+        The number of times the model is evaluated for each image of the batch.
+    """
+    sigmas = [ torch.tensor(s) for s in _preset_sigmas(sigma_preset_name, steps) ]
+    truncated_sigmas = [ truncate_sigmas_by_value_range(s, sigma_limits) if sigma_limits else s for s in sigmas ]
+    evaluations = sum( _num_steps(s) for s in truncated_sigmas )
+
+    # the initial noise is estimated only when stage 1 starts from the beginning,
+    # and stage 2 (along with its preprocessing) disappears when inpainting
+    if noise_estimation and truncated_sigmas[0] is not None and bool(truncated_sigmas[0][0] == sigmas[0][0]):
+        evaluations += 1
+    is_inpainting = sigma_limits is not None and max(sigma_limits[0], sigma_limits[1]) < 1.0
+    if truncated_sigmas[1] is not None and not is_inpainting:
+        evaluations += stage2_preproc_steps
+    return evaluations
 
 
 def execute_3_stage_denoising(comfy_latent: ComfyLatent,
@@ -258,7 +651,7 @@ def execute_3_stage_denoising(comfy_latent: ComfyLatent,
                               positive    : ComfyConditioning,
                               negative    : ComfyConditioning,
                               *,
-                              seed                    : int,
+                              seed                    : int | list[int],
                               cfg                     : float,
                               samplers                : tuple[KSAMPLER, ...],
                               sigmas1                 : torch.Tensor | list | tuple | None,
@@ -274,10 +667,14 @@ def execute_3_stage_denoising(comfy_latent: ComfyLatent,
                               initial_noise_bias_level: float                                   = 0.0,
                               initial_noise_overdose  : float                                   = 0.0,
                               noise_est_sample_size   : tuple[int,int] | int | None             = None,
+                              noise_bias_predictor    : NoiseBiasPredictor | None               = None,
                               extra_noise_freqs       : tuple[int  ,...]                        = (  0,   0,   0),
                               extra_noise_scales      : tuple[float,...]                        = (0.0, 0.0, 0.0),
-                              stage2_scramble_counts  : tuple[int,int,int,int]                  = (0,0,0,0),
+                              stage2_scramble_counts  : tuple[int,int,int,int] | list[tuple]    = (0,0,0,0),
                               stage2_preproc_steps    : int                                     = 0,
+                              options                 : SamplingOptions                         = SamplingOptions(),
+                              cancel_token            : CancellationToken | None                = None,
+                              profiler                : SamplingProfiler | None                 = None,
                               progress_preview        : ProgressPreview,
                               ):
     """
@@ -289,7 +686,8 @@ def execute_3_stage_denoising(comfy_latent: ComfyLatent,
         model                   : ComfyUI MODEL obj representing the model to use for denoising.
         positive                : Positive prompt/conditioning applied to the model during denoising.
         negative                : Negative prompt/conditioning applied to the model during denoising.
-        seed                    : Seed for the deterministic RNG used throughout the denoising process.
+        seed                    : Seed for the deterministic RNG used throughout the denoising process,
+                                   or a list with one seed for each image in the batch.
         cfg                     : Classifier-free guidance scale that controls the influence of negative prompts.
                                    A value of 1.0 means the negative prompt has no effect on generation.
         sampler                 : ComfyUI object representing the sampler used for each denoising step.
@@ -321,6 +719,8 @@ def execute_3_stage_denoising(comfy_latent: ComfyLatent,
         noise_est_sample_size   : Size in pixels of the sample for initial noise estimation.
                                    Can be a tuple (width, height) or integer for square sizes.
                                    If `None`, the size of the latent input will be used.
+        noise_bias_predictor    : Optional `NoiseBiasPredictor` used to predict the initial noise features
+                                   instead of estimating them with the model. If `None` (default), they are estimated.
         extra_noise_freqs       : Optional frequencies at which additional noise is injected into the latent image
                                    during each stage. The first two values correspond to stage1 and stage2, while all
                                    following values correspond to stage3.
@@ -337,15 +737,26 @@ def execute_3_stage_denoising(comfy_latent: ComfyLatent,
                                    positive values add normal fragments from that side, while negative values add
                                    randomly flipped fragments.
                                    If this parameter is (0,0,0,0) (default), no scrambling is performed.
+                                   A list with one tuple for each image in the batch can also be provided.
         stage2_preproc_steps    : Optional number of steps to be performed as preprocessing in the second stage.
                                    This can improve coherence and reduce hallucinations.
                                    If zero (default), no preprocessing is performed.
+        options                 : Options of the sampling engine, see `SamplingOptions`. The options that only
+                                   affect how `zsampler_turbo_core(..)` prepares the batch (noise bias source,
+                                   micro-batches, batch offset, cropped inpainting, drafts and profile) are ignored.
+        cancel_token            : Optional `CancellationToken` checked between every sampling call.
+        profiler                : Optional `SamplingProfiler` where each section of the process is recorded.
         progress_preview        : A `ProgressPreview` object for displaying progress during the denoising process.
     Returns:
         A dictionary with the updated latent image data after all three denoising stages.
+    Raises:
+        GenerationCancelled: If `cancel_token` was cancelled, carrying the latent of the last stage
+                             that ended noise-free (upscaled to the full size) as a draft.
     """
     SIGMA_START     = 1.0
     DEFAULT_SAMPLER = samplers[0] #<< should `DEFAULT_SAMPLER` be fixed to euler?
+    if profiler is None:
+        profiler = _DISABLED_PROFILER
 
     # force all conditioning to be valid
     #  - if positive cond for stage-2-preprocessing is not provided, it will be the same as main conditioning
@@ -364,7 +775,7 @@ def execute_3_stage_denoising(comfy_latent: ComfyLatent,
         sigmas3 = torch.tensor(sigmas3, device='cpu')
 
     # enable scrambling and coherence pre-processing only when non-empty counts are provided
-    is_stg2_scramble_enabled = any(stage2_scramble_counts)
+    is_stg2_scramble_enabled = _has_scramble(stage2_scramble_counts)
     is_stg2_preproc_enabled  = stage2_preproc_steps > 0
 
     # typically, stage1 and stage2 should operate as a single continuous
@@ -411,6 +822,29 @@ def execute_3_stage_denoising(comfy_latent: ComfyLatent,
         sigmas1 = merge_sigmas(sigmas1, sigmas2)
         sigmas2 = None
 
+    # in multi-resolution mode, stages 1 and 2 compose the image on a downscaled
+    # latent and stage 3 re-noises and refines the upscaled result at full size;
+    # this requires starting from pure noise and re-noising from the top of stage 3
+    full_size_latent = None
+    if options.composition_scale < 1.0:
+        if (sigmas1 is None and sigmas2 is None) or sigmas3 is None \
+           or not (start_with_noise and stage1_starts_from_beginning and stage3_start_from_beginning) \
+           or comfy_latent.get("noise_mask") is not None or comfy_latent["samples"].ndim != 4:
+            logger.debug(f"Z-Sampler Turbo: composition scale {options.composition_scale} ignored, it requires a "
+                          "generation from pure noise with all the stages and no noise mask")
+        else:
+            full_size_latent = comfy_latent
+            comfy_latent     = comfy_latent.copy()
+            comfy_latent["samples"] = _downscale_latent_samples(full_size_latent["samples"], options.composition_scale)
+            logger.debug(f"Z-Sampler Turbo: composing at {tuple(comfy_latent['samples'].shape[-2:])}, "
+                         f"refining at {tuple(full_size_latent['samples'].shape[-2:])}")
+
+
+    # the tiled stages evaluate the model on tiles of `options.tile_size` pixels (converted to latent pixels)
+    latent_tile_size    = (options.tile_size // 8, options.tile_size // 8) if options.tile_size > 0 else None
+    latent_tile_overlap = options.tile_overlap // 8
+    stage2_tile_size    = latent_tile_size if 2 in options.tiled_stages else None
+    stage3_tile_size    = latent_tile_size if 3 in options.tiled_stages else None
 
     # calculate the progress level for each step
     progE = 0
@@ -420,95 +854,311 @@ def execute_3_stage_denoising(comfy_latent: ComfyLatent,
     total = prog3 + _num_steps(sigmas3)
 
 
-    #-- ESTIMATE THE INITIAL NOISE -----------------------
-
-    initial_noise_scale = 1.0
-    initial_noise_bias  = 0.0
-
-    # the initial noise scale is directly controlled by the user through the
-    # `initial_noise_overdose` parameter; adding extra noise at the beginning
-    # generally helps generate images with more vivid colors or pronounced contrasts.
-    initial_noise_scale += initial_noise_overdose
-
-    # estimate the initial noise bias, which represents a shift in the mean noise values;
-    # since any sigma sequence in this sampler starts with values below 1.0, using this
-    # modified initial noise bias can introduce low-frequency components necessary for
-    # the denoising process to be effective.
-    # this calculation is performed only if the generation starts from pure noise and the
-    # user has specified a non-zero level for the initial noise bias.
-    if stage1_starts_from_beginning and (initial_noise_bias_level != 0):
-        if sigmas1 is not None:
-            bias, scale = estimate_initial_noise_features(
-                            comfy_latent, model, positive, negative,
-                            seed         = seed,
-                            sampler      = samplers[0] if len(samplers) > 0 else DEFAULT_SAMPLER,
-                            sigmas       = [SIGMA_START, sigmas1[0]],
-                            sample_size  = noise_est_sample_size,
-                            sample_bias  = 0.0,
-                            sample_scale = 1.0,
+    # the latents resulting from the stages are stored in the stage-prefix cache (stages 1 and 2, in memory)
+    # and in the checkpoints (all the stages, on disk); each key contains everything the stage depends on
+    # (including the previous stages)
+    stage1_inputs = ( positive, negative,
+                      comfy_latent.get("samples"), comfy_latent.get("noise_mask"), comfy_latent.get("batch_index"),
+                      seed, options.noise_generator, options.noise_device, cfg, start_with_noise, end_with_denoise, force_denoise_stg1_stg2,
+                      sigmas1, (sigmas2 is None and sigmas3 is None), stage1_starts_from_beginning,
+                      initial_noise_bias_level, initial_noise_overdose, noise_est_sample_size,
+                      noise_bias_predictor.digest if noise_bias_predictor is not None else None,
+                      samplers[0], extra_noise_freqs[0], extra_noise_scales[0],
+                      options.composition_scale if full_size_latent is not None else 1.0 )
+    stage2_inputs = ( positive_stg2, positive_stg2_preproc, sigmas2, (sigmas3 is None), samplers[1],
+                      extra_noise_freqs[1], extra_noise_scales[1],
+                      stage2_scramble_counts if is_stg2_scramble_enabled else None,
+                      stage2_preproc_steps   if is_stg2_preproc_enabled  else None,
+                      (stage2_tile_size, latent_tile_overlap) if stage2_tile_size else None )
+    stage3_inputs = ( positive_stg3, sigmas3, samplers[2] if len(samplers) > 2 else DEFAULT_SAMPLER,
+                      extra_noise_freqs[2:], extra_noise_scales[2:], options.stage3_variations,
+                      stage3_start_from_beginning, end_with_denoise,
+                      (stage3_tile_size, latent_tile_overlap) if stage3_tile_size else None, options.stage3_early_exit,
+                      full_size_latent["samples"] if full_size_latent is not None else None )
+    stage1_key, stage2_key = None, None
+    if options.stage_cache_mb > 0:
+        _STAGE_PREFIX_CACHE.set_limits(max_bytes=options.stage_cache_mb*1024*1024)
+        stage1_key = _stage_cache_key("stage1", model, *stage1_inputs)
+        stage2_key = None if stage1_key is None else \
+                     _stage_cache_key("stage2", model, stage1_key, *stage2_inputs)
+    elif len(_STAGE_PREFIX_CACHE) > 0:
+        _STAGE_PREFIX_CACHE.clear()
+
+    checkpoints     = StageCheckpoints(options.checkpoint_dir) if options.checkpoint_dir else None
+    checkpoint_keys = _checkpoint_keys(model, stage1_inputs, stage2_inputs, stage3_inputs) if checkpoints else (None, None, None)
+    checkpoint_info = { "seed"           : seed,
+                        "batch_index"    : comfy_latent.get("batch_index"),
+                        "noise_generator": options.noise_generator,
+                        "noise_device"   : options.noise_device,
+                        "sigmas"         : { f"stage{i+1}": sigmas.tolist() if sigmas is not None else None
+                                             for i, sigmas in enumerate((sigmas1, sigmas2, sigmas3)) } }
+
+    # a generation whose final stage was checkpointed is restored without sampling
+    # (the sampling session is not opened for it, so the model is not even loaded)
+    final_stage = 3 if sigmas3 is not None else 2 if sigmas2 is not None else 1
+    restored    = None
+    if checkpoints is not None:
+        profiler.start("restore")
+        restored = _load_stage_checkpoint(checkpoints, checkpoint_keys[final_stage-1])
+        profiler.stop(restored[0] if restored is not None else None)
+
+    # all the stages are sampled within a single session, so the model and
+    # the conditionings are prepared only once for the whole generation
+    # (for the largest latent evaluated by the model at once, considering the
+    #  downscaled composition, the tiled stages and the stage 3 variations)
+    stage12_shape = comfy.sample.fix_empty_latent_channels(model, comfy_latent["samples"]).shape
+    stage3_shape  = stage12_shape
+    if full_size_latent is not None:
+        stage3_shape = (*stage12_shape[:-2], *full_size_latent["samples"].shape[-2:])
+    if options.stage3_variations:
+        stage3_shape = (stage3_shape[0] * len(options.stage3_variations), *stage3_shape[1:])
+    model_shapes = [ stage12_shape if sigmas1 is not None else None,
+                     _tiled_shape(stage12_shape, stage2_tile_size) if sigmas2 is not None else None,
+                     _tiled_shape(stage3_shape , stage3_tile_size) if sigmas3 is not None else None ]
+    noise_shape  = max( (shape for shape in model_shapes if shape is not None), key=math.prod, default=stage3_shape )
+    session = SamplingSession(model, [positive, negative, positive_stg2_preproc, positive_stg2, positive_stg3],
+                              noise_shape = noise_shape,
+                              cfg         = cfg,
+                              enabled     = options.use_sampling_session and restored is None)
+    # the cancellation is checked between every sampling call, keeping the
+    # latent of the last noise-free stage as a draft for a cancelled generation
+    cancellation = _CancellationScope(cancel_token,
+                                      draft_size = full_size_latent["samples"].shape[-2:] if full_size_latent else None)
+    start_time = time.perf_counter()
+    with session, cancellation:
+        session_state = "on" if session.is_open else "off"
+
+        #-- RESUME FROM THE CACHE OR THE CHECKPOINTS ---------
+
+        initial_noise_scale = 1.0
+        initial_noise_bias  = 0.0
+
+        # `resumed_stage` is the last stage whose resulting latent was found
+        # in the stage-prefix cache or in the checkpoints
+        resumed_stage      = 0
+        checkpointed_stage = 0
+        if restored is not None:
+            logger.info(f"Z-Sampler Turbo: restored the result of stage {final_stage} from its checkpoint in '{options.checkpoint_dir}'")
+            if final_stage == 3 and full_size_latent is not None:
+                comfy_latent = full_size_latent
+            if final_stage == 3 and options.stage3_variations:
+                batch_size   = comfy_latent["samples"].shape[0]
+                comfy_latent = _select_batch_rows(comfy_latent, [ row for row in range(batch_size) for _ in options.stage3_variations ])
+            comfy_latent = comfy_latent.copy()
+            comfy_latent["samples"] = restored[0]
+            resumed_stage = checkpointed_stage = final_stage
+        else:
+            for stage, key, checkpoint_key in ((2, stage2_key, checkpoint_keys[1]), (1, stage1_key, checkpoint_keys[0])):
+                cached, source = _STAGE_PREFIX_CACHE.get(key) if key is not None else None, f"cache {_STAGE_PREFIX_CACHE.stats()}"
+                if cached is None:
+                    cached, source = _load_stage_checkpoint(checkpoints, checkpoint_key), f"checkpoint in '{options.checkpoint_dir}'"
+                if cached is not None:
+                    samples, initial_noise_bias = cached
+                    comfy_latent  = comfy_latent.copy()
+                    comfy_latent["samples"] = samples.to(comfy_latent["samples"].device)
+                    resumed_stage = stage
+                    cancellation.completed(stage, comfy_latent,
+                                           is_denoised = _ends_noise_free(sigmas2 if stage == 2 else sigmas1) or
+                                                         (stage == 1 and force_denoise_stg1_stg2))
+                    logger.debug(f"Z-Sampler Turbo: resuming after stage {stage} from {source}")
+                    break
+
+        #-- ESTIMATE THE INITIAL NOISE -----------------------
+
+        # the initial noise scale is directly controlled by the user through the
+        # `initial_noise_overdose` parameter; adding extra noise at the beginning
+        # generally helps generate images with more vivid colors or pronounced contrasts.
+        initial_noise_scale += initial_noise_overdose
+
+        # estimate the initial noise bias, which represents a shift in the mean noise values;
+        # since any sigma sequence in this sampler starts with values below 1.0, using this
+        # modified initial noise bias can introduce low-frequency components necessary for
+        # the denoising process to be effective.
+        # this calculation is performed only if the generation starts from pure noise and the
+        # user has specified a non-zero level for the initial noise bias.
+        if resumed_stage < 1 and stage1_starts_from_beginning and (initial_noise_bias_level != 0):
+            if sigmas1 is not None:
+                cancellation.check()
+                if noise_bias_predictor is not None:
+                    profiler.start("prediction")
+                    bias, scale = predict_initial_noise_features(
+                                    comfy_latent, model, positive,
+                                    seed         = seed,
+                                    sigmas       = [SIGMA_START, sigmas1[0]],
+                                    sample_size  = noise_est_sample_size,
+                                    noise_generator = options.noise_generator,
+                                    predictor    = noise_bias_predictor,
+                                    )
+                    profiler.stop()
+                else:
+                    profiler.start("estimation")
+                    bias, scale = estimate_initial_noise_features(
+                                    comfy_latent, model, positive, negative,
+                                    seed         = seed,
+                                    sampler      = samplers[0] if len(samplers) > 0 else DEFAULT_SAMPLER,
+                                    sigmas       = [SIGMA_START, sigmas1[0]],
+                                    sample_size  = noise_est_sample_size,
+                                    sample_bias  = 0.0,
+                                    sample_scale = 1.0,
+                                    noise_generator = options.noise_generator,
+                                    noise_device    = options.noise_device,
+                                    session      = session,
+                                    profiler     = profiler,
+                                    progress_preview = ProgressPreview( 100,
+                                        parent=(progress_preview, 100*progE//total, 100*prog1//total) ),
+                                    )
+                    profiler.stop()
+                initial_noise_bias = (bias / scale).clamp(-0.005, 0.005)
+                initial_noise_bias *= initial_noise_bias_level
+        elif stage1_starts_from_beginning and (initial_noise_bias_level != 0) and sigmas1 is not None:
+            NOISE_ESTIMATIONS.inc(result="skipped")
+
+        #-- THREE-STAGE PROCESS -------------------------------
+        if sigmas1 is not None and resumed_stage < 1:
+            is_first_stage = True
+            is_last_stage  = (sigmas2 is None and sigmas3 is None)
+            force_final_denoise = (is_last_stage and end_with_denoise) or force_denoise_stg1_stg2 or \
+                                  (sigmas2 is None and full_size_latent is not None)
+            cancellation.check()
+            profiler.start("stage1")
+            comfy_latent = _stage1_core(comfy_latent, model, positive, negative,
+                            cfg                 = cfg,
+                            sigmas              = sigmas1,
+                            sampler             = samplers[0] if len(samplers) > 0 else DEFAULT_SAMPLER,
+                            add_noise           = (is_first_stage and start_with_noise),
+                            force_final_denoise = force_final_denoise,
+                            noise_seed          = seed,
+                            noise_scale         = initial_noise_scale,
+                            noise_bias          = initial_noise_bias,
+                            noise_generator     = options.noise_generator,
+                            noise_device        = options.noise_device,
+                            extra_noise_freqs   = extra_noise_freqs [0],
+                            extra_noise_scales  = extra_noise_scales[0],
+                            session             = session,
+                            profiler            = profiler,
+                            progress_preview = ProgressPreview( 100,
+                                parent=(progress_preview, 100*prog1//total, 100*prog2//total)),
+                            )
+            profiler.stop(comfy_latent["samples"])
+            if stage1_key is not None:
+                _STAGE_PREFIX_CACHE.put(stage1_key, (comfy_latent["samples"], initial_noise_bias))
+            if _save_stage_checkpoint(checkpoints, checkpoint_keys[0], 1, comfy_latent["samples"], initial_noise_bias, checkpoint_info):
+                checkpointed_stage = 1
+            cancellation.completed(1, comfy_latent, is_denoised = force_final_denoise or _ends_noise_free(sigmas1))
+
+        if sigmas2 is not None and resumed_stage < 2:
+            is_first_stage = (sigmas1 is None)
+            is_last_stage  = (sigmas3 is None)
+            force_final_denoise = (is_last_stage and end_with_denoise) or (full_size_latent is not None)
+            comfy_latent = _stage2_core(comfy_latent, model, positive_stg2, negative,
+                            cfg                 = cfg,
+                            sigmas              = sigmas2,
+                            sampler             = samplers[1] if len(samplers) > 1 else DEFAULT_SAMPLER,
+                            add_noise           = (is_first_stage and start_with_noise) or force_denoise_stg1_stg2,
+                            force_final_denoise = force_final_denoise,
+                            noise_seed          = offset_seed(seed, 16),
+                            noise_scale         = initial_noise_scale,
+                            noise_bias          = initial_noise_bias,
+                            noise_generator     = options.noise_generator,
+                            noise_device        = options.noise_device,
+                            extra_noise_freqs   = extra_noise_freqs [1],
+                            extra_noise_scales  = extra_noise_scales[1],
+                            scramble_counts     = stage2_scramble_counts if is_stg2_scramble_enabled else (0,0,0,0),
+                            preproc_steps       = stage2_preproc_steps  if is_stg2_preproc_enabled else 0,
+                            preproc_positive    = positive_stg2_preproc,
+                            tile_size           = stage2_tile_size,
+                            tile_overlap        = latent_tile_overlap,
+                            check_cancelled     = cancellation.check,
+                            session             = session,
+                            profiler            = profiler,
+                            progress_preview = ProgressPreview( 100,
+                                parent=(progress_preview, 100*prog2//total, 100*prog3//total)),
+                            )
+            if stage2_key is not None:
+                _STAGE_PREFIX_CACHE.put(stage2_key, (comfy_latent["samples"], initial_noise_bias))
+            if _save_stage_checkpoint(checkpoints, checkpoint_keys[1], 2, comfy_latent["samples"], initial_noise_bias, checkpoint_info):
+                checkpointed_stage = 2
+            cancellation.completed(2, comfy_latent, is_denoised = force_final_denoise or _ends_noise_free(sigmas2))
+
+        # the composed latent is upscaled back to the full size before being refined
+        if full_size_latent is not None and resumed_stage < 3:
+            profiler.start("upscale")
+            samples      = comfy_latent["samples"]
+            comfy_latent = full_size_latent.copy()
+            comfy_latent["samples"] = F.interpolate(samples, size=full_size_latent["samples"].shape[-2:],
+                                                    mode="bicubic", align_corners=False)
+            profiler.stop(comfy_latent["samples"])
+
+        if sigmas3 is not None and resumed_stage < 3:
+            profiler.start("stage3")
+        if sigmas3 is not None and resumed_stage < 3 and options.stage3_variations:
+            is_first_stage = (sigmas1 is None and sigmas2 is None)
+            is_last_stage  = True
+            comfy_latent = _stage3_variations_core(comfy_latent, model, positive_stg3, negative,
+                            variations          = options.stage3_variations,
+                            cfg                 = cfg,
+                            sigmas              = sigmas3,
+                            sampler             = samplers[2] if len(samplers) > 2 else DEFAULT_SAMPLER,
+                            add_noise           = (is_first_stage and start_with_noise) or stage3_start_from_beginning,
+                            force_final_denoise = (is_last_stage  and end_with_denoise),
+                            noise_seed          = [_STAGE3_NOISE_SEED] * len(seed) if isinstance(seed, list) else _STAGE3_NOISE_SEED,
+                            noise_generator     = options.noise_generator,
+                            noise_device        = options.noise_device,
+                            extra_noise_freqs   = extra_noise_freqs [2:],
+                            extra_noise_scales  = extra_noise_scales[2:],
+                            tile_size           = stage3_tile_size,
+                            tile_overlap        = latent_tile_overlap,
+                            early_exit          = options.stage3_early_exit,
+                            check_cancelled     = cancellation.check,
+                            session             = session,
+                            profiler            = profiler,
+                            progress_preview = ProgressPreview( 100,
+                                parent=(progress_preview, 100*prog3//total, 100*total//total)),
+                            )
+
+        elif sigmas3 is not None and resumed_stage < 3:
+            is_first_stage = (sigmas1 is None and sigmas2 is None)
+            is_last_stage  = True
+            cancellation.check()
+            comfy_latent = _stage3_core(comfy_latent, model, positive_stg3, negative,
+                            cfg                 = cfg,
+                            sigmas              = sigmas3,
+                            sampler             = samplers[2] if len(samplers) > 2 else DEFAULT_SAMPLER,
+                            add_noise           = (is_first_stage and start_with_noise) or stage3_start_from_beginning,
+                            force_final_denoise = (is_last_stage  and end_with_denoise),
+                            noise_seed          = [_STAGE3_NOISE_SEED] * len(seed) if isinstance(seed, list) else _STAGE3_NOISE_SEED,
+                            noise_scale         = 1.0,
+                            noise_bias          = 0,
+                            noise_generator     = options.noise_generator,
+                            noise_device        = options.noise_device,
+                            extra_noise_freqs   = extra_noise_freqs [2:],
+                            extra_noise_scales  = extra_noise_scales[2:],
+                            tile_size           = stage3_tile_size,
+                            tile_overlap        = latent_tile_overlap,
+                            early_exit          = options.stage3_early_exit,
+                            session             = session,
+                            profiler            = profiler,
                             progress_preview = ProgressPreview( 100,
-                                parent=(progress_preview, 100*progE//total, 100*prog1//total) ),
+                                parent=(progress_preview, 100*prog3//total, 100*total//total)),
                             )
-            initial_noise_bias = (bias / scale).clamp(-0.005, 0.005)
-            initial_noise_bias *= initial_noise_bias_level
-
-    #-- THREE-STAGE PROCESS -------------------------------
-    if sigmas1 is not None:
-        is_first_stage = True
-        is_last_stage  = (sigmas2 is None and sigmas3 is None)
-        comfy_latent = _stage1_core(comfy_latent, model, positive, negative,
-                        cfg                 = cfg,
-                        sigmas              = sigmas1,
-                        sampler             = samplers[0] if len(samplers) > 0 else DEFAULT_SAMPLER,
-                        add_noise           = (is_first_stage and start_with_noise),
-                        force_final_denoise = (is_last_stage  and end_with_denoise) or force_denoise_stg1_stg2,
-                        noise_seed          = seed,
-                        noise_scale         = initial_noise_scale,
-                        noise_bias          = initial_noise_bias,
-                        extra_noise_freqs   = extra_noise_freqs [0],
-                        extra_noise_scales  = extra_noise_scales[0],
-                        progress_preview = ProgressPreview( 100,
-                            parent=(progress_preview, 100*prog1//total, 100*prog2//total)),
-                        )
-
-    if sigmas2 is not None:
-        is_first_stage = (sigmas1 is None)
-        is_last_stage  = (sigmas3 is None)
-        comfy_latent = _stage2_core(comfy_latent, model, positive_stg2, negative,
-                        cfg                 = cfg,
-                        sigmas              = sigmas2,
-                        sampler             = samplers[1] if len(samplers) > 1 else DEFAULT_SAMPLER,
-                        add_noise           = (is_first_stage and start_with_noise) or force_denoise_stg1_stg2,
-                        force_final_denoise = (is_last_stage  and end_with_denoise),
-                        noise_seed          = seed+16,
-                        noise_scale         = initial_noise_scale,
-                        noise_bias          = initial_noise_bias,
-                        extra_noise_freqs   = extra_noise_freqs [1],
-                        extra_noise_scales  = extra_noise_scales[1],
-                        scramble_counts     = stage2_scramble_counts if is_stg2_scramble_enabled else (0,0,0,0),
-                        preproc_steps       = stage2_preproc_steps  if is_stg2_preproc_enabled else 0,
-                        preproc_positive    = positive_stg2_preproc,
-                        progress_preview = ProgressPreview( 100,
-                            parent=(progress_preview, 100*prog2//total, 100*prog3//total)),
-                        )
-
-    if sigmas3 is not None:
-        is_first_stage = (sigmas1 is None and sigmas2 is None)
-        is_last_stage  = True
-        comfy_latent = _stage3_core(comfy_latent, model, positive_stg3, negative,
-                        cfg                 = cfg,
-                        sigmas              = sigmas3,
-                        sampler             = samplers[2] if len(samplers) > 2 else DEFAULT_SAMPLER,
-                        add_noise           = (is_first_stage and start_with_noise) or stage3_start_from_beginning,
-                        force_final_denoise = (is_last_stage  and end_with_denoise),
-                        noise_seed          = 696969,
-                        noise_scale         = 1.0,
-                        noise_bias          = 0,
-                        extra_noise_freqs   = extra_noise_freqs [2:],
-                        extra_noise_scales  = extra_noise_scales[2:],
-                        progress_preview = ProgressPreview( 100,
-                            parent=(progress_preview, 100*prog3//total, 100*total//total)),
-                        )
+        if sigmas3 is not None and resumed_stage < 3:
+            profiler.stop(comfy_latent["samples"])
+            if _save_stage_checkpoint(checkpoints, checkpoint_keys[2], 3, comfy_latent["samples"], initial_noise_bias, checkpoint_info):
+                checkpointed_stage = 3
+
+        # once the final stage is checkpointed, the checkpoints of the previous stages are no longer needed
+        if checkpoints is not None and checkpointed_stage == final_stage:
+            for key in checkpoint_keys[:final_stage-1]:
+                checkpoints.remove(key)
+
+    # the wall time of the stages is exposed in the metrics, split by whether the model
+    # was prepared once for all of them, so the overhead saved by the session is visible
+    elapsed_time = time.perf_counter() - start_time
+    if session.segment_count > 0:
+        SAMPLER_GENERATION_SECONDS.observe(elapsed_time, session=session_state)
+        SAMPLER_SEGMENTS.inc(session.segment_count, session=session_state)
+    logger.debug(f"Z-Sampler Turbo: {session.segment_count} segments sampled in "
+                 f"{elapsed_time:.3f}s (sampling session: {session_state})")
     return comfy_latent
 
 
@@ -524,11 +1174,15 @@ def _stage1_core(comfy_latent : ComfyLatent,
                  sampler             : comfy.samplers.KSAMPLER,
                  add_noise           : bool,
                  force_final_denoise : bool,
-                 noise_seed          : int,
+                 noise_seed          : int | list[int],
                  noise_scale         : torch.Tensor | float | int = 1.0,
                  noise_bias          : torch.Tensor | float | int = 0.0,
+                 noise_generator     : str                        = "legacy",
+                 noise_device        : str                        = "reproducible",
                  extra_noise_freqs   : tuple[int,...  ] | int     = 0,
                  extra_noise_scales  : tuple[float,...] | float   = 0,
+                 session             : SamplingSession | None     = None,
+                 profiler            : SamplingProfiler | None    = None,
                  progress_preview    : ProgressPreview | None     = None,
                  ) -> ComfyLatent:
 
@@ -545,11 +1199,15 @@ def _stage1_core(comfy_latent : ComfyLatent,
                                    noise_mask          = noise_mask,
                                    noise_seed          = noise_seed,
                                    batch_subseeds      = batch_subseeds,
+                                   noise_generator     = noise_generator,
+                                   noise_device        = noise_device,
                                    extra_noise_freqs   = extra_noise_freqs,
                                    extra_noise_scales  = extra_noise_scales,
                                    fix_empty_latent    = True,
                                    keep_masked_area    = True,
                                    force_final_denoise = force_final_denoise,
+                                   session             = session,
+                                   profiler            = profiler,
                                    progress_preview = progress_preview
                                    )
 
@@ -568,15 +1226,22 @@ def _stage2_core(comfy_latent : ComfyLatent,
                  sampler             : comfy.samplers.KSAMPLER,
                  add_noise           : bool,
                  force_final_denoise : bool,
-                 noise_seed          : int,
+                 noise_seed          : int | list[int],
                  noise_scale         : torch.Tensor | float | int = 1.0,
                  noise_bias          : torch.Tensor | float | int = 0.0,
+                 noise_generator     : str                        = "legacy",
+                 noise_device        : str                        = "reproducible",
                  extra_noise_freqs   : tuple[int,...  ] | int     = 0,
                  extra_noise_scales  : tuple[float,...] | float   = 0,
-                 scramble_counts     : tuple[int,int,int,int]     = (0, 0, 0, 0),
+                 scramble_counts     : tuple[int,int,int,int] | list[tuple] = (0, 0, 0, 0),
                  preproc_steps       : int                        = 0,
                  preproc_positive    : ComfyConditioning | None   = None,
                  preproc_negative    : ComfyConditioning | None   = None,
+                 tile_size           : tuple[int, int] | None     = None,
+                 tile_overlap        : int                        = 0,
+                 check_cancelled     : Callable[[], None] | None  = None,
+                 session             : SamplingSession | None     = None,
+                 profiler            : SamplingProfiler | None    = None,
                  progress_preview    : ProgressPreview | None     = None,
                  ) -> ComfyLatent:
 
@@ -584,6 +1249,12 @@ def _stage2_core(comfy_latent : ComfyLatent,
     noise_mask    : torch.Tensor | None = comfy_latent.get("noise_mask")
     batch_subseeds: list[int]| None     = comfy_latent.get("batch_index")
 
+    # `check_cancelled` is called before every sampling call
+    if check_cancelled is None:
+        check_cancelled = _no_cancellation
+    if profiler is None:
+        profiler = _DISABLED_PROFILER
+
     original_noise_scale = noise_scale
     original_noise_bias  = noise_bias
 
@@ -599,13 +1270,22 @@ def _stage2_core(comfy_latent : ComfyLatent,
 
     # == PRE-PROCESSING 1 ==
     # if requested, scramble the input latent image as a first process
-    if any(scramble_counts):
+    # (with "fast" noise and an open session, the latents are scrambled directly on the compute
+    #  device, where they are moved anyway; otherwise they stay on their device, so the scramble
+    #  is reproducible like the noise)
+    if _has_scramble(scramble_counts):
+        profiler.start("stage2.scramble")
+        if noise_device == "fast" and session is not None and session.is_open:
+            latents = latents.to(session.device)
         latents = scramble_tensor(latents, scramble_counts, seed=noise_seed)
+        profiler.stop(latents)
 
     # == PRE-PROCESSING 2 ==
     # if requested, run preprocess sampling steps with high sigmas (0.949)
     # to try and give more coherence to the image
     for i in range(preproc_steps):
+        check_cancelled()
+        profiler.start(f"stage2.preproc{i+1}")
         latents = _iterative_denoising(latents, model, preproc_positive, preproc_negative,
                                        cfg                 = cfg,
                                        sigmas              = torch.tensor( (0.949, 0.000 ) ) if i==0 else sigmas[:2],
@@ -613,16 +1293,23 @@ def _stage2_core(comfy_latent : ComfyLatent,
                                        noise_scale         = original_noise_scale if add_noise else 0,
                                        noise_bias          = original_noise_bias  if add_noise else 0,
                                        noise_mask          = noise_mask,
-                                       noise_seed          = noise_seed + i,
+                                       noise_seed          = offset_seed(noise_seed, i),
                                        batch_subseeds      = batch_subseeds,
+                                       noise_generator     = noise_generator,
+                                       noise_device        = noise_device,
                                        extra_noise_freqs   = 1024 if i==0 else 0,  # 64
                                        extra_noise_scales  =  0.8 if i==0 else 0,  # 4.0
                                        fix_empty_latent    = True,
                                        keep_masked_area    = True,
                                        force_final_denoise = True,
+                                       tile_size           = tile_size,
+                                       tile_overlap        = tile_overlap,
+                                       session             = session,
+                                       profiler            = profiler,
                                        progress_preview    = ProgressPreview(100,
                                             parent=(progress_preview, 100*prog[i]/total, 100*prog[i+1]/total))
                                        )
+        profiler.stop(latents)
         # after the first iteration,
         # all other iterations (including the one outside the loop) should add noise
         add_noise   = True
@@ -631,6 +1318,8 @@ def _stage2_core(comfy_latent : ComfyLatent,
 
     # == DEFAULT SAMPLING ==
     # always run the sampler using the original sigmas
+    check_cancelled()
+    profiler.start("stage2")
     latents = _iterative_denoising(latents, model, positive, negative,
                                     cfg                 = cfg,
                                     sigmas              = sigmas,
@@ -638,16 +1327,23 @@ def _stage2_core(comfy_latent : ComfyLatent,
                                     noise_scale         = noise_scale if add_noise else 0,
                                     noise_bias          = noise_bias  if add_noise else 0,
                                     noise_mask          = noise_mask,
-                                    noise_seed          = noise_seed + preproc_steps,
+                                    noise_seed          = offset_seed(noise_seed, preproc_steps),
                                     batch_subseeds      = batch_subseeds,
+                                    noise_generator     = noise_generator,
+                                    noise_device        = noise_device,
                                     extra_noise_freqs   = extra_noise_freqs,
                                     extra_noise_scales  = extra_noise_scales,
                                     fix_empty_latent    = True,
                                     keep_masked_area    = True,
                                     force_final_denoise = force_final_denoise,
+                                    tile_size           = tile_size,
+                                    tile_overlap        = tile_overlap,
+                                    session             = session,
+                                    profiler            = profiler,
                                     progress_preview    = ProgressPreview(100,
                                             parent=(progress_preview, 100*prog[-2]/total, 100*prog[-1]/total))
                                     )
+    profiler.stop(latents)
     out = comfy_latent.copy()
     out["samples"] = latents
     return out
@@ -663,11 +1359,18 @@ def _stage3_core(comfy_latent : ComfyLatent,
                  sampler             : comfy.samplers.KSAMPLER,
                  add_noise           : bool,
                  force_final_denoise : bool,
-                 noise_seed          : int,
+                 noise_seed          : int | list[int],
                  noise_scale         : torch.Tensor | float | int = 1.0,
                  noise_bias          : torch.Tensor | float | int = 0.0,
+                 noise_generator     : str                        = "legacy",
+                 noise_device        : str                        = "reproducible",
                  extra_noise_freqs   : tuple[int,...  ] | int     = 0,
                  extra_noise_scales  : tuple[float,...] | float   = 0,
+                 tile_size           : tuple[int, int] | None     = None,
+                 tile_overlap        : int                        = 0,
+                 early_exit          : float                      = 0.0,
+                 session             : SamplingSession | None     = None,
+                 profiler            : SamplingProfiler | None    = None,
                  progress_preview    : ProgressPreview | None     = None,
                  ) -> ComfyLatent:
 
@@ -684,11 +1387,18 @@ def _stage3_core(comfy_latent : ComfyLatent,
                                    noise_mask          = noise_mask,
                                    noise_seed          = noise_seed,
                                    batch_subseeds      = batch_subseeds,
+                                   noise_generator     = noise_generator,
+                                   noise_device        = noise_device,
                                    extra_noise_freqs   = extra_noise_freqs,
                                    extra_noise_scales  = extra_noise_scales,
                                    fix_empty_latent    = False,
                                    keep_masked_area    = True,
                                    force_final_denoise = force_final_denoise,
+                                   tile_size           = tile_size,
+                                   tile_overlap        = tile_overlap,
+                                   early_exit          = early_exit,
+                                   session             = session,
+                                   profiler            = profiler,
                                    progress_preview = progress_preview
                                    )
     comfy_latent = comfy_latent.copy()
@@ -696,6 +1406,94 @@ def _stage3_core(comfy_latent : ComfyLatent,
     return comfy_latent
 
 
+def _stage3_variations_core(comfy_latent : ComfyLatent,
+                            model        : ComfyModel,
+                            positive     : ComfyConditioning,
+                            negative     : ComfyConditioning,
+                            *,
+                            variations          : list[Stage3Variation],
+                            cfg                 : float,
+                            sigmas              : torch.Tensor,
+                            sampler             : comfy.samplers.KSAMPLER,
+                            add_noise           : bool,
+                            force_final_denoise : bool,
+                            noise_seed          : int | list[int],
+                            noise_generator     : str                        = "legacy",
+                            noise_device        : str                        = "reproducible",
+                            extra_noise_freqs   : tuple[int,...  ] | int     = 0,
+                            extra_noise_scales  : tuple[float,...] | float   = 0,
+                            tile_size           : tuple[int, int] | None     = None,
+                            tile_overlap        : int                        = 0,
+                            early_exit          : float                      = 0.0,
+                            check_cancelled     : Callable[[], None] | None  = None,
+                            session             : SamplingSession | None     = None,
+                            profiler            : SamplingProfiler | None    = None,
+                            progress_preview    : ProgressPreview | None     = None,
+                            ) -> ComfyLatent:
+    """
+    Runs the third stage once per variation on copies of the latent resulting from stage 2.
+
+    The variations sharing the same sampler and extra noise are refined together in
+    a single batch where each row carries its own noise seed. The returned latent
+    contains all the variations of each image one after another.
+    `check_cancelled` is called before refining each group of variations.
+    """
+    latents     = comfy_latent["samples"]
+    batch_size  = latents.shape[0]
+    image_seeds = noise_seed if isinstance(noise_seed, list) else [noise_seed] * batch_size
+
+    # the copies of an image must keep the noise of its position in the batch
+    # (a single image keeps its regular noise, which is not keyed by any sub-seed)
+    if batch_size > 1 and not comfy_latent.get("batch_index"):
+        comfy_latent = comfy_latent.copy()
+        comfy_latent["batch_index"] = list(range(batch_size))
+
+    # group the variations that can be refined in the same batch
+    groups: dict[tuple, list[int]] = {}
+    for k, variation in enumerate(variations):
+        group_sampler = variation.sampler            if variation.sampler            is not None else sampler
+        group_freqs   = variation.extra_noise_freqs  if variation.extra_noise_freqs  is not None else extra_noise_freqs
+        group_scales  = variation.extra_noise_scales if variation.extra_noise_scales is not None else extra_noise_scales
+        groups.setdefault( (group_sampler, _as_tuple(group_freqs), _as_tuple(group_scales)), [] ).append(k)
+
+    num_variations = len(variations)
+    output_rows    = [ None ] * (batch_size * num_variations)
+    for group_index, ((group_sampler, group_freqs, group_scales), ks) in enumerate(groups.items()):
+        image_rows = [ row for row in range(batch_size) for _ in ks ]
+        seeds      = [ variations[k].seed if variations[k].seed is not None else image_seeds[row]
+                       for row in range(batch_size) for k in ks ]
+        if check_cancelled is not None:
+            check_cancelled()
+        group_latent = _stage3_core(_select_batch_rows(comfy_latent, image_rows), model,
+                                    select_conditioning_rows(positive, image_rows, batch_size),
+                                    select_conditioning_rows(negative, image_rows, batch_size),
+                                    cfg                 = cfg,
+                                    sigmas              = sigmas,
+                                    sampler             = group_sampler,
+                                    add_noise           = add_noise,
+                                    force_final_denoise = force_final_denoise,
+                                    noise_seed          = seeds,
+                                    noise_generator     = noise_generator,
+                                    noise_device        = noise_device,
+                                    extra_noise_freqs   = group_freqs,
+                                    extra_noise_scales  = group_scales,
+                                    tile_size           = tile_size,
+                                    tile_overlap        = tile_overlap,
+                                    early_exit          = early_exit,
+                                    session             = session,
+                                    profiler            = profiler,
+                                    progress_preview = ProgressPreview( 100,
+                                        parent=(progress_preview, 100*group_index/len(groups), 100*(group_index+1)/len(groups)) ),
+                                    )
+        group_samples = group_latent["samples"]
+        for i, (row, k) in enumerate( (row, k) for row in range(batch_size) for k in ks ):
+            output_rows[ row * num_variations + k ] = group_samples[i]
+
+    comfy_latent = _select_batch_rows(comfy_latent, [ row for row in range(batch_size) for _ in range(num_variations) ])
+    comfy_latent["samples"] = torch.stack(output_rows)
+    return comfy_latent
+
+
 def _iterative_denoising(latents     : torch.Tensor,
                          model       : ComfyModel,
                          positive    : ComfyConditioning,
@@ -707,13 +1505,20 @@ def _iterative_denoising(latents     : torch.Tensor,
                          noise_scale         : torch.Tensor | float | int | None = None,
                          noise_bias          : torch.Tensor | float | int | None = None,
                          noise_mask          : torch.Tensor | None               = None,
-                         noise_seed          : int,
+                         noise_seed          : int | list[int],
                          batch_subseeds      : list[int] | None                  = None,
+                         noise_generator     : str                               = "legacy",
+                         noise_device        : str                               = "reproducible",
                          extra_noise_freqs   : tuple[int,...] | int              = 0,
                          extra_noise_scales  : tuple[float,...] | float          = 0,
                          fix_empty_latent    : bool                              = True,
                          keep_masked_area    : bool                              = False,
                          force_final_denoise : bool                              = False,
+                         tile_size           : tuple[int, int] | None            = None,
+                         tile_overlap        : int                               = 0,
+                         early_exit          : float                             = 0.0,
+                         session             : SamplingSession | None            = None,
+                         profiler            : SamplingProfiler | None           = None,
                          progress_preview    : ProgressPreview | None            = None,
                          ) -> torch.Tensor:
     """
@@ -737,11 +1542,17 @@ def _iterative_denoising(latents     : torch.Tensor,
                                Can be a tensor, scalar, or None.
                                If tensor, it must have shape [batch_size, channels, 1, 1].
         noise_mask          : Optional tensor containing the inpainting mask.
-        noise_seed          : The seed used to generate random noise.
+        noise_seed          : The seed used to generate random noise, or a list with one seed for each image
+                               in the batch (each image then receives the noise of a generation alone with it).
         batch_subseeds      : Optional list of small integers (0, 1, 2, …) that act as virtual seeds
                                for every image in the batch. Repetitions are allowed; repeated indices
-                               yield identical noise for those images. If `None` or empty, every sample
+                               yield identical noise for those images (including the extra noise and the
+                               noise drawn by stochastic samplers). If `None` or empty, every sample
                                receives independent noise.
+        noise_generator     : The generator used for the random noise, "legacy" (default) or "philox".
+                               See `NOISE_GENERATORS` for details.
+        noise_device        : Where the noise is generated, "reproducible" (default) generates it on CPU,
+                               "fast" generates it directly on the compute device. See `NOISE_DEVICES`.
         extra_noise_freq    : Optional frequency at which additional noise is injected into the latent image.
                                These frequencies determine the granularity of noise injection. For example, a
                                value of 1024 means noise is injected into every pixel, while a value of 512
@@ -756,6 +1567,17 @@ def _iterative_denoising(latents     : torch.Tensor,
                                but activating this flag we're sure that no change will happen at all.
         force_final_denoise : If `True`, forces the final denoising step to zero out residual noise,
                                use `False` (default) for chaining samplers to preserve noise for the next stage.
+        tile_size           : Optional size (height, width) in latent pixels of the tiles where the model is
+                               evaluated; larger latents are denoised tile by tile (see `TiledSampler`).
+                               If `None` (default), the model is evaluated on the whole latent image.
+        tile_overlap        : Minimum overlap in latent pixels between neighbouring tiles.
+        early_exit          : Optional convergence threshold; once the relative change of the predicted final
+                               image falls below it, the sampling finishes with a final denoise skipping the
+                               remaining steps (see `ConvergenceSampler`). If zero (default), all steps are run.
+        session             : Optional `SamplingSession` where the model is already prepared for sampling.
+                               If `None`, the model is prepared by ComfyUI just for this call.
+        profiler            : Optional `SamplingProfiler` where the model evaluations are counted
+                               (added to the section being recorded).
         progress_preview    : Optional callback for tracking progress. Defaults to None.
 
     Returns:
@@ -798,12 +1620,22 @@ def _iterative_denoising(latents     : torch.Tensor,
     original_samples : torch.Tensor | None = latents
     original_mask    : torch.Tensor | None = noise_mask
 
+    # in "fast" mode all the noise is generated on the compute device, so the
+    # latents are moved there in advance (the sampler would do it anyway)
+    compute_device = session.device if (session is not None and session.is_open) else model.load_device
+    device         = resolve_noise_device(noise_device, compute_device)
+    if device.type != "cpu" and device != latents.device:
+        latents = latents.to(device)
+
     # apply extra noise injection if it was required
     if extra_noise_scales and extra_noise_freqs:
         latents = inject_freq_noise(latents,
-                                    seed         = noise_seed,
-                                    noise_freqs  = extra_noise_freqs,
-                                    noise_scales = extra_noise_scales,
+                                    seed           = noise_seed,
+                                    noise_freqs    = extra_noise_freqs,
+                                    noise_scales   = extra_noise_scales,
+                                    batch_subseeds = batch_subseeds,
+                                    noise_generator = noise_generator,
+                                    noise_device    = noise_device,
                                     )
 
     # force a full denoising (with the last sigma to zero) if it was required
@@ -818,7 +1650,7 @@ def _iterative_denoising(latents     : torch.Tensor,
         comfy_noise = torch.zeros(latents.shape,
                                   dtype   = latents.dtype,
                                   layout  = latents.layout,
-                                  device  = "cpu")
+                                  device  = device)
     else:
         comfy_noise = generate_noise(noise_seed, latents.shape,
                                      noise_bias     = noise_bias,
@@ -826,19 +1658,59 @@ def _iterative_denoising(latents     : torch.Tensor,
                                      batch_subseeds = batch_subseeds,
                                      dtype          = latents.dtype,
                                      layout         = latents.layout,
-                                     device         = "cpu")
-
+                                     device         = device,
+                                     noise_generator = noise_generator)
+
+
+    # when the batch has sub-seeds (or a seed per image), the noise drawn by stochastic samplers
+    # is also keyed by them, so each image does not depend on its position in the batch
+    batch_seeds = noise_seed if isinstance(noise_seed, list) else None
+    if batch_subseeds or batch_seeds:
+        sampler = SubseedNoiseSampler(sampler, batch_subseeds, batch_seeds=batch_seeds, noise_generator=noise_generator)
+    sampling_seed = batch_seeds[0] if batch_seeds else noise_seed
+
+    # with early exit, the sampling finishes once the prediction stops changing
+    # (only meaningful when the sampling ends with a full denoise)
+    convergence_sampler = None
+    if early_exit > 0 and sigmas[-1] == 0:
+        sampler = convergence_sampler = ConvergenceSampler(sampler, early_exit)
+
+    # when profiling, the evaluations of the model are counted
+    # (inside the tiled sampler, so each evaluation counts once whatever the tiles)
+    counting_sampler = None
+    if profiler is not None and profiler.enabled:
+        sampler = counting_sampler = CountingSampler(sampler)
+
+    # in tiled mode the model is evaluated tile by tile, while the sampler
+    # (and all its noise) still works on the whole latent image
+    if tile_size:
+        sampler = TiledSampler(sampler, tile_size, tile_overlap)
 
     # this wrapper modifies the progress report sent by comfyui
     # to show an external progress from 0 to 100
     steps = _num_steps(sigmas)
     progress_wrapper = ProgressPreview( steps+1, parent=(progress_preview, 100/(steps+2), 100) )
 
-    # generates the denoised latent using a native function from comfyui
+    # generates the denoised latent using a native function from comfyui,
+    # or the session where the model is already prepared (if one was provided)
     disable_pbar = not comfy.utils.PROGRESS_BAR_ENABLED
-    latents = comfy.sample.sample_custom(model, comfy_noise, cfg, sampler, sigmas, positive, negative,
-                                         latents, noise_mask=noise_mask, callback=progress_wrapper,
-                                         disable_pbar=disable_pbar, seed=noise_seed)
+    if session is not None:
+        latents = session.sample(comfy_noise, latents, sampler, sigmas, positive, negative,
+                                 noise_mask=noise_mask, callback=progress_wrapper,
+                                 disable_pbar=disable_pbar, seed=sampling_seed)
+    else:
+        latents = comfy.sample.sample_custom(model, comfy_noise, cfg, sampler, sigmas, positive, negative,
+                                             latents, noise_mask=noise_mask, callback=progress_wrapper,
+                                             disable_pbar=disable_pbar, seed=sampling_seed)
+
+    if counting_sampler is not None:
+        profiler.add_evaluations(counting_sampler.evaluations)
+
+    # report the model evaluations saved by the early exit
+    if convergence_sampler is not None and convergence_sampler.steps_run < convergence_sampler.steps_total:
+        logger.info(f"Z-Sampler Turbo: converged after {convergence_sampler.steps_run} of "
+                    f"{convergence_sampler.steps_total} steps, {convergence_sampler.saved_evaluations} "
+                    f"model evaluations saved")
 
     # when there's an inpainting mask, it seems like comfyui does not merge the
     # original image at the end of `sample_custom(..)`, so we manually merge it here
@@ -857,12 +1729,16 @@ def estimate_initial_noise_features(comfy_latent : ComfyLatent,
                                     positive     : ComfyConditioning,
                                     negative     : ComfyConditioning,
                                     *,
-                                    seed         : int,
+                                    seed         : int | list[int],
                                     sampler      : comfy.samplers.KSAMPLER,
                                     sigmas       : list | torch.Tensor,
                                     sample_bias  : float = 0.0,
                                     sample_scale : float = 0.1,
                                     sample_size  : tuple[int, int] | int | None = None,
+                                    noise_generator: str                        = "legacy",
+                                    noise_device   : str                        = "reproducible",
+                                    session      : SamplingSession | None       = None,
+                                    profiler     : SamplingProfiler | None      = None,
                                     progress_preview: ProgressPreview
                                     ) -> tuple[torch.Tensor, torch.Tensor]:
     """
@@ -876,7 +1752,7 @@ def estimate_initial_noise_features(comfy_latent : ComfyLatent,
         latent_image : Dictionary containing information about the initial latent image,
                        only its width and height are used.
         model        : ComfyUI object representing the model to use for denoising.
-        seed         : The seed used to generate random noise.
+        seed         : The seed used to generate random noise, or a list with one seed for each image.
         positive     : Positive prompts or conditioning applied to the model during denoising.
         negative     : Negative prompts or conditioning applied to the model during denoising.
         sampler      : ComfyUI object representing the sampler used for each denoising step.
@@ -884,14 +1760,23 @@ def estimate_initial_noise_features(comfy_latent : ComfyLatent,
         sample_size  : The size in pixels of the sample. If `None`, the size of the latent image is used.
         sample_bias  : The bias of the pure noise sample before denoising.
         sample_scale : The scale of the pure noise sample before denoising.
+        noise_generator: The generator used for the random noise, "legacy" (default) or "philox".
+        noise_device : Where the noise is generated, "reproducible" (default) or "fast".
+        session      : Optional `SamplingSession` where the model is already prepared for sampling.
+        profiler     : Optional `SamplingProfiler` where the model evaluations are counted.
         progress_preview: An object for reporting progress.
 
     Returns:
         A tuple containing two tensors:
         - The calculated noise bias, tensor of shape [batch_size, channels, 1, 1].
         - The calculated noise scale, tensor of shape [batch_size, channels, 1, 1].
+    Notes:
+        The results are cached in `_NOISE_FEATURES_CACHE`, so repeating the
+        estimation with the same model, conditionings, seed, sub-seeds, sample
+        shape, sigmas and sampler returns the stored result without running the model.
     """
-    latents: torch.Tensor | None = comfy_latent.get("samples")
+    latents       : torch.Tensor | None = comfy_latent.get("samples")
+    batch_subseeds: list[int] | None    = comfy_latent.get("batch_index")
     if latents is None:
         raise ValueError("comfy_latent must contain 'samples' key")
 
@@ -899,17 +1784,21 @@ def estimate_initial_noise_features(comfy_latent : ComfyLatent,
     if isinstance(sigmas, list):
         sigmas = torch.tensor(sigmas, device='cpu')
 
-    # if sample_size is an integer, it is assumed to be a square image
-    if isinstance(sample_size, int):
-        sample_size = (sample_size, sample_size)
-
     # if sample_size is supplied,
     # the 'latents' is replaced by an empty one of the specified size
-    if isinstance(sample_size, (tuple,list)) and len(sample_size)>=2:
-        width, height = sample_size[0], sample_size[1]
-        if width>=8 and height>=8:
-            latents_shape = latents.shape[:-2] + ( int(height//8), int(width//8) )
-            latents = torch.zeros(latents_shape, dtype=latents.dtype, layout=latents.layout, device="cpu")
+    latents = _noise_features_sample(latents, sample_size)
+
+    # if this estimation was already performed, return the cached result
+    cache_key = _noise_features_cache_key(latents, model, positive, negative,
+                                          seed=seed, batch_subseeds=batch_subseeds, sampler=sampler, sigmas=sigmas,
+                                          sample_bias=sample_bias, sample_scale=sample_scale,
+                                          noise_generator=noise_generator, noise_device=noise_device)
+    cached = _NOISE_FEATURES_CACHE.get(cache_key)
+    if cached is not None:
+        logger.debug(f"Initial noise estimation reused from cache {_NOISE_FEATURES_CACHE.stats()}")
+        NOISE_ESTIMATIONS.inc(result="cached")
+        return cached
+    NOISE_ESTIMATIONS.inc(result="run")
 
     # run the sampler on pure noise and calculate the mean of the result
     latents = _iterative_denoising(latents, model, positive, negative,
@@ -919,16 +1808,631 @@ def estimate_initial_noise_features(comfy_latent : ComfyLatent,
                                    noise_scale         = sample_scale,
                                    noise_bias          = sample_bias,
                                    noise_seed          = seed,
+                                   batch_subseeds      = batch_subseeds,
+                                   noise_generator     = noise_generator,
+                                   noise_device        = noise_device,
                                    force_final_denoise = False,
+                                   session             = session,
+                                   profiler            = profiler,
                                    progress_preview = progress_preview
                                    )
     bias  = latents.mean(dim=[2, 3], keepdim=True)
     scale = latents.std (dim=[2, 3], keepdim=True)
+    _NOISE_FEATURES_CACHE.put(cache_key, (bias, scale))
+
+    # when calibrating the noise bias predictor, every estimation is logged
+    log_path = os.getenv(NOISE_BIAS_LOG_ENV)
+    if log_path:
+        records = _noise_features_records(latents, model, positive, seed=seed, batch_subseeds=batch_subseeds,
+                                          sigmas=sigmas, noise_generator=noise_generator)
+        _log_noise_features(log_path, records, bias, scale)
     return bias, scale
 
 
+def predict_initial_noise_features(comfy_latent : ComfyLatent,
+                                   model        : ComfyModel,
+                                   positive     : ComfyConditioning,
+                                   *,
+                                   seed         : int | list[int],
+                                   sigmas       : list | torch.Tensor,
+                                   sample_size  : tuple[int, int] | int | None = None,
+                                   noise_generator: str                        = "legacy",
+                                   predictor    : NoiseBiasPredictor,
+                                   ) -> tuple[torch.Tensor, torch.Tensor]:
+    """
+    Predicts the bias and scale that `estimate_initial_noise_features(..)` would calculate.
+
+    The prediction uses the statistics of the pure noise sample and of the positive
+    conditioning, so it does not run the model. The noise of the sample is generated
+    on CPU, even when the estimation would generate it on the compute device.
+
+    Args:
+        comfy_latent : Dictionary containing information about the initial latent image,
+                       only its width and height are used.
+        model        : ComfyUI object representing the model (only used to get its latent channels).
+        positive     : Positive prompts or conditioning applied to the model during denoising.
+        seed         : The seed used to generate random noise, or a list with one seed for each image.
+        sigmas       : The sigma pair of the estimation [start, end].
+        sample_size  : The size in pixels of the sample. If `None`, the size of the latent image is used.
+        noise_generator: The generator used for the random noise, "legacy" (default) or "philox".
+        predictor    : The `NoiseBiasPredictor` fitted with the calibration records.
+
+    Returns:
+        A tuple containing two tensors:
+        - The predicted noise bias, tensor of shape [batch_size, channels, 1, 1].
+        - The predicted noise scale, tensor of shape [batch_size, channels, 1, 1].
+    """
+    latents       : torch.Tensor | None = comfy_latent.get("samples")
+    batch_subseeds: list[int] | None    = comfy_latent.get("batch_index")
+    if latents is None:
+        raise ValueError("comfy_latent must contain 'samples' key")
+
+    latents = _noise_features_sample(latents, sample_size)
+    records = _noise_features_records(latents, model, positive, seed=seed, batch_subseeds=batch_subseeds,
+                                      sigmas=sigmas, noise_generator=noise_generator)
+    predictions = [ predictor.predict(record) for record in records ]
+    bias  = torch.stack([ torch.from_numpy(bias)  for bias, _  in predictions ]).float()
+    scale = torch.stack([ torch.from_numpy(scale) for _, scale in predictions ]).float()
+    NOISE_ESTIMATIONS.inc(result="predicted")
+    return bias[:, :, None, None], scale[:, :, None, None]
+
+
+def load_noise_bias_predictor(path: str | None = None) -> NoiseBiasPredictor | None:
+    """
+    Returns the noise bias predictor stored in a file (it is reloaded only when the file changes).
+
+    Args:
+        path: The file of the predictor. If `None`, the file given by the environment variable
+              `ZIMAGE_NODES_NOISE_BIAS_PREDICTOR` is used, or "noise_bias_predictor.json" in
+              the project root.
+    Returns:
+        The predictor, or None if there is no valid predictor in that file.
+    """
+    if path is None:
+        path = os.getenv(NOISE_BIAS_PREDICTOR_ENV) or str(get_project_root() / "noise_bias_predictor.json")
+    try:
+        modified = os.path.getmtime(path)
+        loaded   = _NOISE_BIAS_PREDICTORS.get(path)
+        if loaded is None or loaded[0] != modified:
+            loaded = _NOISE_BIAS_PREDICTORS[path] = (modified, NoiseBiasPredictor.load(path))
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"No noise bias predictor available in '{path}' ({e}), the noise bias will be estimated.")
+        return None
+    return loaded[1]
+
+
+#============================== CANCELLATION ===============================#
+
+class _CancellationScope:
+    """
+    Context manager around the stages of a generation that handles its cancellation.
+
+    `check()` is called before every sampling call and raises once the token is
+    cancelled (polling it, so a ComfyUI interrupt is consumed there); `completed(..)` keeps the latent of each stage that ends noise-free,
+    which is attached as a draft to the `GenerationCancelled` leaving the scope.
+    When the token follows ComfyUI's interrupts, an interrupt raised in the middle
+    of a sampling call is also converted to `GenerationCancelled`.
+
+    Args:
+        token     : The `CancellationToken` of the generation, or None to check only ComfyUI's interrupt.
+        draft_size: Optional (height, width) to which the draft is upscaled (multi-resolution mode).
+    """
+    def __init__(self, token: CancellationToken | None, *, draft_size: tuple[int, int] | None = None):
+        self.token       = token
+        self.draft_size  = tuple(draft_size) if draft_size is not None else None
+        self.draft       : ComfyLatent | None = None
+        self.draft_stage = 0
+
+    def check(self) -> None:
+        if self.token is not None and self.token.poll():
+            raise GenerationCancelled()
+        comfy.model_management.throw_exception_if_processing_interrupted()
+
+    def completed(self, stage: int, comfy_latent: ComfyLatent, *, is_denoised: bool) -> None:
+        if is_denoised:
+            self.draft, self.draft_stage = comfy_latent, stage
+
+    def __enter__(self) -> "_CancellationScope":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        if isinstance(exc, comfy.model_management.InterruptProcessingException) \
+           and self.token is not None and self.token.follow_interrupts:
+            self.token.interrupted = True
+            self.token.cancel()
+            raise self._attach_draft( GenerationCancelled() ) from exc
+        if isinstance(exc, GenerationCancelled) and exc.latent is None:
+            self._attach_draft(exc)
+        return False
+
+    def _attach_draft(self, cancelled: GenerationCancelled) -> GenerationCancelled:
+        if self.draft is None:
+            return cancelled
+        draft = self.draft
+        if self.draft_size is not None and tuple(draft["samples"].shape[-2:]) != self.draft_size:
+            draft = draft.copy()
+            draft["samples"] = F.interpolate(draft["samples"], size=self.draft_size, mode="bicubic", align_corners=False)
+        cancelled.latent, cancelled.stage = draft, self.draft_stage
+        return cancelled
+
+
+def _draft_samples(model          : ComfyModel,
+                   micro_batches  : list[tuple[ComfyLatent, list[int]]],
+                   draft          : ComfyLatent | None,
+                   rows_per_image : int,
+                   ) -> list[torch.Tensor]:
+    """
+    Returns the samples of the micro-batches left unfinished by a cancellation: the draft
+    of the first one (or its input latent if there is no draft) followed by the input
+    latents of the others, with `rows_per_image` rows for each image.
+    """
+    samples = []
+    for index, (latent_chunk, _) in enumerate(micro_batches):
+        chunk_samples = draft["samples"] if (index == 0 and draft is not None) else \
+                        comfy.sample.fix_empty_latent_channels(model, latent_chunk["samples"])
+        samples.append( chunk_samples.repeat_interleave(rows_per_image, dim=0) if rows_per_image > 1 else chunk_samples )
+    return samples
+
+
+def _ends_noise_free(sigmas: torch.Tensor | None) -> bool:
+    """Returns True if the sigmas end at zero, so the sampled latent does not contain any residual noise."""
+    return sigmas is not None and float(sigmas[-1]) == 0.0
+
+
+def _no_cancellation() -> None:
+    pass
+
+
 #================================= HELPERS =================================#
 
+def _unique_batch_rows(comfy_latent : ComfyLatent,
+                       conditionings: list[ComfyConditioning | None],
+                       *,
+                       batch_seeds  : list[int] | None = None,
+                       ) -> tuple[list[int], list[int]] | tuple[None, None]:
+    """
+    Finds the duplicated images in the batch of a ComfyUI latent.
+
+    Two images are duplicates when they have the same seed, the same sub-seed
+    (`batch_index`), the same latent content, the same noise mask and the same
+    rows of the stacked conditionings; since every random source of the sampler
+    is keyed by them they always produce the same result.
+    Args:
+        comfy_latent : ComfyUI LATENT dict with the batch to analyze.
+        conditionings: The conditionings used for denoising (regular or stacked).
+        batch_seeds  : Optional list with the seed of each image in the batch.
+    Returns:
+        A tuple `(unique_rows, inverse)` where `unique_rows` contains the index of the
+        first occurrence of each distinct image and `inverse[i]` is the position in
+        `unique_rows` of the image `i`; or `(None, None)` if there are no duplicates.
+    """
+    samples       : torch.Tensor        = comfy_latent["samples"]
+    noise_mask    : torch.Tensor | None = comfy_latent.get("noise_mask")
+    batch_subseeds: list[int] | None    = comfy_latent.get("batch_index")
+    batch_size = samples.shape[0]
+
+    # without repeated seeds/sub-seeds every image receives different noise
+    if batch_subseeds and len(batch_subseeds) != batch_size:
+        return None, None
+    if not batch_subseeds and not batch_seeds:
+        return None, None
+    seeds    = batch_seeds    or [None] * batch_size
+    subseeds = batch_subseeds or [None] * batch_size
+    if len(set(zip(seeds, subseeds))) == batch_size:
+        return None, None
+    if noise_mask is not None and noise_mask.shape[0] not in (1, batch_size):
+        return None, None
+    if any( tensor.shape[0] not in (1, batch_size) for cond in conditionings if cond for tensor, _ in cond ):
+        return None, None
+    stacked_conds = [ cond for cond in conditionings if batch_size > 1 and conditioning_batch_size(cond) == batch_size ]
+
+    keys       : dict[tuple, int] = {}
+    unique_rows: list[int]        = []
+    inverse    : list[int]        = []
+    for row, (seed, subseed) in enumerate(zip(seeds, subseeds)):
+        mask_row = noise_mask[row] if (noise_mask is not None and noise_mask.shape[0] == batch_size) else None
+        conds_fp = tuple( conditioning_fingerprint(select_conditioning_rows(cond, [row], batch_size)) for cond in stacked_conds )
+        key      = (seed, subseed, tensor_fingerprint(samples[row]), tensor_fingerprint(mask_row), conds_fp)
+        if key not in keys:
+            keys[key] = len(unique_rows)
+            unique_rows.append(row)
+        inverse.append(keys[key])
+
+    if len(unique_rows) == batch_size:
+        return None, None
+    return unique_rows, inverse
+
+
+def _offset_batch_subseeds(comfy_latent: ComfyLatent, batch_offset: int) -> ComfyLatent:
+    """
+    Returns a copy of the ComfyUI latent with the sub-seeds of its images shifted by `batch_offset`.
+    Images without an explicit `batch_index` use their position in the batch as sub-seed.
+    """
+    if batch_offset < 0:
+        raise ValueError(f"`batch_offset` must be a non-negative integer, got {batch_offset}")
+    batch_size     = comfy_latent["samples"].shape[0]
+    batch_subseeds = comfy_latent.get("batch_index") or list(range(batch_size))
+    comfy_latent = comfy_latent.copy()
+    comfy_latent["batch_index"] = [ batch_offset + int(subseed) for subseed in batch_subseeds ]
+    return comfy_latent
+
+
+def _split_into_micro_batches(comfy_latent   : ComfyLatent,
+                              model          : ComfyModel,
+                              memory_mb      : int,
+                              *,
+                              per_image_seeds: bool = False,
+                              rows_per_image : int  = 1,
+                              row_groups     : list | None = None,
+                              ) -> list[tuple[ComfyLatent, list[int]]]:
+    """
+    Splits the batch of a ComfyUI latent into micro-batches that fit within a memory budget.
+
+    When the batch is actually split, every micro-batch receives an explicit
+    `batch_index`, so the noise of each image depends only on its sub-seed and
+    not on how the batch was split (the noise of stochastic samplers is then
+    keyed by sub-seed, as with any explicit `batch_index`). A batch that fits
+    within the budget is returned unchanged, so its noise is exactly the one
+    it receives without a budget.
+    Args:
+        comfy_latent   : ComfyUI LATENT dict with the batch to split.
+        model          : ComfyUI MODEL obj used to estimate the memory required by each image.
+        memory_mb      : Memory budget in megabytes for each micro-batch, 0 to disable the split.
+        per_image_seeds: If `True`, each image has its own seed and is keyed as the first
+                         (and only) image of its own generation, so all of them receive sub-seed 0.
+        rows_per_image : Number of rows that each image occupies in the largest latent denoised
+                         (e.g. the number of stage 3 variations).
+        row_groups     : Optional list with a value for each image; images with different values
+                         are placed in different micro-batches, in the order the values first appear.
+    Returns:
+        A list of tuples `(latent, rows)`, one for each micro-batch, where `rows`
+        are the positions in the original batch of the images it contains.
+    """
+    samples    = comfy_latent["samples"]
+    batch_size = samples.shape[0]
+    row_groups = row_groups if row_groups is not None else [None] * batch_size
+    chunk_size = batch_size
+    if memory_mb > 0:
+        sample_memory = _estimate_sample_memory(model, samples) * rows_per_image
+        chunk_size    = max(1, int(memory_mb * 1024 * 1024) // max(1, sample_memory))
+    if chunk_size >= batch_size and len(set(row_groups)) <= 1:
+        return [ (comfy_latent, list(range(batch_size))) ]
+
+    if not comfy_latent.get("batch_index"):
+        comfy_latent = comfy_latent.copy()
+        comfy_latent["batch_index"] = [0] * batch_size if per_image_seeds else list(range(batch_size))
+    chunks_rows = []
+    for group in dict.fromkeys(row_groups):
+        group_rows = [ row for row in range(batch_size) if row_groups[row] == group ]
+        chunks_rows.extend( group_rows[start:start+chunk_size] for start in range(0, len(group_rows), chunk_size) )
+    return [ (_select_batch_rows(comfy_latent, rows), rows) for rows in chunks_rows ]
+
+
+def _estimate_sample_memory(model: ComfyModel, samples: torch.Tensor) -> int:
+    """
+    Returns the estimated memory in bytes required to denoise a single image of the batch.
+
+    The estimation of the model itself is used when available (the same one used by
+    ComfyUI to decide how much of the model to load), otherwise it is approximated
+    from the shape and dtype of the latent.
+    """
+    samples = comfy.sample.fix_empty_latent_channels(model, samples[:1])
+    memory_required = getattr(model, "memory_required", None)
+    if callable(memory_required):
+        try:
+            return int( memory_required(samples.shape) )
+        except Exception as e:
+            logger.debug(f"Unable to get the memory required by the model ({e}).")
+    return samples.numel() * samples.element_size() * _SAMPLE_MEMORY_FACTOR
+
+
+def _select_batch_rows(comfy_latent: ComfyLatent, rows: list[int]) -> ComfyLatent:
+    """Returns a copy of the ComfyUI latent containing only the given images of its batch."""
+    samples    = comfy_latent["samples"]
+    batch_size = samples.shape[0]
+    comfy_latent = comfy_latent.copy()
+    comfy_latent["samples"] = samples[ torch.tensor(rows, device=samples.device) ]
+    noise_mask = comfy_latent.get("noise_mask")
+    if noise_mask is not None and noise_mask.shape[0] == batch_size:
+        comfy_latent["noise_mask"] = noise_mask[ torch.tensor(rows, device=noise_mask.device) ]
+    batch_subseeds = comfy_latent.get("batch_index")
+    if batch_subseeds:
+        comfy_latent["batch_index"] = [ batch_subseeds[row] for row in rows ]
+    return comfy_latent
+
+
+def _expand_batch(comfy_latent: ComfyLatent, batch_size: int, source: str) -> ComfyLatent:
+    """
+    Returns the ComfyUI latent with its batch expanded to `batch_size` images.
+    A latent with a single image is repeated; any other batch size must already match.
+    Args:
+        comfy_latent: ComfyUI LATENT dict to expand.
+        batch_size  : The required number of images in the batch.
+        source      : Description of what determines `batch_size`, used in error messages.
+    """
+    samples = comfy_latent["samples"]
+    if samples.shape[0] == batch_size or batch_size == 1:
+        return comfy_latent
+    if samples.shape[0] != 1:
+        raise ValueError(f"The latent batch ({samples.shape[0]} images) does not match the {source} ({batch_size})")
+    comfy_latent = comfy_latent.copy()
+    comfy_latent["samples"] = samples.repeat( (batch_size,) + (1,) * (samples.ndim-1) )
+    batch_subseeds = comfy_latent.get("batch_index")
+    if batch_subseeds:
+        comfy_latent["batch_index"] = list(batch_subseeds) * batch_size
+    return comfy_latent
+
+
+def _downscale_latent_samples(samples: torch.Tensor, scale: float) -> torch.Tensor:
+    """
+    Returns the latent samples downscaled by the given factor (area interpolation).
+    The new width and height are rounded to multiples of 2 (the patch size of the model).
+    """
+    height, width = samples.shape[-2:]
+    height = max(2, int(round(height * scale / 2)) * 2)
+    width  = max(2, int(round(width  * scale / 2)) * 2)
+    if (height, width) == tuple(samples.shape[-2:]):
+        return samples
+    return F.interpolate(samples, size=(height, width), mode="area")
+
+
+def _crop_to_noise_mask(comfy_latent: ComfyLatent, margin: int) -> tuple[ComfyLatent, tuple[int,int,int,int] | None]:
+    """
+    Crops the latent to the bounding box of its noise mask expanded by `margin` pixels.
+
+    The noise mask is resized to the size of the latent (as ComfyUI does before sampling)
+    and cropped along with the samples. Returns the cropped latent and the region
+    (top, left, bottom, right), or the same latent and None if nothing can be cropped.
+    """
+    samples       = comfy_latent["samples"]
+    height, width = samples.shape[-2:]
+    noise_mask    = comfy_latent["noise_mask"]
+    noise_mask    = noise_mask.reshape(-1, 1, *noise_mask.shape[-2:])
+    if tuple(noise_mask.shape[-2:]) != (height, width):
+        noise_mask = F.interpolate(noise_mask, size=(height, width), mode="bilinear")
+
+    crop_box = mask_crop_box(noise_mask, margin=margin//8, min_size=_INPAINT_CROP_MIN_SIZE//8, align=2)
+    if crop_box is None or crop_box == (0, 0, height, width):
+        return comfy_latent, None
+    top, left, bottom, right = crop_box
+    comfy_latent = comfy_latent.copy()
+    comfy_latent["samples"]    = samples   [..., top:bottom, left:right]
+    comfy_latent["noise_mask"] = noise_mask[..., top:bottom, left:right]
+    return comfy_latent, crop_box
+
+
+def _preset_sigmas(sigma_preset_name: str | None, steps: int) -> tuple[list, list, list]:
+    """Returns the sigmas of the 3 stages for the given preset name and number of steps."""
+    sigma_preset = SIGMA_PRESETS_BY_NAME.get(sigma_preset_name) if sigma_preset_name else None
+    if not sigma_preset:
+        sigma_preset = SIGMA_PRESETS_BY_NAME["alpha"]
+    if len(sigma_preset) != 7:
+        raise ValueError(f"Sigma presets must have 7 elements but the \"{sigma_preset_name}\" preset has {len(sigma_preset)} elements")
+    index   = min(max( 3, steps), 9 ) - 3
+    sigmas1 = list(sigma_preset[index][0])
+    sigmas2 = list(sigma_preset[index][1])
+    sigmas3 = list(sigma_preset[index][2])
+
+    # when the number of steps is greater than 9, the same 9-step sigma
+    # sequence is used, but the Stage 2 and Stage 3 are refined to match
+    # the required number of steps
+    if steps>9:
+        additional_steps = (steps-9)
+        n1 = int( 0.4 + 0.6 * additional_steps )
+        n2 = additional_steps - n1
+        sigmas2 = refine_sigma_sequence(sigmas2, n1)
+        sigmas3 = refine_sigma_sequence(sigmas3, n2)
+    return sigmas1, sigmas2, sigmas3
+
+
+def _tiled_shape(shape: tuple[int, ...] | torch.Size, tile_size: tuple[int, int] | None) -> tuple[int, ...]:
+    """Returns the shape of the largest latent evaluated by the model when `shape` is denoised tile by tile."""
+    if not tile_size:
+        return tuple(shape)
+    return (*shape[:-2], min(shape[-2], tile_size[0]), min(shape[-1], tile_size[1]))
+
+
+def _as_tuple(values: Any) -> Any:
+    """Returns lists converted to tuples (so they can be used as keys); any other value as is."""
+    return tuple(values) if isinstance(values, list) else values
+
+
+def _select_rows(values: Any, rows: list[int]) -> Any:
+    """Returns the per-image values (a list) of the given rows; any other value is shared by all images."""
+    return [ values[row] for row in rows ] if isinstance(values, list) else values
+
+
+def _has_scramble(scramble_counts: tuple[int,int,int,int] | list[tuple]) -> bool:
+    """Returns True if the scramble counts (shared or one tuple per image) scramble any image."""
+    if isinstance(scramble_counts, list):
+        return any( any(counts) for counts in scramble_counts )
+    return any(scramble_counts)
+
+
+def _default_scramble_counts(seed: int) -> tuple[int,int,int,int]:
+    """Returns the scramble counts pseudo-randomly assigned to the given seed."""
+    return _SCRAMBLE_COUNTS_MULTIPLE_OF_10 if (seed % 10) == 0 else \
+           _SCRAMBLE_COUNTS_EVEN_SEED      if (seed %  2) == 0 else \
+           _SCRAMBLE_COUNTS_DEFAULT
+
+
+def _stage_cache_key(stage: str, model: ComfyModel, *inputs: Any) -> tuple | None:
+    """
+    Returns the key identifying the latent resulting from a stage in `_STAGE_PREFIX_CACHE`,
+    or None if some of the inputs cannot be fingerprinted (the latent is then not cached).
+    """
+    try:
+        return (stage, model_fingerprint(model)) + tuple( value_fingerprint(input) for input in inputs )
+    except Exception as e:
+        logger.debug(f"The latent of {stage} will not be cached ({e}).")
+        return None
+
+
+def _record_metrics(profiler: SamplingProfiler, outcome: str, *, steps: int, batch_size: int | None = None) -> None:
+    """Adds a generation, with the wall time of each of its sections, to the project metrics."""
+    SAMPLER_GENERATIONS.inc(outcome=outcome)
+    SAMPLER_STEPS.observe(steps)
+    if batch_size is not None:
+        SAMPLER_BATCH_SIZE.observe(batch_size)
+    for record in profiler.records:
+        SAMPLER_STAGE_SECONDS.observe(record["seconds"], stage=record["name"])
+
+
+def _checkpoint_keys(model: ComfyModel, *stages_inputs: tuple) -> tuple[str | None, ...]:
+    """
+    Returns the keys identifying the checkpoints of each stage, built from the inputs of the stage and
+    the keys of the previous stages; all the keys are None if the model cannot be fingerprinted.
+    """
+    try:
+        keys  = []
+        model = persistent_model_fingerprint(model)
+        for stage, inputs in enumerate(stages_inputs, start=1):
+            keys.append( persistent_digest(f"stage{stage}", model, *keys, *inputs) )
+        return tuple(keys)
+    except Exception as e:
+        logger.debug(f"The stages will not be checkpointed ({e}).")
+        return (None,) * len(stages_inputs)
+
+
+def _save_stage_checkpoint(checkpoints: StageCheckpoints | None,
+                           key        : str | None,
+                           stage      : int,
+                           samples    : torch.Tensor,
+                           noise_bias : torch.Tensor | float,
+                           info       : dict[str, Any],
+                           ) -> bool:
+    """
+    Writes the checkpoint of a stage with its resulting latent and the initial noise bias.
+    Returns True if the checkpoint was written (False when checkpoints are disabled or on failure).
+    """
+    if checkpoints is None or key is None:
+        return False
+    tensors = { "samples"   : samples,
+                "noise_bias": torch.as_tensor(noise_bias, dtype=torch.float32) }
+    for name, sigmas in info.get("sigmas", {}).items():
+        if sigmas is not None:
+            tensors[f"sigmas_{name}"] = torch.tensor(sigmas, dtype=torch.float32)
+    return checkpoints.save(key, stage, tensors, info)
+
+
+def _load_stage_checkpoint(checkpoints: StageCheckpoints | None,
+                           key        : str | None,
+                           ) -> tuple[torch.Tensor, torch.Tensor | float] | None:
+    """Returns the resulting latent and the initial noise bias stored in the checkpoint of a stage, or None."""
+    checkpoint = checkpoints.load(key) if (checkpoints is not None and key is not None) else None
+    if checkpoint is None:
+        return None
+    tensors, _ = checkpoint
+    noise_bias = tensors["noise_bias"]
+    return tensors["samples"], (float(noise_bias) if noise_bias.ndim == 0 else noise_bias)
+
+
+def _noise_features_sample(latents: torch.Tensor, sample_size: tuple[int, int] | int | None) -> torch.Tensor:
+    """Returns the latents used as sample to estimate the noise features, an empty one when `sample_size` is supplied."""
+
+    # if sample_size is an integer, it is assumed to be a square image
+    if isinstance(sample_size, int):
+        sample_size = (sample_size, sample_size)
+
+    if isinstance(sample_size, (tuple,list)) and len(sample_size)>=2:
+        width, height = sample_size[0], sample_size[1]
+        if width>=8 and height>=8:
+            latents_shape = latents.shape[:-2] + ( int(height//8), int(width//8) )
+            latents = torch.zeros(latents_shape, dtype=latents.dtype, layout=latents.layout, device="cpu")
+    return latents
+
+
+def _noise_features_records(latents        : torch.Tensor,
+                            model          : ComfyModel,
+                            positive       : ComfyConditioning,
+                            *,
+                            seed           : int | list[int],
+                            batch_subseeds : list[int] | None,
+                            sigmas         : list | torch.Tensor,
+                            noise_generator: str,
+                            ) -> list[dict[str, Any]]:
+    """
+    Returns the calibration record of each image for the noise features estimated on `latents`
+    (see `noise_bias_predictor.py`); the record does not include the estimated values.
+    """
+    latents = comfy.sample.fix_empty_latent_channels(model, latents)
+    noise   = generate_noise(seed, latents.shape,
+                             batch_subseeds  = batch_subseeds,
+                             dtype           = torch.float32,
+                             layout          = latents.layout,
+                             device          = "cpu",
+                             noise_generator = noise_generator)
+    noise_mean = noise.mean(dim=[2, 3])
+    noise_std  = noise.std (dim=[2, 3])
+    sigmas     = [ float(sigma) for sigma in sigmas ][:2]
+
+    cond = positive[0][0].float() if positive else torch.zeros(1, 1, 1)
+    records = []
+    for row in range(latents.shape[0]):
+        row_cond = cond[row if row < cond.shape[0] else 0]
+        records.append({ "width"        : latents.shape[-1],
+                         "height"       : latents.shape[-2],
+                         "sigmas"       : sigmas,
+                         "seed"         : seed[row] if isinstance(seed, list) else seed,
+                         "noise_mean"   : noise_mean[row].tolist(),
+                         "noise_std"    : noise_std [row].tolist(),
+                         "cond_mean"    : float(row_cond.mean()),
+                         "cond_std"     : float(row_cond.std()) if row_cond.numel() > 1 else 0.0,
+                         "cond_abs_mean": float(row_cond.abs().mean()),
+                         "cond_tokens"  : row_cond.shape[0] if row_cond.ndim > 1 else 1 })
+    return records
+
+
+def _log_noise_features(path: str, records: list[dict[str, Any]], bias: torch.Tensor, scale: torch.Tensor) -> None:
+    """Appends the calibration records, along with their estimated bias and scale, to a JSON lines file."""
+    try:
+        with open(path, "a", encoding="utf-8") as file:
+            for row, record in enumerate(records):
+                record = { **record, "bias" : bias [row, :, 0, 0].tolist(),
+                                     "scale": scale[row, :, 0, 0].tolist() }
+                file.write(json.dumps(record) + "\n")
+    except OSError as e:
+        logger.warning(f"Unable to log the noise features to '{path}' ({e}).")
+
+
+def _noise_features_cache_key(latents     : torch.Tensor,
+                              model       : ComfyModel,
+                              positive    : ComfyConditioning,
+                              negative    : ComfyConditioning,
+                              *,
+                              seed        : int | list[int],
+                              batch_subseeds: list[int] | None,
+                              sampler     : object,
+                              sigmas      : torch.Tensor,
+                              sample_bias : float,
+                              sample_scale: float,
+                              noise_generator: str,
+                              noise_device   : str,
+                              ) -> tuple | None:
+    """
+    Returns the key identifying an initial noise estimation in `_NOISE_FEATURES_CACHE`,
+    or None if some of the inputs cannot be fingerprinted (the result is then not cached).
+    """
+    try:
+        positive_fp = conditioning_fingerprint(positive)
+        negative_fp = positive_fp if negative is positive else conditioning_fingerprint(negative)
+        return ( model_fingerprint(model),
+                 positive_fp,
+                 negative_fp,
+                 tuple( int(s) for s in seed ) if isinstance(seed, list) else int(seed),
+                 tuple( int(subseed) for subseed in batch_subseeds ) if batch_subseeds else None,
+                 tensor_fingerprint(latents),
+                 tuple( float(sigma) for sigma in sigmas ),
+                 sampler_fingerprint(sampler),
+                 float(sample_bias),
+                 float(sample_scale),
+                 noise_generator,
+                 noise_device )
+    except Exception as e:
+        logger.debug(f"Initial noise estimation will not be cached ({e}).")
+        return None
+
+
 def _num_steps(sigmas: torch.Tensor | None) -> int:
     """Returns the number of sampling steps represented in the sigmas tensor."""
     return sigmas.shape[-1]-1 if sigmas is not None else 0
@@ -10,11 +10,21 @@ License : MIT
          ComfyUI nodes designed specifically for the "Z-Image" model.
 _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
 """
+import math
+import inspect
+import functools
 import torch
 import torch.nn.functional as F
 from typing         import Callable, cast
 from torch          import Tensor
 from comfy.samplers import KSAMPLER, ksampler, sampler_object
+_UINT32_MASK = 0xFFFFFFFF
+_UINT64_MASK = 0xFFFFFFFFFFFFFFFF
+_PHILOX_M0   = 0xD2511F53  # philox4x32 round multipliers
+_PHILOX_M1   = 0xCD9E8D57
+_PHILOX_W0   = 0x9E3779B9  # philox4x32 key increments (Weyl sequence)
+_PHILOX_W1   = 0xBB67AE85
+_GOLDEN_64   = 0x9E3779B97F4A7C15  # 64-bit golden ratio, used to derive independent seeds
 
 
 #================= Adjusted Spectral Distribution Sampler ==================#
@@ -50,6 +60,15 @@ class SpectralAdjustedSampler(KSAMPLER):
         Inspired by: Davidson H., Issachar N., & Benaim S. (2026). "Colored Noise Diffusion
         Sampling". arXiv preprint arXiv:2605.30332. https://arxiv.org/abs/2605.30332
     """
+    # number of noise draws performed by the inner sampler at each step
+    # (used to size the pre-drawn noise bank, more draws are generated on demand)
+    NOISE_DRAWS_PER_STEP: int = 1
+
+    # maximum number of steps whose noise is pre-drawn at once, so the bank never
+    # holds more than `NOISE_BANK_MAX_STEPS * NOISE_DRAWS_PER_STEP` tensors of the
+    # size of the latent (its memory grows with the latent, not with the steps)
+    NOISE_BANK_MAX_STEPS: int = 4
+
     def __init__(self,
                  alpha_tilting  : tuple[float,float] | float = (0.1, -1.0),
                  alpha_sharpness: float                      = 1.0,
@@ -77,13 +96,31 @@ class SpectralAdjustedSampler(KSAMPLER):
         This method is registered by the class `__init__` and is invoked
         by ComfyUI multiple times during the denoising process.
         """
-        # get the base noise sampler provided by ComfyUI
+        # the alpha of every step is calculated in advance from the sigmas (a single
+        # read from the device); during sampling, the current step is reported by the
+        # callback that k-diffusion invokes before drawing the noise of each step
+        sigmas_list = sigmas.tolist()
+        alphas      = [ self._alpha_for_sigma(sigma) for sigma in sigmas_list ]
+        state       = {"step": 0}
+        user_callback = kwargs.get("callback")
+        def step_tracking_callback(info: dict) -> None:
+            state["step"] = min(int(info["i"]), len(alphas)-1)
+            if user_callback is not None:
+                user_callback(info)
+        kwargs["callback"] = step_tracking_callback
+
+        # get the base noise sampler provided by ComfyUI, if there is none, the noise
+        # of the remaining steps is pre-drawn in batches from a generator seeded
+        # with the sampling seed
         base_noise_sampler = kwargs.pop("noise_sampler", None)
         if base_noise_sampler is None:
-            base_noise_sampler = (lambda *a,**kw: torch.randn_like(noise))
+            extra_args = kwargs.get("extra_args") or {}
+            noisy_steps = sum( 1 for sigma in sigmas_list[1:] if sigma > 0 )
+            base_noise_sampler = self._noise_bank_sampler(noise, seed      = extra_args.get("seed"),
+                                                                 max_draws = noisy_steps * self.NOISE_DRAWS_PER_STEP)
 
         # get my custom noise sampler
-        custom_noise_sampler = (lambda *a,**kw: self._custom_noise_sampler(base_noise_sampler, *a, **kw))
+        custom_noise_sampler = (lambda *a,**kw: self._custom_noise_sampler(base_noise_sampler, alphas[state["step"]], *a, **kw))
 
         # execute the inner sampler but with my custom noise sampler
         return self._inner_sampler.sampler_function(model, noise, sigmas, *args,
@@ -92,7 +129,7 @@ class SpectralAdjustedSampler(KSAMPLER):
 
     def _custom_noise_sampler(self,
                               base_noise_sampler: Callable,
-                              sigma             : Tensor,
+                              alpha             : float,
                               *args, **kwargs
                               ) -> Tensor:
         """Generates noise with an adjusted spectral distribution.
@@ -101,26 +138,56 @@ class SpectralAdjustedSampler(KSAMPLER):
         and is invoked by ComfyUI multiple times during the denoising process.
         Args:
             base_noise_sampler: The original function used by ComfyUI to generate noise.
-            sigma             : The sigma value for which the noise should be spectrally adjusted.
+            alpha             : The frequency tilt for the current sampling step.
             *args, **kwargs   : Additional arguments to be passed to the base_noise_sampler.
         Returns:
             A tensor of custom noise with an adjusted spectral distribution.
         """
-        sigma_f       = float(sigma.mean().detach().cpu())
-        alpha_tilting = self._ea_alpha_tilting
+        # use the base sampler to generate standard noise and then adjust its spectral distribution
+        noise = base_noise_sampler(*args, **kwargs)
+        return _adjust_spectral_distribution(noise, alpha=alpha, force_zero_mean=False)
 
-        # calculate the value `alpha` corresponding to the current sampling step's sigma value
+    def _alpha_for_sigma(self, sigma: float) -> float:
+        """Returns the frequency tilt `alpha` corresponding to a sampling step's sigma value."""
+        alpha_tilting = self._ea_alpha_tilting
         if isinstance(alpha_tilting, (list, tuple)) and len(alpha_tilting) == 2:
             start_sigma, end_sigma = self._ea_sigma_range
             range    = end_sigma - start_sigma
-            progress = max(0.0, min(1.0, (sigma_f - start_sigma) / range)) if range != 0 else 1.0
-            alpha = alpha_tilting[0] + (progress**self._ea_alpha_sharpness) * (alpha_tilting[1] - alpha_tilting[0])
+            progress = max(0.0, min(1.0, (sigma - start_sigma) / range)) if range != 0 else 1.0
+            return alpha_tilting[0] + (progress**self._ea_alpha_sharpness) * (alpha_tilting[1] - alpha_tilting[0])
         else:
-            alpha = float(alpha_tilting)
+            return float(alpha_tilting)
+
+    def _noise_bank_sampler(self,
+                            noise    : Tensor,
+                            *,
+                            seed     : int | None,
+                            max_draws: int,
+                            ) -> Callable:
+        """
+        Returns a noise sampler that serves standard noise from pre-drawn batches.
 
-        # use the base sampler to generate standard noise and then adjust its spectral distribution
-        noise = base_noise_sampler(sigma, *args, **kwargs)
-        return _adjust_spectral_distribution(noise, alpha=alpha, force_zero_mean=False)
+        The draws expected for the sampling process are generated with one
+        `torch.randn(..)` call every `NOISE_BANK_MAX_STEPS` steps, so the bank
+        holds at most that many steps of noise on the device of the latent;
+        the batches are drawn lazily, so a sampler that never asks for noise
+        costs nothing.
+        """
+        generator = torch.Generator(device=noise.device)
+        if seed is not None:
+            generator.manual_seed(seed)
+        else:
+            generator.seed()
+        batch_draws = max(1, min(max_draws, self.NOISE_BANK_MAX_STEPS * self.NOISE_DRAWS_PER_STEP))
+        bank: list[Tensor] = []
+
+        def noise_bank_sampler(*args, **kwargs) -> Tensor:
+            if not bank:
+                bank.extend( torch.randn((batch_draws, *noise.shape), dtype=noise.dtype, layout=noise.layout,
+                                         device=noise.device, generator=generator).unbind(0) )
+                bank.reverse()
+            return bank.pop()
+        return noise_bank_sampler
 
 
 #==================== EULER Ancestral Spectral Sampler =====================#
@@ -189,6 +256,8 @@ class DPMPP_SDEss(SpectralAdjustedSampler):
         r:               Order parameter for the DPM-Solver++ algorithm.
         noise_device:    The device to allocate the noise generation, defaults to 'cpu'.
     """
+    NOISE_DRAWS_PER_STEP = 2  # dpm++ sde draws noise twice per step
+
     def __init__(self,
                  alpha_tilting  : tuple[float,float] | float = (0.1, -1.0),
                  alpha_sharpness: float                      = 1.0,
@@ -211,9 +280,133 @@ class DPMPP_SDEss(SpectralAdjustedSampler):
         super().__init__(alpha_tilting, alpha_sharpness, sigma_range, inner_sampler=dpmpp_sde)
 
 
+#===================== Sub-seed Keyed Stochastic Sampler ====================#
+
+class SubseedNoiseSampler(KSAMPLER):
+    """
+    Wrapper class that makes the noise drawn by a stochastic sampler depend
+    only on the sub-seed of each batch element and not on its position.
+
+    ComfyUI samplers draw their stochastic noise for the whole batch from a
+    single generator, so the noise of an element changes when the batch is
+    reordered, deduplicated or split. This wrapper provides the inner sampler
+    with a noise sampler where every element has its own random stream,
+    derived from the sampling seed and its sub-seed; elements with the same
+    sub-seed always receive identical noise. Samplers that do not accept a
+    `noise_sampler` argument (e.g. "euler") are executed unchanged.
+
+    When a list of per-element seeds is provided, those seeds replace the
+    sampling seed and each element receives the same noise it would receive
+    if it were sampled alone with its seed.
+
+    Args:
+        inner_sampler  : The `KSAMPLER` instance to be wrapped.
+        batch_subseeds : List of virtual seeds, one for each element in the batch, or None.
+        batch_seeds    : Optional list of seeds, one for each element in the batch.
+        noise_generator: The random generator used for the noise, "legacy" (default) or "philox".
+    """
+    def __init__(self,
+                 inner_sampler  : KSAMPLER,
+                 batch_subseeds : list[int] | None,
+                 *,
+                 batch_seeds    : list[int] | None = None,
+                 noise_generator: str              = "legacy",
+                 ):
+        self._inner_sampler   = inner_sampler
+        self._batch_subseeds  = list(batch_subseeds) if batch_subseeds else None
+        self._batch_seeds     = list(batch_seeds)    if batch_seeds    else None
+        self._noise_generator = noise_generator
+        super().__init__(sampler_function = (lambda *a,**kw: self._inner_sampler_with_subseed_noise(*a, **kw)),
+                         extra_options    = inner_sampler.extra_options.copy(),
+                         inpaint_options  = inner_sampler.inpaint_options.copy()
+                         )
 
+    def _inner_sampler_with_subseed_noise(self,
+                                          model : object,
+                                          noise : Tensor,
+                                          sigmas: Tensor,
+                                          *args, **kwargs,
+                                          ) -> Tensor:
+        """Execute the inner sampler providing it a noise sampler keyed by sub-seed.
 
+        This method is registered by the class `__init__` and is invoked
+        by ComfyUI each time a denoising process is performed.
+        """
+        inner_function = self._inner_sampler.sampler_function
+        seed = (kwargs.get("extra_args") or {}).get("seed")
+        if (seed is None and self._batch_seeds is None) or kwargs.get("noise_sampler") is not None \
+           or not _accepts_argument(inner_function, "noise_sampler"):
+            return inner_function(model, noise, sigmas, *args, **kwargs)
+
+        batch_size     = noise.shape[0]
+        batch_seeds    = self._batch_seeds    or [int(seed)] * batch_size
+        batch_subseeds = self._batch_subseeds
+        if len(batch_seeds) != batch_size or (batch_subseeds and len(batch_subseeds) != batch_size):
+            raise ValueError(f"Expected {batch_size} batch seeds/subseeds for the sampler noise")
+
+        noise_sampler = _subseed_noise_sampler(noise, batch_seeds, batch_subseeds, self._noise_generator)
+        return inner_function(model, noise, sigmas, *args, noise_sampler=noise_sampler, **kwargs)
+
+
+def _subseed_noise_sampler(noise          : Tensor,
+                           batch_seeds    : list[int],
+                           batch_subseeds : list[int] | None,
+                           noise_generator: str,
+                           ) -> Callable:
+    """
+    Returns a noise sampler where the noise of each element depends only on (seed, sub-seed, draw).
 
+    With the "philox" generator each draw is computed for all the elements sharing
+    a seed at once, using a different key per draw; with the "legacy" generator (and
+    for elements without sub-seed, which must match a sampling of that element alone)
+    every distinct (seed, sub-seed) pair owns a `torch.Generator` that draws its noise
+    sequentially.
+    """
+    shape, dtype, layout, device = noise.shape, noise.dtype, noise.layout, noise.device
+    draw_count = 0
+
+    if noise_generator == "philox" and batch_subseeds:
+        seed_groups: dict[int, list[int]] = {}
+        for i, seed in enumerate(batch_seeds):
+            seed_groups.setdefault(seed, []).append(i)
+
+        def philox_noise_sampler(*args, **kwargs) -> Tensor:
+            nonlocal draw_count
+            draw_count += 1
+            if len(seed_groups) == 1:
+                draw_seed = (batch_seeds[0] + draw_count * _GOLDEN_64) & _UINT64_MASK
+                return _generate_philox_noise(draw_seed, shape, dtype, None, None, batch_subseeds, device)
+            result = torch.empty(shape, dtype=dtype, device=device)
+            for seed, rows in seed_groups.items():
+                draw_seed = (seed + draw_count * _GOLDEN_64) & _UINT64_MASK
+                result[rows] = _generate_philox_noise(draw_seed, (len(rows), *shape[1:]), dtype, None, None,
+                                                      [ batch_subseeds[i] for i in rows ], device)
+            return result
+        return philox_noise_sampler
+
+    # (an element without sub-seed uses a generator seeded with its seed, exactly as
+    #  the default noise sampler of ComfyUI does when sampling that element alone)
+    keys     = [ (seed, int(batch_subseeds[i]) if batch_subseeds else 0) for i, seed in enumerate(batch_seeds) ]
+    unique   = list(dict.fromkeys(keys))
+    position = { key: i for i, key in enumerate(unique) }
+    inverse  = torch.tensor([ position[key] for key in keys ], device=device)
+    generators = [ torch.Generator(device=device).manual_seed( (seed ^ (subseed * _GOLDEN_64)) & _UINT64_MASK )
+                   for seed, subseed in unique ]
+
+    def legacy_noise_sampler(*args, **kwargs) -> Tensor:
+        subnoises = [ torch.randn((1, *shape[1:]), dtype=dtype, layout=layout, device=device, generator=generator)
+                      for generator in generators ]
+        return torch.cat(subnoises).index_select(0, inverse)
+    return legacy_noise_sampler
+
+
+def _accepts_argument(function: Callable, name: str) -> bool:
+    """Returns True if `function` can be called with the keyword argument `name`."""
+    try:
+        parameters = inspect.signature(function).parameters
+    except (TypeError, ValueError):
+        return False
+    return name in parameters or any( p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters.values() )
 
 
 def sampler_from_name(name: str, extra_options={}) -> KSAMPLER:
@@ -236,9 +429,320 @@ def sampler_from_name(name: str, extra_options={}) -> KSAMPLER:
         return sampler_object(name)
 
 
+#========================== Tiled Denoising Sampler ==========================#
+
+class TiledSampler(KSAMPLER):
+    """
+    Wrapper class that makes every model evaluation of a sampler work tile by tile.
+
+    The inner sampler still integrates the whole latent image (including all of
+    its noise, which is generated once for the full size, so every position
+    receives the same noise whatever the tile layout), but each prediction of
+    the model is computed on overlapping tiles that are blended back together
+    with feathered weights. The memory used by the model is bounded by the tile
+    size instead of by the size of the latent image.
+
+    Args:
+        inner_sampler: The `KSAMPLER` instance to be wrapped.
+        tile_size    : Size (height, width) of the tiles in latent pixels.
+        tile_overlap : Overlap between neighbouring tiles in latent pixels.
+    """
+    def __init__(self,
+                 inner_sampler: KSAMPLER,
+                 tile_size    : tuple[int, int],
+                 tile_overlap : int,
+                 ):
+        self._inner_sampler = inner_sampler
+        self._tile_size     = tile_size
+        self._tile_overlap  = tile_overlap
+        super().__init__(sampler_function = (lambda *a,**kw: self._inner_sampler_with_tiled_model(*a, **kw)),
+                         extra_options    = inner_sampler.extra_options.copy(),
+                         inpaint_options  = inner_sampler.inpaint_options.copy()
+                         )
+
+    def _inner_sampler_with_tiled_model(self,
+                                        model : object,
+                                        noise : Tensor,
+                                        sigmas: Tensor,
+                                        *args, **kwargs,
+                                        ) -> Tensor:
+        """Execute the inner sampler replacing its denoiser with a tiled one.
+
+        This method is registered by the class `__init__` and is invoked
+        by ComfyUI each time a denoising process is performed.
+        """
+        inner_function = self._inner_sampler.sampler_function
+        tiles = tile_layout(noise.shape[-2:], self._tile_size, self._tile_overlap, device=noise.device)
+        denoiser = getattr(model, "inner_model", None)
+        if len(tiles) <= 1 or denoiser is None:
+            return inner_function(model, noise, sigmas, *args, **kwargs)
+
+        # the inpainting logic of ComfyUI's model wrapper stays outside the tiles
+        model.inner_model = _TiledDenoiser(denoiser, tiles)
+        try:
+            return inner_function(model, noise, sigmas, *args, **kwargs)
+        finally:
+            model.inner_model = denoiser
+
+
+class _TiledDenoiser:
+    """Calls the wrapped denoiser once per tile and blends the predictions."""
+    def __init__(self, denoiser: Callable, tiles: list[tuple[slice, slice, Tensor]]):
+        self._denoiser = denoiser
+        self._tiles    = tiles
+
+    def __getattr__(self, name: str):
+        return getattr(self._denoiser, name)
+
+    def __call__(self, x: Tensor, sigma: Tensor, *args, **kwargs) -> Tensor:
+        output = None
+        for rows, cols, weight in self._tiles:
+            denoised = self._denoiser(x[..., rows, cols], sigma, *args, **kwargs)
+            if output is None:
+                output = torch.zeros(x.shape, dtype=denoised.dtype, device=denoised.device)
+            output[..., rows, cols] += denoised * weight.to(denoised.device, denoised.dtype)
+        return cast(Tensor, output)
+
+
+def tile_layout(size        : tuple[int, int] | torch.Size,
+                tile_size   : tuple[int, int],
+                tile_overlap: int,
+                *,
+                device      : torch.device | str = "cpu",
+                ) -> list[tuple[slice, slice, Tensor]]:
+    """
+    Splits an image into overlapping tiles with feathered blending weights.
+
+    The tiles are evenly distributed with at least `tile_overlap` pixels shared by
+    neighbouring tiles (positions are aligned to 2 pixels, the patch size of the model).
+    Within the shared pixels the weights ramp linearly from one tile to the other,
+    and the weights of all the tiles covering a pixel always sum to 1.
+
+    Args:
+        size        : Size (height, width) of the image.
+        tile_size   : Maximum size (height, width) of the tiles.
+        tile_overlap: Minimum number of pixels shared by neighbouring tiles.
+        device      : Device where the weights are created.
+    Returns:
+        A list of (rows, cols, weight) tuples, where `rows` and `cols` are the slices
+        of the tile and `weight` is a tensor of shape [1, 1, tile_height, tile_width].
+    """
+    row_spans = _tile_spans(int(size[0]), int(tile_size[0]), tile_overlap)
+    col_spans = _tile_spans(int(size[1]), int(tile_size[1]), tile_overlap)
+    row_ramps = _tile_ramps(row_spans, device)
+    col_ramps = _tile_ramps(col_spans, device)
+    return [ (slice(*row_span), slice(*col_span), (row_ramp[:,None] * col_ramp[None,:])[None,None])
+             for row_span, row_ramp in zip(row_spans, row_ramps)
+             for col_span, col_ramp in zip(col_spans, col_ramps) ]
+
+
+def _tile_spans(size: int, tile: int, overlap: int) -> list[tuple[int, int]]:
+    """Returns the (start, end) of the evenly distributed tiles covering `size` pixels."""
+    if tile <= 0 or size <= tile:
+        return [ (0, size) ]
+    overlap   = min(max(overlap, 2), tile - 2)
+    num_tiles = math.ceil( (size - overlap) / (tile - overlap) )
+    starts    = [ (i * (size - tile) // (num_tiles - 1)) // 2 * 2 for i in range(num_tiles - 1) ] + [ size - tile ]
+    return [ (start, start + tile) for start in starts ]
+
+
+def _tile_ramps(spans: list[tuple[int, int]], device: torch.device | str) -> list[Tensor]:
+    """Returns the 1D blending weights of each tile, normalized so that they sum to 1 at every pixel."""
+    ramps = []
+    for i, (start, end) in enumerate(spans):
+        ramp = torch.ones(end - start, dtype=torch.float32)
+        if i > 0:
+            shared = spans[i-1][1] - start
+            ramp[:shared] = torch.arange(1, shared+1, dtype=torch.float32) / (shared+1)
+        if i < len(spans) - 1:
+            shared = end - spans[i+1][0]
+            ramp[-shared:] = torch.minimum( ramp[-shared:], torch.arange(shared, 0, -1, dtype=torch.float32) / (shared+1) )
+        ramps.append(ramp)
+    total = torch.zeros(spans[-1][1], dtype=torch.float32)
+    for (start, end), ramp in zip(spans, ramps):
+        total[start:end] += ramp
+    return [ (ramp / total[start:end]).to(device) for (start, end), ramp in zip(spans, ramps) ]
+
+
+#======================= Convergence Early-Exit Sampler ======================#
+
+class ConvergenceSampler(KSAMPLER):
+    """
+    Wrapper class that finishes a sampler early once its prediction stops changing.
+
+    After every step the prediction of the denoised image (x0) is compared with
+    the one of the previous step; when the relative change of every image in the
+    batch falls below `threshold`, the sampling finishes with a final denoise,
+    returning the last prediction (the same as an euler step down to sigma 0)
+    and skipping the remaining steps. The statistics of the last run are kept
+    in the `steps_*` and `*evaluations` attributes.
+
+    Args:
+        inner_sampler: The `KSAMPLER` instance to be wrapped.
+        threshold    : Relative change of the prediction (mean absolute change divided by
+                       the mean absolute value) below which the sampling is finished.
+    """
+    def __init__(self,
+                 inner_sampler: KSAMPLER,
+                 threshold    : float,
+                 ):
+        self._inner_sampler    = inner_sampler
+        self._threshold        = threshold
+        self.steps_total       = 0
+        self.steps_run         = 0
+        self.evaluations       = 0
+        self.saved_evaluations = 0
+        super().__init__(sampler_function = (lambda *a,**kw: self._inner_sampler_with_early_exit(*a, **kw)),
+                         extra_options    = inner_sampler.extra_options.copy(),
+                         inpaint_options  = inner_sampler.inpaint_options.copy()
+                         )
+
+    def _inner_sampler_with_early_exit(self,
+                                       model : object,
+                                       noise : Tensor,
+                                       sigmas: Tensor,
+                                       *args,
+                                       callback: Callable | None = None,
+                                       **kwargs,
+                                       ) -> Tensor:
+        """Execute the inner sampler, finishing it as soon as its prediction converges.
+
+        This method is registered by the class `__init__` and is invoked
+        by ComfyUI each time a denoising process is performed.
+        """
+        inner_function = self._inner_sampler.sampler_function
+        counting_model = _CountingModel(model)
+        num_steps      = sigmas.shape[-1] - 1
+        evaluations    : list[int]     = []  # model evaluations made up to each step
+        previous       : Tensor | None = None
+
+        def early_exit_callback(info: dict) -> None:
+            nonlocal previous
+            if callback is not None:
+                callback(info)
+            denoised = info["denoised"]
+            evaluations.append(counting_model.count)
+            step = len(evaluations) - 1
+            if previous is not None and step < num_steps - 1:
+                dims   = tuple(range(1, denoised.ndim))
+                change = (denoised - previous).abs().mean(dim=dims) / previous.abs().mean(dim=dims).clamp_min(1e-8)
+                if bool( (change < self._threshold).all() ):
+                    raise _Converged(denoised, step)
+            previous = denoised
+
+        self.steps_total, self.saved_evaluations = num_steps, 0
+        try:
+            samples = inner_function(counting_model, noise, sigmas, *args, callback=early_exit_callback, **kwargs)
+            self.steps_run = num_steps
+        except _Converged as converged:
+            samples = converged.denoised
+            self.steps_run = converged.step + 1
+            evaluations_per_step   = evaluations[-1] - evaluations[-2]
+            self.saved_evaluations = evaluations[0] + evaluations_per_step * (num_steps - 1) - evaluations[-1]
+        self.evaluations = counting_model.count
+        return samples
+
+
+class _Converged(Exception):
+    """Raised from the sampler callback to finish the sampling with the given prediction."""
+    def __init__(self, denoised: Tensor, step: int):
+        super().__init__(f"converged at step {step}")
+        self.denoised = denoised
+        self.step     = step
+
+
+class CountingSampler(KSAMPLER):
+    """
+    Wrapper class that counts the model evaluations made by a sampler.
+
+    The number of evaluations differs between samplers for the same sigmas
+    (e.g. "dpmpp_sde" evaluates the model twice per step); the count of the
+    last run is kept in the `evaluations` attribute.
+
+    Args:
+        inner_sampler: The `KSAMPLER` instance to be wrapped.
+    """
+    def __init__(self, inner_sampler: KSAMPLER):
+        self._inner_sampler = inner_sampler
+        self.evaluations    = 0
+        super().__init__(sampler_function = (lambda *a,**kw: self._inner_sampler_with_counting(*a, **kw)),
+                         extra_options    = inner_sampler.extra_options.copy(),
+                         inpaint_options  = inner_sampler.inpaint_options.copy()
+                         )
+
+    def _inner_sampler_with_counting(self, model: object, *args, **kwargs) -> Tensor:
+        """Execute the inner sampler counting the evaluations of the model.
+
+        This method is registered by the class `__init__` and is invoked
+        by ComfyUI each time a denoising process is performed.
+        """
+        counting_model = _CountingModel(model)
+        try:
+            return self._inner_sampler.sampler_function(counting_model, *args, **kwargs)
+        finally:
+            self.evaluations = counting_model.count
+
+
+class _CountingModel:
+    """Counts the evaluations of the wrapped model."""
+    def __init__(self, model: Callable):
+        self._model = model
+        self.count  = 0
+
+    def __getattr__(self, name: str):
+        return getattr(self._model, name)
+
+    def __call__(self, *args, **kwargs) -> Tensor:
+        self.count += 1
+        return self._model(*args, **kwargs)
+
+
 #============================ NOISE PROCESSING =============================#
 
-def generate_noise(seed           : int,
+# available noise generators:
+#  - "legacy": torch's sequential RNG, reproduces the noise of previous versions
+#  - "philox": counter-based RNG, jumps directly to the noise of any sub-seed
+NOISE_GENERATORS = ("legacy", "philox")
+
+# available noise devices:
+#  - "reproducible": the noise is generated on CPU, the result is the same on any machine
+#  - "fast"        : the noise is generated directly on the device where it will be used,
+#                    avoiding the host-side generation and the transfer to that device
+NOISE_DEVICES = ("reproducible", "fast")
+
+
+def resolve_noise_device(noise_device  : str,
+                         target_device : str | torch.device,
+                         ) -> torch.device:
+    """
+    Returns the device where the noise must be generated for the given noise device mode.
+
+    With the "legacy" generator each device has its own random stream, so "fast"
+    produces noise that is statistically equivalent but different from the CPU one.
+    With the "philox" generator all the integer operations are exact on any device
+    and only the final float32 transform differs; each float32 implementation stays
+    within 2e-5 of a float64 reference (mean error ~1e-7), which bounds the
+    divergence between "fast" and "reproducible" to a few 1e-5 per element.
+
+    Args:
+        noise_device : The noise device mode, "reproducible" or "fast" (see `NOISE_DEVICES`).
+        target_device: The device where the noise will be used.
+    """
+    if noise_device == "reproducible":
+        return torch.device("cpu")
+    if noise_device == "fast":
+        return torch.device(target_device)
+    raise ValueError(f"Unknown noise device '{noise_device}', expected one of {NOISE_DEVICES}")
+
+
+def offset_seed(seed: int | list[int], offset: int) -> int | list[int]:
+    """Returns the seed shifted by `offset`, or each seed shifted if a per-image list is provided."""
+    if isinstance(seed, (list,tuple)):
+        return [ s + offset for s in seed ]
+    return seed + offset
+
+
+def generate_noise(seed           : int | list[int],
                    shape          : tuple[int, ...],
                    *,
                    noise_bias     : Tensor | float | int | None = None,
@@ -246,15 +750,73 @@ def generate_noise(seed           : int,
                    batch_subseeds : list[int] | None                  = None,
                    dtype          : torch.dtype,
                    layout         : torch.layout,
-                   device         : str | torch.device = "cpu"
+                   device         : str | torch.device = "cpu",
+                   noise_generator: str                = "legacy",
                    ):
     """
     Generate batched noise with optional per-sample 'virtual' sub-seeds.
+
+    With the "legacy" generator the noise of sub-seed N is only reachable by
+    drawing the noise of all the sub-seeds before it; the "philox" generator
+    computes the noise of each sub-seed directly, at a cost independent of
+    its value (see `NOISE_GENERATORS`).
+
+    When `seed` is a list with one seed per sample, the noise of each sample
+    is generated as if it were the only one in the batch, so it's identical
+    to the noise of a single-sample generation with that seed.
     """
-    generator = torch.manual_seed(seed)
+    if isinstance(seed, (list,tuple)):
+        return _generate_per_seed_noise(list(seed), shape, dtype, layout, noise_bias, noise_scale,
+                                        batch_subseeds, device, noise_generator)
+    if noise_generator == "philox":
+        return _generate_philox_noise(seed, shape, dtype, noise_bias, noise_scale, batch_subseeds, device)
+    if noise_generator != "legacy":
+        raise ValueError(f"Unknown noise generator '{noise_generator}', expected one of {NOISE_GENERATORS}")
+    if torch.device(device).type == "cpu":
+        generator = torch.manual_seed(seed)
+    else:
+        generator = torch.Generator(device=device).manual_seed(seed)
     return _generate_noise(generator, shape, dtype, layout, noise_bias, noise_scale, batch_subseeds, device)
 
 
+def _generate_per_seed_noise(seeds          : list[int],
+                             shape          : tuple[int, ...],
+                             dtype          : torch.dtype,
+                             layout         : torch.layout,
+                             noise_bias     : Tensor | float | int | None,
+                             noise_scale    : Tensor | float | int | None,
+                             batch_subseeds : list[int] | None,
+                             device         : str | torch.device,
+                             noise_generator: str,
+                             ) -> Tensor:
+    """
+    Generate batched noise where every sample has its own seed (and optional sub-seed).
+    Samples with the same seed and sub-seed receive identical noise.
+    """
+    if len(seeds) != shape[0]:
+        raise ValueError(f"Expected {shape[0]} seeds, but got {len(seeds)}")
+    if batch_subseeds and len(batch_subseeds) != shape[0]:
+        raise ValueError(f"Expected {shape[0]} batch subseeds, but got {len(batch_subseeds)}")
+
+    subnoises: dict[tuple[int, int | None], Tensor] = {}
+    for i, seed in enumerate(seeds):
+        key = (seed, int(batch_subseeds[i]) if batch_subseeds else None)
+        if key not in subnoises:
+            subnoises[key] = generate_noise(seed, (1, *shape[1:]),
+                                            batch_subseeds  = [key[1]] if key[1] is not None else None,
+                                            dtype           = dtype,
+                                            layout          = layout,
+                                            device          = device,
+                                            noise_generator = noise_generator)
+    noise = torch.cat([ subnoises[(seed, int(batch_subseeds[i]) if batch_subseeds else None)]
+                        for i, seed in enumerate(seeds) ])
+
+    # apply noise bias and scale if provided
+    if noise_scale is not None: noise *= _to_device(noise_scale, noise.device)
+    if noise_bias  is not None: noise += _to_device(noise_bias , noise.device)
+    return noise
+
+
 def _generate_noise(generator      : torch.Generator,
                     shape          : tuple[int, ...],
                     dtype          : torch.dtype,
@@ -299,7 +861,7 @@ def _generate_noise(generator      : torch.Generator,
 
         # generate unique noise samples for each unique sub-seed
         subnoises : list[Tensor] = []
-        max_subseed = int(unique_subseeds.max())
+        max_subseed = int(max(unique_subseeds))
         for subseed in range(max_subseed+1):
             subnoise = torch.randn(subnoise_shape, dtype=dtype, layout=layout, generator=generator, device=device)
             if subseed in unique_subseeds:
@@ -311,16 +873,121 @@ def _generate_noise(generator      : torch.Generator,
         noise = torch.randn(shape, dtype=dtype, layout=layout, generator=generator, device=device)
 
      # apply noise bias and scale if provided
-    if noise_scale is not None: noise *= noise_scale
-    if noise_bias  is not None: noise += noise_bias
+    if noise_scale is not None: noise *= _to_device(noise_scale, noise.device)
+    if noise_bias  is not None: noise += _to_device(noise_bias , noise.device)
     return noise
 
 
+def _generate_philox_noise(seed           : int,
+                           shape          : tuple[int, ...],
+                           dtype          : torch.dtype,
+                           noise_bias     : Tensor | float | int | None = None,
+                           noise_scale    : Tensor | float | int | None = None,
+                           batch_subseeds : list[int] | None            = None,
+                           device         : str | torch.device          = "cpu"
+                           ):
+    """
+    Generate batched noise using a counter-based Philox4x32-10 generator.
+
+    Every element of the noise is a pure function of (seed, sub-seed, element
+    index), so the noise of all the samples in the batch is computed at once,
+    whatever the value of their sub-seeds. Samples without an explicit sub-seed
+    use their position in the batch (0, 1, 2, ...).
+
+    Args:
+        seed           : The seed used as the Philox key (up to 64 bits).
+        shape          : Noise shape. The first dimension is the batch size.
+        dtype          : The floating-point dtype of the generated tensor.
+        noise_bias     : Optional constant offset added to the noise.
+        noise_scale    : Optional scale factor applied to the raw normal noise.
+        batch_subseeds : Optional list of non-negative integers that act as virtual seeds
+                          for every sample in the batch. Repeated values yield identical noise.
+        device         : Device where the noise is generated.
+    Returns:
+        A noise tensor of the requested shape, already biased and scaled.
+    """
+    batch_size = shape[0]
+    numel      = math.prod(shape[1:])
+    if not batch_subseeds:
+        batch_subseeds = list(range(batch_size))
+    if len(batch_subseeds) != batch_size:
+        raise ValueError(f"Expected {batch_size} batch subseeds, but got {len(batch_subseeds)}")
+
+    # each philox block (one counter) produces 4 normal values
+    block_count = (numel + 3) // 4
+    subseeds = torch.tensor([int(s) & _UINT64_MASK for s in batch_subseeds], dtype=torch.int64, device=device)
+    blocks   = torch.arange(block_count, dtype=torch.int64, device=device)
+    counter  = ( blocks.expand(batch_size, -1),                                 # c0: block index
+                 torch.zeros(1, dtype=torch.int64, device=device).expand(batch_size, block_count),
+                 ( subseeds        & _UINT32_MASK).unsqueeze(1).expand(-1, block_count), # c2: sub-seed (low)
+                 ((subseeds >> 32) & _UINT32_MASK).unsqueeze(1).expand(-1, block_count), # c3: sub-seed (high)
+                )
+    key = ( seed & _UINT32_MASK, (seed >> 32) & _UINT32_MASK )
+    x0, x1, x2, x3 = _philox4x32(counter, key)
+
+    # Box-Muller transform, each pair of 32-bit integers produces two normal values
+    # (only the top 24 bits are used, so the uniform values are exact float32 in (0,1))
+    def uniform(x: Tensor) -> Tensor:
+        return ((x >> 8).to(torch.float32) + 0.5) * (1.0 / 16777216.0)
+    radius1 = torch.sqrt(-2.0 * torch.log(uniform(x0)))
+    radius2 = torch.sqrt(-2.0 * torch.log(uniform(x2)))
+    angle1  = (2.0 * math.pi) * uniform(x1)
+    angle2  = (2.0 * math.pi) * uniform(x3)
+    normals = torch.stack([radius1 * torch.cos(angle1), radius1 * torch.sin(angle1),
+                           radius2 * torch.cos(angle2), radius2 * torch.sin(angle2)], dim=-1)
+
+    noise = normals.reshape(batch_size, -1)[:, :numel].reshape(shape).to(dtype)
+
+    # apply noise bias and scale if provided
+    if noise_scale is not None: noise *= _to_device(noise_scale, noise.device)
+    if noise_bias  is not None: noise += _to_device(noise_bias , noise.device)
+    return noise
+
+
+def _to_device(value: Tensor | float | int, device: torch.device) -> Tensor | float | int:
+    """Moves `value` to the given device if it's a tensor."""
+    return value.to(device) if isinstance(value, Tensor) else value
+
+
+def _philox4x32(counter: tuple[Tensor, Tensor, Tensor, Tensor],
+                key    : tuple[int, int],
+                rounds : int = 10,
+                ) -> tuple[Tensor, Tensor, Tensor, Tensor]:
+    """
+    Applies the Philox4x32 bijection (Salmon et al., "Parallel Random Numbers:
+    As Easy as 1, 2, 3", SC'11) to the given counters.
+
+    Each 32-bit word is stored in an int64 tensor; the 32x32-bit products are
+    split into 16-bit halves so that no intermediate value overflows 63 bits.
+    """
+    c0, c1, c2, c3 = counter
+    k0, k1 = key
+    for _ in range(rounds):
+        hi0, lo0 = _mulhilo32(_PHILOX_M0, c0)
+        hi1, lo1 = _mulhilo32(_PHILOX_M1, c2)
+        c0, c1, c2, c3 = (hi1 ^ c1 ^ k0), lo1, (hi0 ^ c3 ^ k1), lo0
+        k0 = (k0 + _PHILOX_W0) & _UINT32_MASK
+        k1 = (k1 + _PHILOX_W1) & _UINT32_MASK
+    return c0, c1, c2, c3
+
+
+def _mulhilo32(multiplier: int, x: Tensor) -> tuple[Tensor, Tensor]:
+    """Returns the high and low 32-bit words of the 64-bit product `multiplier * x`."""
+    prod_lo = x * (multiplier & 0xFFFF)   # < 2^48
+    prod_hi = x * (multiplier >> 16)      # < 2^48
+    low_sum = prod_lo + ((prod_hi & 0xFFFF) << 16)
+    return ((prod_hi >> 16) + (low_sum >> 32)) & _UINT32_MASK, low_sum & _UINT32_MASK
+
+
+
 def inject_freq_noise(x    : Tensor,
-                      seed : int,
+                      seed : int | list[int],
                       *,
                       noise_freqs : int   | tuple[int,...]   = 1024,
                       noise_scales: float | tuple[float,...] = 1.0,
+                      batch_subseeds : list[int] | None      = None,
+                      noise_generator: str                   = "legacy",
+                      noise_device   : str                   = "reproducible",
                       ) -> Tensor:
     """
     Injects noise at specified "frequencies" into the input tensor `x`.
@@ -332,6 +999,7 @@ def inject_freq_noise(x    : Tensor,
     Args:
         x            : Input tensor to which noise will be added.
         seed         : Seed for random noise generation to ensure reproducibility.
+                       A list with one seed per element in the batch can be provided.
         noise_freqs  : Frequency factors that determine the resolutions at which
                        noise is generated. Multiple frequencies can be specified as a tuple,
                        resulting in multiple layers of noise with varying smoothness.
@@ -341,12 +1009,18 @@ def inject_freq_noise(x    : Tensor,
         noise_scales : Scale factors for the noise intensities corresponding to each frequency.
                        Multiple scales can be specified as a tuple. Default is 1.0.
                        A 0.0 value disables noise injection for that particular scale and frequency pair.
+        batch_subseeds : Optional list of virtual seeds, one for each element in the batch,
+                         repeated sub-seeds receive identical noise (see `generate_noise(..)`).
+        noise_generator: The random generator used for the noise, "legacy" (default) or "philox".
+        noise_device   : "reproducible" (default) generates the noise on CPU, "fast" generates it
+                         directly on the device of `x`.
 
     Returns:
         The input tensor x with low-frequency noise injected according to
         the provided frequencies and scales.
     """
     h, w  = x.shape[-2:]
+    device = resolve_noise_device(noise_device, x.device)
 
     # force `freqs` and `scales` to be tuples
     freqs : tuple[int, ...]   = noise_freqs  if isinstance(noise_freqs , tuple) else (noise_freqs,)
@@ -354,28 +1028,76 @@ def inject_freq_noise(x    : Tensor,
     if len(freqs) != len(scales):
         raise ValueError("noise_freqs and noise_scales must have the same length")
 
-    # iterate over pairs of frequency/scale injecting the corresponding noise
+    # generate the noise of every frequency layer (octave) directly on the
+    # device of `x`; full-size layers are accumulated as they are, while
+    # low-res layers are collected to be upsampled all together
+    output        = None
+    low_res_noise : list[Tensor] = []
     for freq, scale in zip(freqs, scales):
         if scale <= 0.0  or  freq < (1024/h)  or  freq < (1024/w):
             continue
 
         # generate a small size noise
         low_res_shape = ( *x.shape[:-2], (h * freq) // 1024, (w * freq) // 1024 )
-        seed += 1
+        seed = offset_seed(seed, 1)
         noise = generate_noise(seed,
-                               noise_scale = scale,
-                               shape       = low_res_shape,
-                               dtype       = x.dtype,
-                               layout      = x.layout,
-                               device      = x.device)
-
-        # inject the noise, interpolating it to the input tensor size
-        x = x + F.interpolate(noise,
-                              size          = (h, w),
-                              mode          = 'bilinear',
-                              align_corners = False)
+                               noise_scale    = scale,
+                               batch_subseeds = batch_subseeds,
+                               shape          = low_res_shape,
+                               dtype          = x.dtype,
+                               layout         = x.layout,
+                               device         = device,
+                               noise_generator = noise_generator).to(x.device)
+
+        if noise.shape[-2:] == (h, w):
+            output = (x + noise) if output is None else output.add_(noise)
+        else:
+            low_res_noise.append(noise)
+
+    if output is None:
+        output = x
+    if not low_res_noise:
+        return output
+
+    # bilinear interpolation is separable and linear, so upsampling a layer is
+    # `Ry @ noise @ Rx^T` and the sum of all the upsampled layers is:
+    #   [Ry_1 | Ry_2 | ...] @ [noise_1 @ Rx_1^T ; noise_2 @ Rx_2^T ; ...]
+    # which is accumulated into the output with a single batched matmul
+    batch_channels = x.shape[:-2].numel()
+    rows_matrix = torch.cat([ _bilinear_matrix(h, noise.shape[-2], x.dtype, x.device) for noise in low_res_noise ], dim=1)
+    cols_noise  = torch.cat([ noise.reshape(batch_channels, *noise.shape[-2:]) @
+                              _bilinear_matrix(w, noise.shape[-1], x.dtype, x.device).T
+                              for noise in low_res_noise ], dim=1)
+    output = torch.baddbmm(output.reshape(batch_channels, h, w),
+                           rows_matrix.expand(batch_channels, *rows_matrix.shape),
+                           cols_noise)
+    return output.reshape(x.shape)
+
+
+@functools.lru_cache(maxsize=64)
+def _bilinear_matrix(output_size: int,
+                     input_size : int,
+                     dtype      : torch.dtype,
+                     device     : torch.device,
+                     ) -> Tensor:
+    """
+    Returns the [output_size, input_size] matrix that performs the 1D linear
+    interpolation used by `F.interpolate(.., mode='bilinear', align_corners=False)`.
 
-    return x
+    The returned tensor is shared by every call with the same arguments,
+    so it must not be modified in place.
+    """
+    # (source coordinates are computed in float32, exactly as pytorch does)
+    scale   = torch.tensor(input_size, dtype=torch.float32) / output_size
+    source  = ((torch.arange(output_size, dtype=torch.float32) + 0.5) * scale - 0.5).clamp(min=0.0)
+    index0  = source.floor().long().clamp(max=input_size-1)
+    index1  = (index0 + 1).clamp(max=input_size-1)
+    weight1 = source - index0
+    matrix  = torch.zeros(output_size, input_size, dtype=torch.float32)
+    rows    = torch.arange(output_size)
+    matrix.index_put_((rows, index0), 1.0 - weight1, accumulate=True)
+    matrix.index_put_((rows, index1),       weight1, accumulate=True)
+    return matrix.to(device=device, dtype=dtype)
 
 
 def _adjust_spectral_distribution(noise: Tensor,
@@ -405,40 +1127,58 @@ def _adjust_spectral_distribution(noise: Tensor,
     Returns:
         A tensor with adjusted frequency characteristics.
     """
-    device, dtype = noise.device, noise.dtype
-    B, C, H, W    = noise.shape
+    B, C, H, W = noise.shape
 
     # define spatial normalization dimensions
     norm_dims = (2, 3) if normalize_per_channel else (1, 2, 3)
 
-    # create 2D frequency grid (squared frequency magnitude)
-    u = torch.fft.fftfreq(H, device=device, dtype=dtype).view(H, 1)
-    v = torch.fft.fftfreq(W, device=device, dtype=dtype).view(1, W)
-    spectral_scale_grid = u**2 + v**2
-
-    # avoid division by zero in the DC component (frequency)
-    spectral_scale_grid[0, 0] = 1.0
-
-    # calculate the filter magnitude
-    # [note: in 2d physics often use "(alpha+1.0)" to match 1D energy decay]
-    spectral_filter = spectral_scale_grid ** (power_gamma * alpha)
+    # get the filter for the real FFT of this size (cached, it's the same at every sampling step)
+    spectral_filter = _spectral_filter(H, W, float(alpha), float(power_gamma), noise.dtype, noise.device)
 
     # optional spatial domain mean normalization
     if force_zero_mean:
         noise = noise - noise.mean(dim=norm_dims, keepdim=True)
 
-    # transform to frequency domain, filter, and return to spatial domain
-    noise_fft = torch.fft.fft2(noise, dim=(-2, -1))
-    noise_fft = noise_fft / spectral_filter  #< automatic broadcasting over [B, C, H, W]
-
-    # return to spatial domain (keep the real part)
-    filtered = torch.fft.ifft2(noise_fft, dim=(-2, -1)).real
+    # transform to frequency domain, filter, and return to spatial domain;
+    # the noise is real and the filter symmetric, so the real FFT gives the
+    # same result using only half of the spectrum
+    noise_fft = torch.fft.rfft2(noise, dim=(-2, -1))
+    noise_fft = noise_fft / spectral_filter  #< automatic broadcasting over [B, C, H, W//2+1]
+    filtered  = torch.fft.irfft2(noise_fft, s=(H, W), dim=(-2, -1))
 
     # final intensity/energy normalization
     std = filtered.std(dim=norm_dims, keepdim=True).clamp(min=eps)
     return filtered * (energy_scale / std)
 
 
+@functools.lru_cache(maxsize=64)
+def _spectral_filter(height     : int,
+                     width      : int,
+                     alpha      : float,
+                     power_gamma: float,
+                     dtype      : torch.dtype,
+                     device     : torch.device,
+                     ) -> Tensor:
+    """
+    Returns the filter magnitude used by `_adjust_spectral_distribution(..)`.
+
+    The filter covers the half spectrum produced by `torch.fft.rfft2(..)`,
+    shape = [height, width//2 + 1]. The returned tensor is shared by every
+    call with the same arguments, so it must not be modified in place.
+    """
+    # create 2D frequency grid (squared frequency magnitude)
+    u = torch.fft.fftfreq (height, device=device, dtype=dtype).view(height, 1)
+    v = torch.fft.rfftfreq(width , device=device, dtype=dtype).view(1, width//2 + 1)
+    spectral_scale_grid = u**2 + v**2
+
+    # avoid division by zero in the DC component (frequency)
+    spectral_scale_grid[0, 0] = 1.0
+
+    # calculate the filter magnitude
+    # [note: in 2d physics often use "(alpha+1.0)" to match 1D energy decay]
+    return spectral_scale_grid ** (power_gamma * alpha)
+
+
 #============================ SIGMA OPERATIONS =============================#
 
 def truncate_sigmas_by_step_range(sigmas    : Tensor | None,
@@ -593,9 +1333,9 @@ def merge_sigmas(sigmas1: Tensor | None,
 #============================ IMAGE SCRAMBLING =============================#
 
 def scramble_tensor(x     : Tensor,
-                    counts: tuple[int,int,int,int],
+                    counts: tuple[int,int,int,int] | list[tuple[int,int,int,int]],
                     *,
-                    seed  : int,
+                    seed  : int | list[int],
                     ) -> Tensor:
     """
     Scrambles the input latent image tensor.
@@ -603,6 +1343,8 @@ def scramble_tensor(x     : Tensor,
     The function scrambles the tensor by dividing it into fragments,
     randomly reordering and flipping them, and then combining them while
     preserving the overall standard deviation and mean of the original tensor.
+    Outside of the CPU, all the fragments of all the batch elements are
+    resampled at once with a single `grid_sample` call.
 
     Args:
         x     : Input tensor of shape (B, C, H, W) representing the latent image.
@@ -612,7 +1354,11 @@ def scramble_tensor(x     : Tensor,
                  normal fragments, a negative value adds fragments that are also
                  randomly flipped (horizontally and vertically).
                  Passing `(0,0,0,0)` leaves the tensor unchanged.
+                 A list with one tuple per batch element can be provided to
+                 scramble each element differently.
         seed  : The seed for random number generation to ensure reproducibility.
+                 A list with one seed per batch element can be provided to
+                 scramble each element differently.
     Returns:
         A new tensor with the same shape as `x`, where fragments of the
         original image are scrambled in a random and potentially flipped manner.
@@ -620,89 +1366,188 @@ def scramble_tensor(x     : Tensor,
     ANCHOR_NAMES = ('left', 'top', 'right', 'bottom' )
     if x.dim() != 4:
         raise ValueError("Input tensor must be (B, C, H, W).")
+    B, C, H, W = x.shape
+
+    # a single seed and a single tuple of counts share the same fragments across the whole batch
+    per_element = isinstance(seed, (list,tuple)) or (isinstance(counts, list) and len(counts) > 0 and isinstance(counts[0], (list,tuple)))
+    seeds       = list(seed)   if isinstance(seed, (list,tuple)) else [seed] * (B if per_element else 1)
+    counts_list = list(counts) if (isinstance(counts, list) and counts and isinstance(counts[0], (list,tuple))) else [counts] * len(seeds)
+    if per_element and (len(seeds) != B or len(counts_list) != B):
+        raise ValueError(f"Per-element scrambling requires {B} seeds and {B} counts.")
 
     # if all counts are zero, return the tensor as is
-    if not any(counts):
+    if not any( any(element_counts) for element_counts in counts_list ):
         return x
 
-    x_scale   = x.std (dim=(2,3), keepdim=True)
-    x_bias    = x.mean(dim=(2,3), keepdim=True)
-    generator = torch.Generator().manual_seed(seed)
-
-    result = torch.zeros_like(x)
-    for anchor_idx in range(4):
-        for i in range( abs(counts[anchor_idx]) ):
-            result +=  _random_tensor_fragment(x, generator,
-                                              size   = (0.50,0.75),
-                                              anchor = ANCHOR_NAMES[anchor_idx],
-                                              random_horizontal_flip = counts[anchor_idx]<0,
-                                              random_vertical_flip   = counts[anchor_idx]<0
-                                              )
+    # draw the fragments of each element (always consuming the random numbers
+    # in the same order, so each seed keeps producing the same fragments)
+    fragments: list[list[tuple[int,int,int,int,bool,bool]]] = []
+    for element_seed, element_counts in zip(seeds, counts_list):
+        generator = torch.Generator().manual_seed(element_seed)
+        element_fragments = []
+        for anchor_idx in range(4):
+            for _ in range( abs(element_counts[anchor_idx]) ):
+                element_fragments.append(
+                    _random_fragment_rect(H, W, generator,
+                                          size   = (0.50,0.75),
+                                          anchor = ANCHOR_NAMES[anchor_idx],
+                                          random_horizontal_flip = element_counts[anchor_idx]<0,
+                                          random_vertical_flip   = element_counts[anchor_idx]<0
+                                          ))
+        fragments.append(element_fragments)
+
+    # the two resamplers are intended: on CPU each fragment is stretched with its
+    # own `F.interpolate` call (the original implementation, bit-identical to it
+    # and faster there), on other devices all the fragments are resampled with
+    # a single kernel, which differs from the CPU path only by float rounding
+    if x.device.type == "cpu":
+        result = _interpolate_fragments(x, fragments, per_element)
+    else:
+        result = _grid_sample_fragments(x, fragments)
 
+    x_scale      = x.std (dim=(2,3), keepdim=True)
+    x_bias       = x.mean(dim=(2,3), keepdim=True)
     result_scale = result.std (dim=(2,3), keepdim=True)
     result_bias  = result.mean(dim=(2,3), keepdim=True)
 
     # re-scale/shift to match original features
     scale_factor  = x_scale / result_scale.clamp(min=1e-6)
     combined_bias = x_bias - (result_bias * scale_factor)
-    return result * scale_factor + combined_bias
+    result = result * scale_factor + combined_bias
+
+    # elements without any fragment are left unchanged
+    if per_element and not all( len(element_fragments) > 0 for element_fragments in fragments ):
+        has_fragments = torch.tensor([ len(element_fragments) > 0 for element_fragments in fragments ], device=x.device)
+        result = torch.where(has_fragments[:, None, None, None], result, x)
+    return result
 
 
-def _random_tensor_fragment(x                      : Tensor,
-                            generator              : torch.Generator,
-                            size                   : tuple[float, float] = (0.50, 0.75),
-                            anchor                 : str = 'left',
-                            random_horizontal_flip : bool = True,
-                            random_vertical_flip   : bool = True,
-                            ) -> Tensor:
+def _interpolate_fragments(x          : Tensor,
+                           fragments  : list[list[tuple[int,int,int,int,bool,bool]]],
+                           per_element: bool,
+                           ) -> Tensor:
+    """
+    Returns the sum of the fragments stretched to the full size of `x`,
+    resampling each fragment with its own `F.interpolate` call.
+    """
+    H, W   = x.shape[-2:]
+    result = torch.zeros_like(x)
+    for b, element_fragments in enumerate(fragments):
+        element = x[b:b+1] if per_element else x
+        for top, left, frag_height, frag_width, hflip, vflip in element_fragments:
+            fragment = element[..., top:top + frag_height, left:left + frag_width]
+            if hflip:
+                fragment = torch.flip(fragment, dims=[-1])
+            if vflip:
+                fragment = torch.flip(fragment, dims=[-2])
+            stretched = F.interpolate(fragment, size=(H, W), mode='bilinear', align_corners=False)
+            if per_element:
+                result[b:b+1] += stretched
+            else:
+                result += stretched
+    return result
+
+
+def _grid_sample_fragments(x        : Tensor,
+                           fragments: list[list[tuple[int,int,int,int,bool,bool]]],
+                           ) -> Tensor:
     """
-    Extracts a random rectangular fragment from a 4-dimensional tensor.
+    Returns the sum of the fragments stretched to the full size of `x`,
+    resampling all the fragments of all the batch elements with a single
+    `grid_sample` call.
 
-    This function generates a random fragment by selecting a random rectangle
-    within the tensor and then resizing it to match the original tensor's dimensions.
+    The sampling coordinates are computed in float64 and match the ones of
+    `_interpolate_fragments(..)`; in float32, `grid_sample` rounds them when
+    converting back to pixels, so the result differs by up to ~1e-4.
+    """
+    B, C, H, W = x.shape
+
+    # the sampling grid of every fragment, elements without that many fragments get a zero weight
+    fragment_count = max( len(element_fragments) for element_fragments in fragments )
+    grid_x  = torch.zeros(fragment_count, len(fragments), W, dtype=torch.float64)
+    grid_y  = torch.zeros(fragment_count, len(fragments), H, dtype=torch.float64)
+    weights = torch.zeros(fragment_count, len(fragments), dtype=x.dtype)
+    for b, element_fragments in enumerate(fragments):
+        for f, (top, left, frag_height, frag_width, hflip, vflip) in enumerate(element_fragments):
+            grid_x[f, b] = _fragment_sampling_coords(W, left, frag_width , hflip)
+            grid_y[f, b] = _fragment_sampling_coords(H, top , frag_height, vflip)
+            weights[f, b] = 1.0
+
+    # normalize the coordinates to [-1, 1] (align_corners=True) and build a grid
+    # where the fragments are stacked vertically: (B, fragment_count * H, W, 2)
+    grid_x = grid_x * (2.0 / max(W - 1, 1)) - 1.0
+    grid_y = grid_y * (2.0 / max(H - 1, 1)) - 1.0
+    grid   = torch.stack( torch.broadcast_tensors(grid_x[:, :, None, :], grid_y[:, :, :, None]), dim=-1 )
+    grid   = grid.transpose(0, 1).expand(B, -1, -1, -1, -1).reshape(B, fragment_count * H, W, 2)
+
+    # resample all the fragments at once and add them up
+    resampled = F.grid_sample(x, grid.to(device=x.device, dtype=x.dtype),
+                              mode='bilinear', padding_mode='border', align_corners=True)
+    weights = weights.transpose(0, 1).expand(B, -1).to(device=x.device)
+    return ( resampled.reshape(B, C, fragment_count, H, W) * weights[:, None, :, None, None] ).sum(dim=2)
+
+
+def _random_fragment_rect(height                 : int,
+                          width                  : int,
+                          generator              : torch.Generator,
+                          size                   : tuple[float, float] = (0.50, 0.75),
+                          anchor                 : str = 'left',
+                          random_horizontal_flip : bool = True,
+                          random_vertical_flip   : bool = True,
+                          ) -> tuple[int, int, int, int, bool, bool]:
+    """
+    Selects a random rectangular fragment within a tensor of the given size.
 
     Args:
-        x         : Input tensor of shape (B, C, H, W) representing an image or feature map.
+        height    : Height of the tensor.
+        width     : Width of the tensor.
         generator : Random number generator for reproducibility.
         size      : Minimum and maximum relative size of the fragment as a
                      ratio of the input tensor's width. Defaults to (0.50, 0.75)
         anchor    : Specifies the side to which the fragment is anchored.
-                     Can be either 'left' or 'right'. Defaults to 'left'.
+                     Can be 'left', 'top', 'right' or 'bottom'. Defaults to 'left'.
     Returns:
-        A tensor of the same shape as the input tensor, containing a randomly selected fragment.
+        A tuple (top, left, height, width, horizontal_flip, vertical_flip) describing the fragment.
     """
-    if x.dim() != 4:
-        raise ValueError("Input tensor must be 4-D (B, C, H, W).")
     if anchor not in {"left", "top", "right", "bottom"}:
-        raise ValueError("anchor must be either 'left' or 'right'.")
-
-    B, C, H, W = x.shape
+        raise ValueError("anchor must be one of 'left', 'top', 'right' or 'bottom'.")
+    H, W = height, width
 
     # give the rectangle a random size within the provided limits.
     min_size, max_size = size
-    ratio = torch.rand(1, generator=generator, device=x.device) * (max_size - min_size) + min_size
+    ratio = torch.rand(1, generator=generator, device="cpu") * (max_size - min_size) + min_size
     frag_width  = int(W * ratio)
     frag_height = int(H * ratio)
 
     # place the rectangle in a random position inside the tensor
     if anchor == "left" or anchor == "right":
-        top  = torch.randint(0, H - frag_height + 1, (1,), generator=generator, device="cpu").item()
+        top  = int( torch.randint(0, H - frag_height + 1, (1,), generator=generator, device="cpu") )
         left = 0 if anchor == "left" else W - frag_width
     else:
-        left = torch.randint(0, W - frag_width + 1, (1,), generator=generator, device="cpu").item()
+        left = int( torch.randint(0, W - frag_width + 1, (1,), generator=generator, device="cpu") )
         top  = 0 if anchor == "top" else H - frag_height
 
-    # fragment = (B, C, fh, fw)
-    fragment = x[..., top:top + frag_height, left:left + frag_width]
+    # optional random flips
+    hflip = random_horizontal_flip and float( torch.rand(1, generator=generator, device="cpu") ) > 0.5
+    vflip = random_vertical_flip   and float( torch.rand(1, generator=generator, device="cpu") ) > 0.5
+    return top, left, frag_height, frag_width, hflip, vflip
 
-    # optional random horizontal flip
-    if random_horizontal_flip and torch.rand(1, generator=generator, device="cpu").item() > 0.5:
-        fragment = torch.flip(fragment, dims=[-1])
 
-    # optional random vertical flip
-    if random_vertical_flip and torch.rand(1, generator=generator, device="cpu").item() > 0.5:
-        fragment = torch.flip(fragment, dims=[-2])
+def _fragment_sampling_coords(size          : int,
+                              frag_start    : int,
+                              frag_size     : int,
+                              flip          : bool,
+                              ) -> Tensor:
+    """
+    Returns the source pixel coordinates that stretch a fragment to the full `size`.
 
-    # return = (B, C, H, W)
-    return F.interpolate(fragment, size=(H, W), mode='bilinear', align_corners=False)
+    The coordinates reproduce `F.interpolate(mode='bilinear', align_corners=False)`
+    applied to the (optionally flipped) fragment, expressed in pixel units of the
+    whole tensor, so the fragment can be sampled in place with `grid_sample`.
+    """
+    scale  = torch.tensor(frag_size / size, dtype=torch.float64)
+    coords = ( scale * (torch.arange(size, dtype=torch.float64) + 0.5) - 0.5 ).clamp(0, frag_size - 1)
+    if flip:
+        coords = (frag_size - 1) - coords
+    return coords + frag_start
 
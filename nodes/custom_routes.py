@@ -16,9 +16,11 @@ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
 """
 import os
 import re
+import functools
 from aiohttp                     import web
 from server                      import PromptServer
 from aiohttp                     import web
+from .core.metrics               import METRICS, ROUTE_REQUESTS, PROMETHEUS_CONTENT_TYPE
 from .core.style                 import StyleSet
 from .core.palette               import PaletteSet
 from .core.helpers               import get_project_root
@@ -121,10 +123,34 @@ def _sanitize_filename(filename: str) -> str:
     return f"{safe_name}.{safe_ext}" if safe_ext else safe_name
 
 
+def _counted(route_name: str):
+    """
+    Decorator that counts the requests served by a route in the project metrics.
+    Args:
+        route_name (str): The name of the route used as label in the metrics.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(request: web.Request) -> web.StreamResponse:
+            status = 500
+            try:
+                response = await handler(request)
+                status   = response.status
+                return response
+            except web.HTTPException as e:
+                status = e.status
+                raise
+            finally:
+                ROUTE_REQUESTS.inc(route=route_name, status=str(status))
+        return wrapper
+    return decorator
+
+
 
 #============================== SERVER ROUTES ==============================#
 
 @routes.get("/zi_power/palettes/by_version")
+@_counted("palettes/by_version")
 async def get_palettes_by_version(request: web.Request) -> web.StreamResponse:
     """
     Retrieves a list of palettes based on the specified collection version.
@@ -153,6 +179,7 @@ async def get_palettes_by_version(request: web.Request) -> web.StreamResponse:
 
 
 @routes.get("/zi_power/styles/by_version")
+@_counted("styles/by_version")
 async def get_styles_by_version(request: web.Request) -> web.StreamResponse:
     """
     Retrieves a list of styles based on the specified version.
@@ -181,6 +208,7 @@ async def get_styles_by_version(request: web.Request) -> web.StreamResponse:
 
 
 @routes.get("/zi_power/styles/samples")
+@_counted("styles/samples")
 async def get_style_sample(request: web.Request) -> web.StreamResponse:
     #
     # To request a style sample, you should use:
@@ -196,3 +224,15 @@ async def get_style_sample(request: web.Request) -> web.StreamResponse:
     if not fullpath or not os.path.isfile(fullpath):
         fullpath = get_project_root() / "styles" / "samples" / "00-sample-not-available.jpg"
     return web.FileResponse(fullpath)
+
+
+
+@routes.get("/zi_power/metrics")
+async def get_metrics(request: web.Request) -> web.StreamResponse:
+    """
+    Exposes the metrics of the project in the Prometheus text format.
+    Example usage:
+        GET /zi_power/metrics
+    """
+    return web.Response(body    = METRICS.render().encode("utf-8"),
+                        headers = {"Content-Type": PROMETHEUS_CONTENT_TYPE})
@@ -269,6 +269,27 @@ class Separator:
             super().__init__(**kwargs)
 
 
+#============================= SEED LIST INPUT =============================#
+
+def seed_list_input(id: str = "seed_list") -> io.String.Input:
+    """
+    Returns the optional "seed list" input shared by the Z-Sampler Turbo nodes.
+
+    The text of the input is parsed with `parse_seed_list(..)` and resolved
+    against the seed of the node with `resolve_seed(..)` (see core/helpers.py).
+    Args:
+        id (str, optional): A unique identifier for the input component. Defaults to "seed_list".
+    """
+    return io.String.Input(id,
+                           default="", multiline=False, optional=True,
+                           placeholder="e.g. 1, 5, 9-12",
+                           tooltip="Optional list of seeds, separated by commas, with ranges written as "
+                                   "'first-last'. When it is not empty, it replaces 'seed' and the batch "
+                                   "is filled with one image per seed; each image is identical to the "
+                                   "one generated with its seed alone. ",
+                          )
+
+
 #==================== STYLE GALLERY BUTTON [DEPRECATED] ====================#
 
 @io.comfytype(io_type="ZIPN_STYLE_GALLERY_BUTTON")
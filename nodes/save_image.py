@@ -19,6 +19,7 @@ Code for the metadata extraction process used by CivitAI:
 """
 import os
 import json
+import time
 import numpy as np
 import folder_paths
 from PIL                 import Image
@@ -26,6 +27,7 @@ from PIL.PngImagePlugin  import PngInfo
 from comfy_api.latest    import io
 from typing              import Any
 from .core.system        import logger
+from .core.metrics       import SAVE_IMAGE_BYTES, SAVE_IMAGE_ENCODE_SECONDS
 from .core.helpers       import expand_date_and_vars, normalize_images
 from .core.helpers_node  import get_input_int, get_input_float, get_input_string, \
                                 get_input_node, get_class_type, find_prompt
@@ -163,9 +165,12 @@ class SaveImage(io.ComfyNode):
             filename  = f"{batch_name}_{counter+batch_number:05}_.png"
             file_path =  os.path.join(full_output_folder, filename)
 
+            start_time = time.perf_counter()
             image.save(file_path,
                        pnginfo        = pnginfo,
                        compress_level = cls.xCOMPRESS_LVL)
+            SAVE_IMAGE_ENCODE_SECONDS.observe(time.perf_counter() - start_time, type=cls.xTYPE)
+            SAVE_IMAGE_BYTES.inc(os.path.getsize(file_path), type=cls.xTYPE)
             image_locations.append({"filename" : filename,
                                     "subfolder": subfolder,
                                     "type"     : cls.xTYPE
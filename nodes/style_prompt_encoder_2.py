@@ -14,12 +14,13 @@ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
  - https://docs.comfy.org/custom-nodes/v3_migration
 
 """
-from typing                   import Final
-from functools                import cache
-from comfy_api.latest         import io
-from .core.style              import StyleSet
-from .data.predefined_styles  import PREDEFINED_STYLES
-from .custom_widgets          import StyleGalleryButton, Separator
+from typing                     import Final
+from functools                  import cache
+from comfy_api.latest           import io
+from .core.style                import StyleSet
+from .core.helpers_conditioning import stack_conditionings
+from .data.predefined_styles    import PREDEFINED_STYLES
+from .custom_widgets            import StyleGalleryButton, Separator
 _STL_VERSION: Final[str] = "1.0.0" #< the version of style definitions this node uses
 
 
@@ -70,6 +71,14 @@ class StylePromptEncoder2(io.ComfyNode):
                                 multiline=True, dynamic_prompts=True,
                                 tooltip="The prompt to encode.",
                                ),
+                io.Boolean.Input("prompt_per_line",
+                                 default=False, optional=True, label_on="yes", label_off="no",
+                                 tooltip="Treats each non-empty line of the text as a separate prompt. All the "
+                                         "prompts are encoded and stacked into a single conditioning, so the "
+                                         "sampler renders one image per prompt in the same batch. Prompts of "
+                                         "different lengths are padded with zeros to the longest one, which may "
+                                         "slightly change the images compared to encoding each prompt alone. ",
+                                ),
             ],
             outputs=[
                 io.Conditioning.Output(tooltip="The encoded text used to guide the image generation."),
@@ -81,12 +90,14 @@ class StylePromptEncoder2(io.ComfyNode):
     @classmethod
     def execute(cls,
                 clip,
-                style         : str,
-                text          : str,
-                customization : str = "",
+                style          : str,
+                text           : str,
+                customization  : str  = "",
+                prompt_per_line: bool = False,
                 **kwargs
                 ) -> io.NodeOutput:
-        prompt        = text
+        prompts       = [ line.strip() for line in text.splitlines() if line.strip() ] if prompt_per_line else []
+        prompts       = prompts or [text]
         custom_styles = StyleSet.from_string(customization)
 
         # try to find the definition of the style selected by the user,
@@ -96,13 +107,14 @@ class StylePromptEncoder2(io.ComfyNode):
         if not style_obj:
             style_obj = PREDEFINED_STYLES.by_version(_STL_VERSION).get(style)
 
-        # apply the style template to the prompt
+        # apply the style template to each prompt
         if style_obj:
-            prompt = style_obj.apply_to_prompt(prompt, spicy_impact_booster=False)
+            prompts = [ style_obj.apply_to_prompt(prompt, spicy_impact_booster=False) for prompt in prompts ]
 
-        # encode the prompt using the provided text encoder (clip)
-        tokens = clip.tokenize(prompt)
-        return io.NodeOutput( clip.encode_from_tokens_scheduled(tokens), prompt )
+        # encode each prompt using the provided text encoder (clip),
+        # several prompts are stacked into a conditioning with one row per prompt
+        conditionings = [ clip.encode_from_tokens_scheduled( clip.tokenize(prompt) ) for prompt in prompts ]
+        return io.NodeOutput( stack_conditionings(conditionings), "\n".join(prompts) )
 
 
     #__ VALIDATION ________________________________________
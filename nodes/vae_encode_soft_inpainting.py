@@ -19,6 +19,8 @@ import math
 import torch
 from torchvision.transforms.functional import gaussian_blur
 from comfy_api.latest import io
+from .core.helpers    import mask_crop_box
+CROP_MIN_SIZE  = 512  #< minimum width/height in pixels of the region cropped around the mask
 PIXELS_BY_SIZE = {
     "small"  : 1048576,
     "medium" : 1772093,
@@ -60,17 +62,36 @@ class VAEEncodeSoftInpainting(io.ComfyNode):
                                tooltip="Width in pixels for softening the mask edges. "
                                        "Higher values create a smoother transition with larger masked area.",
                               ),
+                io.Boolean.Input("crop_to_mask", default=False, label_on="yes", label_off="no", optional=True,
+                                 tooltip="Encodes only the region around the mask (at least 512px wide and high), "
+                                         "so small touch-ups on large images are as fast as small generations. "
+                                         "The position of the region is returned in 'x' and 'y' to paste the "
+                                         "decoded result back into the image.",
+                                ),
+                io.Int.Input  ("crop_margin_pixels", default=128, min=0, max=1024, step=8, optional=True,
+                               tooltip="Pixels of context around the mask included in the cropped region.",
+                              ),
             ],
             outputs=[
                 io.Latent.Output(display_name="LATENT",
                                  tooltip="Latent space representation of the encoded image and mask.",
                                 ),
+                io.Int.Output   (display_name="x",
+                                 tooltip="Horizontal position in pixels of the encoded region within the image "
+                                         "resized to 'output_size' (0 unless 'crop_to_mask' is enabled or the "
+                                         "image was trimmed to fit the VAE).",
+                                ),
+                io.Int.Output   (display_name="y",
+                                 tooltip="Vertical position in pixels of the encoded region within the image "
+                                         "resized to 'output_size' (0 unless 'crop_to_mask' is enabled or the "
+                                         "image was trimmed to fit the VAE).",
+                                ),
             ],
         )
 
     #__ FUNCTION __________________________________________
     @classmethod
-    def execute(cls, vae, pixels, mask, output_size, mask_blur_pixels):
+    def execute(cls, vae, pixels, mask, output_size, mask_blur_pixels, crop_to_mask=False, crop_margin_pixels=128):
         # `mask` must have shape [B, C, H, W] or [C, H, W]
 
         gray_out_masked_pixels = False
@@ -114,12 +135,25 @@ class VAEEncodeSoftInpainting(io.ComfyNode):
 
         # crop the image and the mask to the VAE compatible resolution
         pixels = pixels.clone()
+        x_offset, y_offset = 0, 0
         if pixels.shape[1] != vae_height or pixels.shape[2] != vae_width:
             y_offset = (output_height % vae_downscale_ratio) // 2
             x_offset = (output_width  % vae_downscale_ratio) // 2
             pixels = pixels[:  , y_offset:(y_offset+vae_height), x_offset:(x_offset+vae_width), :]
             mask   = mask  [:,:, y_offset:(y_offset+vae_height), x_offset:(x_offset+vae_width)   ]
 
+        # if required, keep only the region around the mask (with a margin of context),
+        # aligned to the patches of the model (2x2 latent pixels)
+        if crop_to_mask:
+            crop_box = mask_crop_box(mask, margin=int(crop_margin_pixels), min_size=CROP_MIN_SIZE,
+                                     align=2*vae_downscale_ratio)
+            if crop_box is not None:
+                top, left, bottom, right = crop_box
+                pixels    = pixels[:  , top:bottom, left:right, :]
+                mask      = mask  [:,:, top:bottom, left:right   ]
+                x_offset += left
+                y_offset += top
+
         # if required, gray out the image where the mask is set
         # (this operation is binary, the pixel is grayed out if the mask value is > 0.5)
         if gray_out_masked_pixels:
@@ -132,6 +166,6 @@ class VAEEncodeSoftInpainting(io.ComfyNode):
             mask = mask.round()
 
         samples = vae.encode(pixels)
-        return ({"samples":samples, "noise_mask": mask}, )
+        return ({"samples":samples, "noise_mask": mask}, x_offset, y_offset)
 
 
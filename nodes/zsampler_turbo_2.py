@@ -15,11 +15,18 @@ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
 
 _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
 """
+import time
+import logging
 from typing                    import Any
 from comfy_api.latest          import io
-from .custom_widgets           import Separator
+from .custom_widgets           import Separator, seed_list_input
+from .core.system              import logger
 from .core.progress_bar        import ProgressPreview
-from .core.zsampler_turbo_core import zsampler_turbo_core
+from .core.zsampler_turbo_core import zsampler_turbo_core, count_model_evaluations, SamplingOptions
+from .core.sampling_profiler   import SamplingProfiler
+from .core.helpers             import resolve_seed
+from .core.tensor_cache        import object_uid
+from .core.latency_estimator   import LatencyEstimator, steps_for_time_budget
 TURBO_CREATIVITY = {
     "off"              : (False, 0),
     "scrambled"        : (True , 0),
@@ -28,6 +35,13 @@ TURBO_CREATIVITY = {
     "refined (3-steps)": (True , 3),
    #"only refining"    : (False, 1),
 }
+SIGMA_PRESET_NAME   = "bravo"  #< sigmas used by this node (also used to count its model evaluations)
+INPAINT_CROP_MARGIN = 128      #< pixels of context around the mask in cropped inpainting
+MAX_BUDGET_STEPS    = 20       #< maximum number of steps chosen in deadline mode (the max of `steps`)
+
+# seconds per model evaluation measured in previous generations,
+# used to choose the number of steps that fits a time budget
+LATENCY_ESTIMATOR = LatencyEstimator()
 
 
 
@@ -125,12 +139,42 @@ class ZSamplerTurbo2(io.ComfyNode):
                                               "steps to try to correct the hallucinations and bring coherence to the "
                                               "image ",
                                      ),
+                io.Int.Input         ("batch_offset",
+                                      default=0, min=0, max=0xffffffff, step=1,
+                                      optional=True,
+                                      tooltip="Position of the first image of this batch within a larger batch that "
+                                              "is split across several workers. Each worker renders its images "
+                                              "exactly as they would be rendered in a single run of the whole batch. "
+                                              "Leave at 0 for a normal batch. ",
+                                     ),
+                seed_list_input(),
+                io.Boolean.Input     ("inpaint_crop",
+                                      default=False, label_on="yes", label_off="no", optional=True,
+                                      tooltip="When the latent has an inpainting mask, only the region around the "
+                                              "mask (with some context) is denoised and pasted back into the image, "
+                                              "so small touch-ups on large images are as fast as small generations. ",
+                                     ),
+                io.Float.Input       ("time_budget",
+                                      default=0.0, min=0.0, max=3600.0, step=0.5, optional=True,
+                                      tooltip="Deadline mode: time budget in seconds for the generation. When it is "
+                                              "not zero, 'steps' is replaced by the largest number of steps that "
+                                              "fits the budget, based on the time measured in previous generations "
+                                              "with the same model and size ('steps' is used until the first "
+                                              "measurement is available). ",
+                                     ),
             ],
             outputs=[
                 io.Latent.Output(display_name="latent_output",
                                  tooltip="The resulting denoised latent image, ready for decoding "
                                          "by a VAE or passed to another node for further processing. "
                                 ),
+                io.Int.Output   (display_name="steps",
+                                 tooltip="The number of steps used (the one chosen in deadline mode). ",
+                                ),
+                io.String.Output(display_name="timing",
+                                 tooltip="The number of steps used and the predicted vs. actual time of the "
+                                         "generation. ",
+                                ),
             ]
         )
 
@@ -150,6 +194,10 @@ class ZSamplerTurbo2(io.ComfyNode):
                 *,
                 positive_stg2       : list | None = None,
                 positive_stg3       : list | None = None,
+                batch_offset        : int         = 0,
+                seed_list           : str         = "",
+                inpaint_crop        : bool        = False,
+                time_budget         : float       = 0.0,
                 **kwargs
                 ) -> io.NodeOutput:
 
@@ -191,14 +239,36 @@ class ZSamplerTurbo2(io.ComfyNode):
         inject_noise_freqs  = None # (  32,  64, 768 )
         inject_noise_scales = None # ( 7.5, 3.7, 3.0 )
 
+        # a non-empty seed list replaces the seed and fills the batch with one image per seed
+        seed = resolve_seed(seed, seed_list)
+
+        # in deadline mode, use the largest number of steps whose model evaluations
+        # fit within the time budget (the latency depends on the model and latent size)
+        samples     = latent_input["samples"]
+        model_key   = object_uid( getattr(model, "model", model) )
+        latent_size = ( max(samples.shape[0], len(seed) if isinstance(seed, list) else 1), *samples.shape[-2:] )
+        evaluations = lambda steps: count_model_evaluations(steps,
+                                                            sigma_preset_name    = SIGMA_PRESET_NAME,
+                                                            sigma_limits         = sigma_limits,
+                                                            noise_estimation     = initial_noise_bias_level != 0,
+                                                            stage2_preproc_steps = stage2_preproc_steps)
+        latency = LATENCY_ESTIMATOR.estimate(model_key, latent_size)
+        if time_budget > 0 and latency is not None:
+            steps = steps_for_time_budget(time_budget, latency, evaluations, max_steps=MAX_BUDGET_STEPS)
+        elif time_budget > 0:
+            logger.info(f"Z-Sampler Turbo: no latency measured yet for a latent of {latent_size}, using {steps} steps")
+
         # run the Z-Sampler Turbo core method on the latent image
+        # (in deadline mode each stage waits for the GPU, so the measured latency is accurate)
+        profiler      = SamplingProfiler(detailed=(time_budget > 0 or logger.isEnabledFor(logging.DEBUG)))
+        start_time    = time.perf_counter()
         latent_output = zsampler_turbo_core(latent_input, model, positive,
                                             seed                      = seed,
                                             steps                     = steps,
                                             initial_noise_bias_level  = initial_noise_bias_level,
                                             initial_noise_overdose    = initial_noise_overdose,
                                             noise_est_sample_size     = initial_sample_size,
-                                            sigma_preset_name         = "bravo",
+                                            sigma_preset_name         = SIGMA_PRESET_NAME,
                                             sigma_limits              = sigma_limits,
                                             positive_stg2_preproc     = positive_stg2_preproc,
                                             positive_stg2             = positive_stg2,
@@ -207,7 +277,27 @@ class ZSamplerTurbo2(io.ComfyNode):
                                             stage2_preproc_steps      = stage2_preproc_steps,
                                             extra_noise_freqs         = inject_noise_freqs,
                                             extra_noise_scales        = inject_noise_scales,
+                                            options                   = SamplingOptions(
+                                                batch_offset        = batch_offset,
+                                                inpaint_crop_margin = INPAINT_CROP_MARGIN if inpaint_crop else None,
+                                            ),
+                                            profiler                  = profiler,
                                             progress_preview = ProgressPreview.from_model( model ),
                                             )
+        elapsed_time = time.perf_counter() - start_time
+
+        # every generation refines the latency estimate for the next ones, using the
+        # model evaluations actually made (fewer, or none, when stages were restored
+        # from the cache or a checkpoint) and only the time of the sampled sections,
+        # which excludes the preparation of the generation (e.g. loading the model)
+        if profiler.evaluations > 0:
+            LATENCY_ESTIMATOR.update(model_key, latent_size, profiler.seconds, profiler.evaluations)
+        predicted    = f"{evaluations(steps) * latency:.2f}s" if latency is not None else "n/a"
+        timing       = f"steps: {steps}, predicted: {predicted}, actual: {elapsed_time:.2f}s"
+        if time_budget > 0:
+            timing += f", budget: {time_budget:.2f}s"
+            logger.info(f"Z-Sampler Turbo: {timing}")
+        else:
+            logger.debug(f"Z-Sampler Turbo: {timing}")
 
-        return io.NodeOutput(latent_output)
+        return io.NodeOutput(latent_output, steps, timing)
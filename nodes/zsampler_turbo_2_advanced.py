@@ -16,11 +16,15 @@ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
 
 _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
 """
+import os
+import folder_paths
 from typing                     import Any
 from comfy_api.latest           import io
-from .custom_widgets            import Separator
+from .custom_widgets            import Separator, seed_list_input
 from .core.progress_bar         import ProgressPreview
-from .core.zsampler_turbo_core  import zsampler_turbo_core
+from .core.zsampler_turbo_core  import zsampler_turbo_core, SamplingOptions, NOISE_BIAS_SOURCES
+from .core.cancellation         import CancellationToken
+from .core.helpers              import resolve_seed
 TURBO_CREATIVITY = {
     "off"              : (False, 0),
     "scrambled"        : (True , 0),
@@ -143,6 +147,56 @@ class ZSamplerTurbo2Advanced(io.ComfyNode):
                                               "steps to try to correct the hallucinations and bring coherence to the "
                                               "image ",
                                      ),
+                seed_list_input(),
+                io.Float.Input       ("composition_scale",
+                                      default=1.0, min=0.25, max=1.0, step=0.05, optional=True,
+                                      tooltip="Fraction of the image size at which the composition (first two stages) "
+                                              "is generated before being upscaled and refined at full size. Values "
+                                              "like 0.5 are much faster on large images, but small details of the "
+                                              "composition may be lost. Only used when generating from pure noise "
+                                              "without an inpainting mask. ",
+                                     ),
+                io.Int.Input         ("tile_size",
+                                      default=0, min=0, max=4096, step=64, optional=True,
+                                      tooltip="Size in pixels of the tiles used to refine very large images in the "
+                                              "final stage, keeping the memory used by the model bounded whatever the "
+                                              "image size. Neighbouring tiles overlap and are blended smoothly. "
+                                              "0 disables tiling. ",
+                                     ),
+                io.Combo.Input       ("intensity_source",
+                                      default="estimated", options=list(NOISE_BIAS_SOURCES), optional=True,
+                                      tooltip="How the noise bias used by 'intensity' is obtained. 'estimated' runs the "
+                                              "model once on a noise sample; 'predicted' uses a predictor calibrated "
+                                              "offline with scripts/noisebias.py, saving that model evaluation (falls "
+                                              "back to 'estimated' when no predictor is installed). ",
+                                     ),
+                io.Float.Input       ("refiner_early_exit",
+                                      default=0.0, min=0.0, max=0.2, step=0.005, optional=True,
+                                      tooltip="Finishes the final (refiner) stage as soon as the image stops changing "
+                                              "between steps by more than this fraction, skipping the remaining "
+                                              "steps. Mostly useful with many steps; 0 always runs every step. ",
+                                     ),
+                io.Boolean.Input     ("draft_on_cancel",
+                                      default=False, label_on="yes", label_off="no", optional=True,
+                                      tooltip="When the generation is cancelled, outputs the image resulting from the "
+                                              "last completed stage instead of stopping the workflow, so a cancelled "
+                                              "job still produces a usable draft. ",
+                                     ),
+                io.Boolean.Input     ("sampling_session",
+                                      default=False, label_on="yes", label_off="no", optional=True,
+                                      tooltip="Prepares the model only once and samples all the stages within a "
+                                              "single session, instead of preparing it again for every stage. "
+                                              "Experimental: it saves time on each generation, but it relies on "
+                                              "internals of ComfyUI that may change between versions. ",
+                                     ),
+                io.String.Input      ("checkpoint_dir",
+                                      default="", multiline=False, optional=True,
+                                      placeholder="e.g. zsampler_checkpoints",
+                                      tooltip="Directory where a checkpoint is written after each stage (relative paths "
+                                              "are inside the ComfyUI output directory). If the same generation is "
+                                              "queued again after being killed, it resumes from the last completed "
+                                              "stage. Leave empty to disable checkpoints. ",
+                                     ),
             ],
             outputs=[
                 io.Latent.Output(display_name="latent_output",
@@ -171,6 +225,14 @@ class ZSamplerTurbo2Advanced(io.ComfyNode):
                 *,
                 positive_stg2         : list | None = None,
                 positive_stg3         : list | None = None,
+                seed_list             : str         = "",
+                composition_scale     : float       = 1.0,
+                tile_size             : int         = 0,
+                intensity_source      : str         = "estimated",
+                refiner_early_exit    : float       = 0.0,
+                draft_on_cancel       : bool        = False,
+                sampling_session      : bool        = False,
+                checkpoint_dir        : str         = "",
                 **kwargs
                 ) -> io.NodeOutput:
 
@@ -204,6 +266,14 @@ class ZSamplerTurbo2Advanced(io.ComfyNode):
         strong_positive_stg2 = (positive_stg3 is not None)
         positive_stg2_preproc = positive_stg2 if strong_positive_stg2 else positive
 
+        # a non-empty seed list replaces the seed and fills the batch with one image per seed
+        seed = resolve_seed(seed, seed_list)
+
+        # relative checkpoint directories are placed inside the output directory
+        checkpoint_dir = checkpoint_dir.strip()
+        if checkpoint_dir:
+            checkpoint_dir = os.path.join(folder_paths.get_output_directory(), checkpoint_dir)
+
         # run the Z-Sampler Turbo core method on the latent image
         latent_output = zsampler_turbo_core(latent_input, model, positive,
                                             seed                      = seed,
@@ -220,6 +290,16 @@ class ZSamplerTurbo2Advanced(io.ComfyNode):
                                             positive_stg3             = positive_stg3,
                                             stage2_scramble           = stage2_scramble,
                                             stage2_preproc_steps      = stage2_preproc_steps,
+                                            options                   = SamplingOptions(
+                                                noise_bias_source      = intensity_source,
+                                                use_sampling_session   = sampling_session,
+                                                composition_scale      = composition_scale,
+                                                tile_size              = tile_size,
+                                                stage3_early_exit      = refiner_early_exit,
+                                                return_draft_on_cancel = draft_on_cancel,
+                                                checkpoint_dir         = checkpoint_dir or None,
+                                            ),
+                                            cancel_token              = CancellationToken() if draft_on_cancel else None,
                                             progress_preview = ProgressPreview.from_model( model ),
                                             )
 
@@ -18,9 +18,10 @@ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
 """
 from typing                    import Any
 from comfy_api.latest          import io
-from .custom_widgets           import Separator
+from .custom_widgets           import Separator, seed_list_input
 from .core.progress_bar        import ProgressPreview
 from .core.zsampler_turbo_core import zsampler_turbo_core
+from .core.helpers             import resolve_seed
 from .custom_widgets           import Separator
 
 
@@ -113,6 +114,7 @@ class ZSamplerTurbo2Simple(io.ComfyNode):
                                               "final stage. This enhances contrast and sharpness in fine details but "
                                               "increases overall processing time. ",
                                      ),
+                seed_list_input(),
             ],
             outputs=[
                 io.Latent.Output(display_name="latent_output",
@@ -140,6 +142,7 @@ class ZSamplerTurbo2Simple(io.ComfyNode):
                 positive_stg3 : list | None = None,
                 intensity     : float       = 0.5,
                 denoise       : float       = 1.0,
+                seed_list     : str         = "",
                 **kwargs
                 ) -> io.NodeOutput:
         # set sigma limits when denoise is less than 1.0, typically used for inpainting
@@ -162,16 +165,21 @@ class ZSamplerTurbo2Simple(io.ComfyNode):
             inject_noise_freqs  = (  0,   0, 1024, 896, 448)
             inject_noise_scales = (0.0, 0.0,  0.7, 1.5, 1.0)
 
+        # a non-empty seed list replaces the seed and fills the batch with one image per seed
+        seed  = resolve_seed(seed, seed_list)
+        seeds = seed if isinstance(seed, list) else [seed]
+
         # turbo_creativity enables stage2 scrambling + coherence step
         stage2_scramble       = False
-        stage2_keep_coherence = False
+        stage2_keep_coherence = [False]
         if turbo_creativity:
             # when the seed is a multiple of 3, turbo_creativity disables the
             # coherence pre-processing step that keeps coherence; this increases
             # hallucinations but also enhances creativity
-            high_as_a_kite        = (seed % 3) == 0
+            # (with a seed list, each image decides it by its own seed)
+            high_as_a_kite        = [ (s % 3) == 0 for s in seeds ]
             stage2_scramble       = True
-            stage2_keep_coherence = False if high_as_a_kite else True
+            stage2_keep_coherence = [ False if kite else True for kite in high_as_a_kite ]
 
         # little hack to determine the influence of stage 2 prompt when there are
         # separate prompts for stages 1 and 2 and "turbo creativity + refined" is enabled:
@@ -200,7 +208,7 @@ class ZSamplerTurbo2Simple(io.ComfyNode):
             positive_stg2             = positive_stg2,
             positive_stg3             = positive_stg3,
             stage2_scramble           = stage2_scramble,
-            stage2_preproc_steps      = 1 if stage2_keep_coherence else 0,
+            stage2_preproc_steps      = [ 1 if keep else 0 for keep in stage2_keep_coherence ],
             extra_noise_freqs         = inject_noise_freqs,
             extra_noise_scales        = inject_noise_scales,
             samplers             = ("euler", "euler",  "euler" if not alternative_refiner else "dpmpp_sde"),
@@ -0,0 +1,215 @@
+"""
+File    : zsampler_turbo_2_variations.py
+Purpose : Node for generating several refinements of the same composition with "Z-Sampler Turbo"
+          (second generation), sharing the first two stages across all the variations.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+
+  ComfyUI V3 schema documentation can be found here:
+  - https://docs.comfy.org/custom-nodes/v3_migration
+
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+from typing                    import Any
+from comfy_api.latest          import io
+from .custom_widgets           import Separator
+from .core.progress_bar        import ProgressPreview
+from .core.zsampler_turbo_core import zsampler_turbo_core, SamplingOptions, Stage3Variation
+from .core.helpers             import parse_seed_list
+REFINERS = {
+    "standard"   : ("euler"    ,),
+    "alternative": ("dpmpp_sde",),
+    "both"       : ("euler"    , "dpmpp_sde"),
+}
+NOISE_INJECTIONS = {
+    "off" : (False,),
+    "on"  : (True ,),
+    "both": (False, True),
+}
+_NOISE_INJECTION_FREQS  = (1024, 896, 448)
+_NOISE_INJECTION_SCALES = ( 0.7, 1.5, 1.0)
+
+
+class ZSamplerTurbo2Variations(io.ComfyNode):
+    xTITLE         = "Z-Sampler Turbo ^G2 (Variations)"
+    xCATEGORY      = ""
+    xCOMFY_NODE_ID = ""
+    xDEPRECATED    = False
+
+    #__ INPUT / OUTPUT ____________________________________
+    @classmethod
+    def define_schema(cls) -> io.Schema:
+        return io.Schema(
+            display_name  = cls.xTITLE,
+            category      = cls.xCATEGORY,
+            node_id       = cls.xCOMFY_NODE_ID,
+            is_deprecated = cls.xDEPRECATED,
+            description   = (
+                'Generates several refinements of the same composition using Z-Sampler Turbo (second '
+                'generation). The first two stages, which define the composition, are denoised only once; '
+                'then the final stage is repeated for each combination of refiner seed, refiner and noise '
+                'injection, producing one output image per variation at a fraction of the cost of '
+                'separate generations.'
+            ),
+            inputs=[
+                io.Latent.Input      ("latent_input",
+                                      tooltip="The initial latent image to be denoised; usually an 'Empty Latent' for "
+                                              "text-to-image tasks or an encoded image for image-to-image processing. ",
+                                     ),
+                io.Model.Input       ("model",
+                                      tooltip="The Z-Image Turbo model used for denoising the latent image. "
+                                     ),
+                io.Conditioning.Input("positive",
+                                      tooltip="The main prompt/conditioning used to guide the generation process "
+                                              "toward the desired content. ",
+                                     ),
+                io.Conditioning.Input("positive_stg2",
+                                      optional=True,
+                                      tooltip="This input is optional and can remain disconnected. It allows "
+                                              "specifying a different prompt/conditioning for the second stage "
+                                              "of the denoising process. ",
+                                     ),
+                io.Conditioning.Input("positive_stg3",
+                                      optional=True,
+                                      tooltip="This input is optional and can remain disconnected. It allows "
+                                              "specifying a different prompt/conditioning for the third stage "
+                                              "of the denoising process. ",
+                                     ),
+                io.Int.Input         ("seed",
+                                      default=1, min=1, max=0xffffffffffffffff, control_after_generate=True,
+                                      tooltip="The seed used for the random noise generator of the composition, "
+                                              "ensuring the same result is produced with the same value. ",
+                                     ),
+                io.Int.Input         ("steps",
+                                      default=8, min=3, max=20, step=1,
+                                      tooltip="Number of iterations to perform during the denoising process.",
+                                     ),
+                io.Float.Input       ("ibias",
+                                      default=0.0, min=-1.0, max=1.0, step=0.2,
+                                      tooltip="Custom adjustment for the intensity noise bias. Usually kept at 0.0; "
+                                              "used to fine-tune 'brightness'. Note that its effect depends heavily "
+                                              "on the prompt and image style, so it may not always act as a simple "
+                                              "brightness control. Adjust it within the positive or negative range "
+                                              "until it seems right to you. ",
+                                     ),
+
+                Separator.Input("divider", mode="divider"),#=======================================
+
+                io.Boolean.Input     ("turbo_creativity",
+                                      default=False, label_on="yes", label_off="no",
+                                      tooltip="Enables turbo creativity. This scrambles the image to boost diversity "
+                                              "in compositions while maintaining the general style and tone color. "
+                                              "Be aware that this may lead to hallucinations. ",
+                                     ),
+                io.Boolean.Input     ("old_scheduler",
+                                      default=False, label_on="yes", label_off="no",
+                                      tooltip="Enables the legacy scheduler with a different set of sigmas. Although "
+                                              "the new scheduler is optimized for general quality, this old version "
+                                              "may produce better results in specific cases. ",
+                                     ),
+
+                Separator.Input("divider2", mode="divider"),#======================================
+
+                io.String.Input      ("refiner_seeds",
+                                      default="", multiline=False,
+                                      placeholder="e.g. 1-4",
+                                      tooltip="Seeds for the final stage, separated by commas, with ranges written as "
+                                              "'first-last'; one variation is generated for each seed. When empty, "
+                                              "the final stage uses the same seed as the other Z-Sampler Turbo nodes. ",
+                                     ),
+                io.Combo.Input       ("refiner",
+                                      default="standard", options=list(REFINERS.keys()),
+                                      tooltip="The refiner used in the final stage. 'alternative' uses the DPM++ SDE "
+                                              "sampler to enhance contrast and sharpness in fine details, while "
+                                              "'both' generates one variation with each refiner. ",
+                                     ),
+                io.Combo.Input       ("noise_injection",
+                                      default="off", options=list(NOISE_INJECTIONS.keys()),
+                                      tooltip="Noise injection in the final stage. This can enhance fine details and "
+                                              "realism, but may also generate artificial-looking color spots in smooth "
+                                              "areas; 'both' generates one variation with and one without it. ",
+                                     ),
+            ],
+            outputs=[
+                io.Latent.Output(display_name="latent_output",
+                                 tooltip="The resulting denoised latent images, one for each variation (all the "
+                                         "variations of each input image are contiguous in the batch). "
+                                ),
+            ]
+        )
+
+    #__ FUNCTION __________________________________________
+    @classmethod
+    def execute(cls,
+                latent_input         : dict[str, Any],
+                model                : Any,
+                positive             : list,
+                seed                 : int,
+                steps                : int,
+                ibias                : float,
+                turbo_creativity     : bool,
+                old_scheduler        : bool,
+                refiner_seeds        : str,
+                refiner              : str,
+                noise_injection      : str,
+                *,
+                positive_stg2 : list | None = None,
+                positive_stg3 : list | None = None,
+                intensity     : float       = 0.5,
+                **kwargs
+                ) -> io.NodeOutput:
+
+        # `intensity` determines the level of noise overdose and noise bias
+        # (intensity is hardcoded to 0.5 in this node, as in the simple node)
+        initial_noise_overdose   = intensity * 0.4
+        initial_noise_bias_level = (intensity+1)*4-1
+        initial_noise_bias_level = min(max(initial_noise_bias_level, 0.0), 4.0)
+
+        # apply user-defined adjustment `ibias` to the calculated noise bias level
+        initial_noise_bias_level += 10 * ibias
+        initial_noise_bias_level = min(max(initial_noise_bias_level, -6.0), 14.0)
+
+        # turbo_creativity enables stage2 scrambling + coherence step
+        # (when the seed is a multiple of 3 the coherence step is skipped, as in the simple node)
+        stage2_scramble       = turbo_creativity
+        stage2_keep_coherence = turbo_creativity and (seed % 3) != 0
+
+        # one variation of the final stage for each combination of seed, refiner and noise injection
+        variations = [ Stage3Variation(seed               = refiner_seed,
+                                       sampler            = sampler_name,
+                                       extra_noise_freqs  = _NOISE_INJECTION_FREQS  if inject else (0,),
+                                       extra_noise_scales = _NOISE_INJECTION_SCALES if inject else (0.0,))
+                       for refiner_seed in (parse_seed_list(refiner_seeds) or [None])
+                       for sampler_name in REFINERS.get(refiner, REFINERS["standard"])
+                       for inject       in NOISE_INJECTIONS.get(noise_injection, NOISE_INJECTIONS["off"]) ]
+
+        # see the simple node for the influence of the stage 2 prompt on the coherence step
+        weak_stg2_prompt_influence = (positive_stg3 is None)
+
+        # run the Z-Sampler Turbo core method on the latent image
+        latent_output = zsampler_turbo_core(
+            latent_input,
+            model,
+            positive,
+            seed          = seed,
+            steps         = steps,
+            initial_noise_bias_level  = initial_noise_bias_level,
+            initial_noise_overdose    = initial_noise_overdose,
+            noise_est_sample_size     = "full_size",
+            sigma_preset_name         = "bravo" if not old_scheduler else "alpha",
+            positive_stg2_preproc     = positive if weak_stg2_prompt_influence else positive_stg2,
+            positive_stg2             = positive_stg2,
+            positive_stg3             = positive_stg3,
+            stage2_scramble           = stage2_scramble,
+            stage2_preproc_steps      = 1 if stage2_keep_coherence else 0,
+            options                   = SamplingOptions(stage3_variations=variations),
+            progress_preview = ProgressPreview.from_model(model),
+        )
+
+        return io.NodeOutput(latent_output)
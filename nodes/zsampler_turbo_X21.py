@@ -17,9 +17,10 @@ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
 """
 from typing                        import Any
 from comfy_api.latest              import io
-from .custom_widgets               import Separator
+from .custom_widgets               import Separator, seed_list_input
 from .core.progress_bar            import ProgressPreview
 from .core.zsampler_turbo_core     import zsampler_turbo_core
+from .core.helpers                 import resolve_seed
 from .core.zsampler_turbo_corehelp import EulerAss, DPMPP_SDEss
 from .custom_widgets               import Separator
 _SPECTRAL_TILTS_BY_NAME = {
@@ -124,6 +125,7 @@ class ZSamplerTurboX21(io.ComfyNode):
                                               "the new scheduler is optimized for general quality, this old version "
                                               "may produce better results in specific cases. ",
                                      ),
+                seed_list_input(),
             ],
             outputs=[
                 io.Latent.Output(display_name="latent_output",
@@ -152,6 +154,7 @@ class ZSamplerTurboX21(io.ComfyNode):
                 positive_stg3 : list | None = None,
                 intensity     : float       = 0.5,
                 denoise       : float       = 1.0,
+                seed_list     : str         = "",
                 **kwargs
                 ) -> io.NodeOutput:
         # set sigma limits when denoise is less than 1.0, typically used for inpainting
@@ -167,16 +170,21 @@ class ZSamplerTurboX21(io.ComfyNode):
         initial_noise_bias_level += 10 * ibias
         initial_noise_bias_level = min(max(initial_noise_bias_level, -6.0), 14.0)
 
+        # a non-empty seed list replaces the seed and fills the batch with one image per seed
+        seed  = resolve_seed(seed, seed_list)
+        seeds = seed if isinstance(seed, list) else [seed]
+
         # turbo_creativity enables stage2 scrambling + coherence step
         stage2_scramble       = False
-        stage2_keep_coherence = False
+        stage2_keep_coherence = [False]
         if turbo_creativity:
             # when the seed is a multiple of 3, turbo_creativity disables the
             # coherence pre-processing step that keeps coherence; this increases
             # hallucinations but also enhances creativity
-            high_as_a_kite        = (seed % 3) == 0
+            # (with a seed list, each image decides it by its own seed)
+            high_as_a_kite        = [ (s % 3) == 0 for s in seeds ]
             stage2_scramble       = True
-            stage2_keep_coherence = False if high_as_a_kite else True
+            stage2_keep_coherence = [ False if kite else True for kite in high_as_a_kite ]
 
         # little hack to determine the influence of stage 2 prompt when there are
         # separate prompts for stages 1 and 2 and "turbo creativity + refined" is enabled:
@@ -219,7 +227,7 @@ class ZSamplerTurboX21(io.ComfyNode):
             positive_stg2            = positive_stg2,
             positive_stg3            = positive_stg3,
             stage2_scramble          = stage2_scramble,
-            stage2_preproc_steps     = 1 if stage2_keep_coherence else 0,
+            stage2_preproc_steps     = [ 1 if keep else 0 for keep in stage2_keep_coherence ],
             samplers                 = (*samplers,),
             progress_preview = ProgressPreview.from_model(model),
         )
@@ -0,0 +1,317 @@
+"""
+File    : benchmark.py
+Purpose : Script to reproduce the CPU benchmarks of the Z-Sampler Turbo internals.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+
+  The nodes import ComfyUI, so the script runs against the ComfyUI installation
+  that contains this project (ComfyUI/custom_nodes/ComfyUI-ZImagePowerNodes) or
+  the one pointed to by the environment variable COMFYUI_PATH:
+
+      ./benchmark.sh noise
+      ./benchmark.sh --threads 1 noise --subseeds 0 10 100 500
+      ./benchmark.sh spectral --batch-size 8 --size 192
+      ./benchmark.sh composition --steps 8 --scales 0.5 0.75
+
+  The "composition" benchmark is not a measurement: it evaluates a cost model
+  of the DiT with the steps that each stage runs at each latent size.
+
+  Each benchmark prints the median time of several runs (after one warm-up
+  run), measured on CPU with the number of threads requested.
+
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import os
+import sys
+import time
+import types
+import argparse
+import statistics
+import importlib
+from pathlib import Path
+from typing  import Callable, NoReturn
+import torch
+SCRIPT_DIR  = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+
+
+# ANSI escape codes for colored terminal output
+RED      = '\033[91m'
+DKRED    = '\033[31m'
+YELLOW   = '\033[93m'
+DKYELLOW = '\033[33m'
+GREEN    = '\033[92m'
+CYAN     = '\033[96m'
+DKGRAY   = '\033[90m'
+RESET    = '\033[0m'
+
+#============================= ERROR MESSAGES ==============================#
+
+def disable_colors():
+    global RED, DKRED, YELLOW, DKYELLOW, GREEN, CYAN, DKGRAY, RESET
+    RED, DKRED, YELLOW, DKYELLOW, GREEN, CYAN, DKGRAY, RESET = "", "", "", "", "", "", "", ""
+
+
+def info(message: str, padding: int = 0, file=sys.stderr) -> None:
+    """Displays an informational message to the error stream.
+    """
+    print(f"{' ' * padding}{CYAN}ⓘ {message}{RESET}", file=file)
+
+
+def fatal_error(message: str, *info_messages: str, padding: int = 0, file=sys.stderr) -> NoReturn:
+    """Displays a fatal error message to the standard error stream and exits the script with a non-zero status code.
+    """
+    print(f"{' ' * padding}{DKRED}[{RED}FATAL{DKRED}]{DKYELLOW} {message}{RESET}", file=file)
+    for info_message in info_messages:
+        if info_message:
+            info(info_message, padding=padding, file=file)
+    sys.exit(1)
+
+
+#================================ HELPERS ==================================#
+
+def import_core_module(name: str) -> types.ModuleType:
+    """Imports a module of "nodes/core", making ComfyUI importable first.
+    """
+    candidates = [ os.getenv("COMFYUI_PATH") ] + [ str(parent) for parent in PROJECT_DIR.parents ]
+    comfyui_dir = next( (Path(c) for c in candidates if c and (Path(c) / "comfy" / "samplers.py").is_file()), None )
+    if comfyui_dir is None:
+        fatal_error("Unable to find the ComfyUI installation",
+                    "Set COMFYUI_PATH to the directory of ComfyUI.")
+    if str(comfyui_dir) not in sys.path:
+        sys.path.append( str(comfyui_dir) )
+
+    # the "nodes" directory is imported as `zi_power_nodes`, ComfyUI has its own "nodes" module
+    package = types.ModuleType("zi_power_nodes")
+    package.__path__ = [ str(PROJECT_DIR / "nodes") ]
+    sys.modules.setdefault("zi_power_nodes", package)
+    return importlib.import_module(f"zi_power_nodes.core.{name}")
+
+
+def measure(function: Callable[[], object], repeat: int) -> float:
+    """Returns the median time in milliseconds of `repeat` calls to `function` (after a warm-up call).
+    """
+    function()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append( time.perf_counter() - start )
+    return statistics.median(times) * 1000.0
+
+
+def print_table(title: str, header: list[str], rows: list[list[object]]) -> None:
+    """Prints a table with right aligned columns.
+    """
+    print(f"{CYAN}{title}{RESET}")
+    width = [ max(len(header[i]), *( len(_cell(row[i])) for row in rows )) for i in range(len(header)) ]
+    print("  " + "  ".join( f"{h:>{w}}" for h, w in zip(header, width) ))
+    for row in rows:
+        print("  " + "  ".join( f"{_cell(v):>{w}}" for v, w in zip(row, width) ))
+
+
+def _cell(value: object) -> str:
+    return f"{value:.1f}" if isinstance(value, float) else str(value)
+
+
+#===========================================================================#
+#///////////////////////////////// BENCHMARKS //////////////////////////////#
+#===========================================================================#
+
+def noise_command(args) -> None:
+    """Time to generate the noise of one image for a given sub-seed, per noise generator.
+    """
+    corehelp = import_core_module("zsampler_turbo_corehelp")
+    shape    = (1, args.channels, args.size, args.size)
+    rows     = []
+    for subseed in args.subseeds:
+        row = [ subseed ]
+        for noise_generator in corehelp.NOISE_GENERATORS:
+            row.append( measure(lambda: corehelp.generate_noise(args.seed, shape,
+                                                                batch_subseeds  = [subseed],
+                                                                dtype           = torch.float32,
+                                                                layout          = torch.strided,
+                                                                noise_generator = noise_generator),
+                                args.repeat) )
+        rows.append(row)
+    print_table(f"Noise of one {'x'.join(map(str, shape))} row, ms per call:",
+                [ "subseed", *corehelp.NOISE_GENERATORS ], rows)
+
+
+def spectral_command(args) -> None:
+    """Time of one spectrally adjusted noise draw, full complex FFT vs cached real FFT filter.
+    """
+    corehelp = import_core_module("zsampler_turbo_corehelp")
+    shape    = (args.batch_size, args.channels, args.size, args.size)
+    noise    = torch.randn(shape, generator=torch.manual_seed(args.seed))
+
+    def cold_real_fft():
+        corehelp._spectral_filter.cache_clear()
+        return corehelp._adjust_spectral_distribution(noise, alpha=args.alpha)
+
+    before = measure(lambda: _complex_fft_spectral_distribution(noise, alpha=args.alpha), args.repeat)
+    after  = measure(lambda: corehelp._adjust_spectral_distribution(noise, alpha=args.alpha), args.repeat)
+    cold   = measure(cold_real_fft, args.repeat)
+    rows   = [ [ "one draw", before, after, cold ] ]
+    for sampler_class in (corehelp.EulerAss, corehelp.DPMPP_SDEss):
+        draws = sampler_class.NOISE_DRAWS_PER_STEP
+        rows.append([ f"{sampler_class.__name__} / step ({draws})", before * draws, after * draws, cold * draws ])
+    print_table(f"Spectral noise of {'x'.join(map(str, shape))}, alpha={args.alpha}, ms per noise draw:",
+                [ "", "complex fft", "real fft", "cold filter" ], rows)
+
+    difference = 0.0
+    for size in (args.size, args.size + 1):
+        for alpha in (args.alpha, -args.alpha):
+            for normalize_per_channel in (False, True):
+                sample = torch.randn(2, args.channels, size, size + 2, generator=torch.manual_seed(args.seed))
+                expected = _complex_fft_spectral_distribution(sample, alpha=alpha, normalize_per_channel=normalize_per_channel)
+                result   = corehelp._adjust_spectral_distribution(sample, alpha=alpha, normalize_per_channel=normalize_per_channel)
+                difference = max(difference, float( (result - expected).abs().max() ))
+    info(f"max abs difference with the complex fft (odd/even sizes, both alpha signs and normalizations): {difference:.1e}")
+
+
+def _complex_fft_spectral_distribution(noise: torch.Tensor,
+                                       *,
+                                       alpha                : float,
+                                       power_gamma          : float = 0.5,
+                                       normalize_per_channel: bool  = False,
+                                       eps                  : float = 1e-06,
+                                       ) -> torch.Tensor:
+    """The spectral adjustment as implemented before the real FFT, rebuilding the filter at every call.
+    """
+    H, W      = noise.shape[-2:]
+    norm_dims = (2, 3) if normalize_per_channel else (1, 2, 3)
+    u = torch.fft.fftfreq(H, device=noise.device, dtype=noise.dtype).view(H, 1)
+    v = torch.fft.fftfreq(W, device=noise.device, dtype=noise.dtype).view(1, W)
+    spectral_scale_grid = u**2 + v**2
+    spectral_scale_grid[0, 0] = 1.0
+    spectral_filter = spectral_scale_grid ** (power_gamma * alpha)
+    noise_fft = torch.fft.fft2(noise, dim=(-2, -1)) / spectral_filter
+    filtered  = torch.fft.ifft2(noise_fft, dim=(-2, -1)).real
+    std = filtered.std(dim=norm_dims, keepdim=True).clamp(min=eps)
+    return filtered / std
+
+
+def composition_command(args) -> None:
+    """Cost of a generation composed at reduced resolution relative to a full size one (analytical).
+    """
+    core = import_core_module("zsampler_turbo_core")
+    sigmas1, sigmas2, sigmas3 = ( torch.tensor(sigmas) for sigmas in core._preset_sigmas(args.preset, args.steps) )
+    low_steps  = 1 + core._num_steps(sigmas1) + args.preproc_steps + core._num_steps(sigmas2)  #< +1 noise estimation
+    full_steps = core._num_steps(sigmas3)
+    info(f'"{args.preset}" preset with {args.steps} steps: {low_steps} model evaluations before the upscale '
+         f'(noise estimation, stages 1-2) and {full_steps} after it (stage 3)')
+
+    def step_cost(tokens: int) -> float:
+        # linear layers: 2 FLOP per parameter and token, attention: QK^T and AV in every layer
+        return 2.0 * args.params * tokens + 4.0 * args.layers * tokens**2 * args.hidden_size
+
+    rows = []
+    for image_size in args.image_sizes:
+        latent      = torch.zeros(1, 1, image_size // 8, image_size // 8)
+        full_tokens = latent[0, 0].numel() // 4  #< 2x2 patches
+        for scale in args.scales:
+            low_tokens = core._downscale_latent_samples(latent, scale)[0, 0].numel() // 4
+            ratio      = step_cost(low_tokens) / step_cost(full_tokens)
+            total      = (low_steps * ratio + full_steps) / (low_steps + full_steps)
+            rows.append([ f"{image_size}^2", f"{scale:.2f}", f"{low_tokens} / {full_tokens}", f"{ratio:.2f}x", f"{total:.2f}x" ])
+    print_table(f"Cost relative to a full size generation ({args.params/1e9:g}B parameters, "
+                f"{args.layers} layers, hidden size {args.hidden_size}):",
+                [ "image", "scale", "tokens (low/full)", "step cost", "total cost" ], rows)
+
+
+#===========================================================================#
+#////////////////////////////////// MAIN ///////////////////////////////////#
+#===========================================================================#
+
+def main(args=None, parent_script=None):
+    """
+    Main entry point for the script.
+    Args:
+        args          (optional): List of arguments to parse. Default is None, which will use the command line arguments.
+        parent_script (optional): The name of the calling script if any. Used for customizing help output.
+    """
+    prog = None
+    if parent_script:
+        prog = parent_script + " " + os.path.basename(__file__).split('.')[0]
+
+    # set up argument parser for the script
+    parser = argparse.ArgumentParser(
+        prog            = prog,
+        description     = "Reproduce the CPU benchmarks of the Z-Sampler Turbo internals.",
+        formatter_class = argparse.RawTextHelpFormatter,
+        epilog          = """Environment Variables:
+  COMFYUI_PATH = Directory of the ComfyUI installation used to import the nodes.
+  """
+    )
+    parser.add_argument('--no-color', action='store_true', help="Disable colored output.")
+    parser.add_argument('--threads' , type=int, default=1,
+                        help="Number of CPU threads used by torch (default: 1).")
+    parser.add_argument('--repeat'  , type=int, default=5,
+                        help="Number of timed runs of each measurement (default: 5).")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    noise_parser = subparsers.add_parser('noise', help="Noise generation cost by sub-seed (legacy vs philox).")
+    noise_parser.add_argument('--subseeds', type=int, nargs='+', default=[0, 10, 100, 500],
+                              help="Sub-seeds to measure (default: 0 10 100 500).")
+    noise_parser.add_argument('--size'    , type=int, default=128,
+                              help="Width and height of the latent (default: 128).")
+    noise_parser.add_argument('--channels', type=int, default=16,
+                              help="Channels of the latent (default: 16).")
+    noise_parser.add_argument('--seed'    , type=int, default=1,
+                              help="Seed of the noise (default: 1).")
+
+    spectral_parser = subparsers.add_parser('spectral', help="Spectral noise adjustment cost (complex vs real FFT).")
+    spectral_parser.add_argument('--batch-size', type=int, default=8,
+                                 help="Images in the batch (default: 8).")
+    spectral_parser.add_argument('--size'      , type=int, default=192,
+                                 help="Width and height of the latent, 192 for 1536x1536 images (default: 192).")
+    spectral_parser.add_argument('--channels'  , type=int, default=16,
+                                 help="Channels of the latent (default: 16).")
+    spectral_parser.add_argument('--alpha'     , type=float, default=-0.5,
+                                 help="Frequency tilt of the filter (default: -0.5).")
+    spectral_parser.add_argument('--seed'      , type=int, default=1,
+                                 help="Seed of the noise (default: 1).")
+
+    composition_parser = subparsers.add_parser('composition', help="Cost model of the reduced resolution composition.")
+    composition_parser.add_argument('--image-sizes'  , type=int, nargs='+', default=[1024, 1536, 2048],
+                                    help="Width and height of the images in pixels (default: 1024 1536 2048).")
+    composition_parser.add_argument('--scales'       , type=float, nargs='+', default=[0.5, 0.75],
+                                    help="Composition scales (default: 0.5 0.75).")
+    composition_parser.add_argument('--preset'       , default="bravo",
+                                    help="Sigma preset (default: bravo).")
+    composition_parser.add_argument('--steps'        , type=int, default=8,
+                                    help="Number of steps (default: 8).")
+    composition_parser.add_argument('--preproc-steps', type=int, default=0,
+                                    help="Preprocessing steps of stage 2 (default: 0).")
+    composition_parser.add_argument('--params'       , type=float, default=6e9,
+                                    help="Parameters of the DiT (default: 6e9).")
+    composition_parser.add_argument('--layers'       , type=int, default=30,
+                                    help="Transformer layers of the DiT (default: 30).")
+    composition_parser.add_argument('--hidden-size'  , type=int, default=3840,
+                                    help="Hidden size of the DiT (default: 3840).")
+
+    args = parser.parse_args(args=args)
+
+    # if the user requested to disable colors, call disable_colors()
+    if args.no_color:
+        disable_colors()
+
+    torch.set_num_threads(args.threads)
+    info(f"torch {torch.__version__}, {torch.get_num_threads()} CPU thread(s)")
+    if args.command == "noise":
+        noise_command(args)
+    elif args.command == "spectral":
+        spectral_command(args)
+    elif args.command == "composition":
+        composition_command(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+File    : noisebias.py
+Purpose : Script to fit and evaluate the noise bias predictor from calibration logs.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+
+  Calibration workflow:
+
+   1) Start ComfyUI with the environment variable ZIMAGE_NODES_NOISE_BIAS_LOG
+      set to a file; every estimation of the initial noise bias made by the
+      Z-Sampler Turbo nodes appends its calibration records to that file.
+   2) Generate a representative set of images (resolutions, prompts, seeds).
+   3) Fit the predictor with this script:
+        ./noisebias.sh fit calibration.jsonl -o noise_bias_predictor.json
+      The error of the predictor on records left out of the fit is reported
+      next to the error of a constant prediction (the mean of the records).
+   4) Copy the predictor to the project root (or point the environment variable
+      ZIMAGE_NODES_NOISE_BIAS_PREDICTOR to it) and use the "predicted" source
+      of the noise bias.
+
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import os
+import sys
+import json
+import argparse
+import numpy as np
+from typing import NoReturn
+
+# the predictor module depends only on NumPy, so it is imported directly from the nodes
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, "..", "nodes", "core"))
+from noise_bias_predictor import NoiseBiasPredictor, EFFECTIVE_BIAS_LIMIT, prediction_errors
+
+
+# ANSI escape codes for colored terminal output
+RED      = '\033[91m'
+DKRED    = '\033[31m'
+YELLOW   = '\033[93m'
+DKYELLOW = '\033[33m'
+GREEN    = '\033[92m'
+CYAN     = '\033[96m'
+DKGRAY   = '\033[90m'
+RESET    = '\033[0m'
+
+#============================= ERROR MESSAGES ==============================#
+
+def disable_colors():
+    global RED, DKRED, YELLOW, DKYELLOW, GREEN, CYAN, DKGRAY, RESET
+    RED, DKRED, YELLOW, DKYELLOW, GREEN, CYAN, DKGRAY, RESET = "", "", "", "", "", "", "", ""
+
+
+def info(message: str, padding: int = 0, file=sys.stderr) -> None:
+    """Displays an informational message to the error stream.
+    """
+    print(f"{' ' * padding}{CYAN}ⓘ {message}{RESET}", file=file)
+
+
+def warning(message: str, *info_messages: str, padding: int = 0, file=sys.stderr) -> None:
+    """Displays a warning message to the standard error stream.
+    """
+    print(f"{' ' * padding}{CYAN}[{YELLOW}WARNING{CYAN}]{DKYELLOW} {message}{RESET}", file=file)
+    for info_message in info_messages:
+        if info_message:
+            info(info_message, padding=padding, file=file)
+
+
+def fatal_error(message: str, *info_messages: str, padding: int = 0, file=sys.stderr) -> NoReturn:
+    """Displays a fatal error message to the standard error stream and exits the script with a non-zero status code.
+    """
+    print(f"{' ' * padding}{DKRED}[{RED}FATAL{DKRED}]{DKYELLOW} {message}{RESET}", file=file)
+    for info_message in info_messages:
+        if info_message:
+            info(info_message, padding=padding, file=file)
+    sys.exit(1)
+
+
+#================================ HELPERS ==================================#
+
+def load_records(paths: list[str]) -> list[dict]:
+    """Reads the calibration records of one or more JSON lines files.
+    """
+    records = []
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as file:
+                for line_number, line in enumerate(file, start=1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append( json.loads(line) )
+                    except json.JSONDecodeError:
+                        warning(f'Skipping invalid record at "{path}" line {line_number}')
+        except OSError as e:
+            fatal_error(f'Unable to read "{path}"', str(e))
+    if not records:
+        fatal_error("No calibration records found",
+                    "Set ZIMAGE_NODES_NOISE_BIAS_LOG when running ComfyUI to log them.")
+    return records
+
+
+def print_errors(title: str, errors: dict, baseline: dict | None = None) -> None:
+    """Prints a table with the errors of a predictor (and of the baseline if provided).
+    """
+    print(f"{CYAN}{title}{RESET}")
+    print(f"  {'':<10} {'mae':>11} {'rmse':>11} {'max':>11}" + (f"   {'baseline mae':>12}" if baseline else ""))
+    for name, error in errors.items():
+        line = f"  {name:<10} {error['mae']:>11.3e} {error['rmse']:>11.3e} {error['max']:>11.3e}"
+        if baseline:
+            line += f"   {baseline[name]['mae']:>12.3e}"
+        print(line)
+    effective = errors["effective"]["mae"]
+    print(f"  {DKGRAY}effective bias mae is {100*effective/EFFECTIVE_BIAS_LIMIT:.1f}% "
+          f"of its limit ({EFFECTIVE_BIAS_LIMIT}){RESET}")
+
+
+#===========================================================================#
+#////////////////////////////////// MAIN ///////////////////////////////////#
+#===========================================================================#
+
+def fit_command(args) -> None:
+    records = load_records(args.logs)
+    info(f"{len(records)} calibration records loaded")
+
+    # measure the error on the records left out of the fit
+    rng     = np.random.default_rng(args.seed)
+    order   = rng.permutation(len(records))
+    holdout = int(round(len(records) * args.holdout))
+    if 0 < holdout < len(records):
+        test_records  = [ records[i] for i in order[:holdout] ]
+        train_records = [ records[i] for i in order[holdout:] ]
+        predictor = NoiseBiasPredictor.fit(train_records, alpha=args.alpha)
+        print_errors(f"Error on {len(test_records)} held-out records (fitted with {len(train_records)}):",
+                     prediction_errors(predictor, test_records),
+                     prediction_errors(None, test_records))
+    else:
+        warning("Too few records to hold some out, the error is measured on the fitted records")
+
+    # the saved predictor is fitted with all the records
+    predictor = NoiseBiasPredictor.fit(records, alpha=args.alpha)
+    print_errors(f"Error on the {len(records)} fitted records:",
+                 prediction_errors(predictor, records),
+                 prediction_errors(None, records))
+    predictor.save(args.output)
+    info(f'Predictor written to "{args.output}"')
+
+
+def evaluate_command(args) -> None:
+    try:
+        predictor = NoiseBiasPredictor.load(args.predictor)
+    except (OSError, ValueError, KeyError) as e:
+        fatal_error(f'Unable to load the predictor "{args.predictor}"', str(e))
+    records = load_records(args.logs)
+    print_errors(f"Error on {len(records)} records:",
+                 prediction_errors(predictor, records),
+                 prediction_errors(None, records))
+
+
+def main(args=None, parent_script=None):
+    """
+    Main entry point for the script.
+    Args:
+        args          (optional): List of arguments to parse. Default is None, which will use the command line arguments.
+        parent_script (optional): The name of the calling script if any. Used for customizing help output.
+    """
+    prog = None
+    if parent_script:
+        prog = parent_script + " " + os.path.basename(__file__).split('.')[0]
+
+    # set up argument parser for the script
+    parser = argparse.ArgumentParser(
+        prog            = prog,
+        description     = "Fit and evaluate the predictor of the initial noise bias.",
+        formatter_class = argparse.RawTextHelpFormatter,
+        epilog          = """Environment Variables:
+  ZIMAGE_NODES_NOISE_BIAS_LOG       = File where ComfyUI logs the calibration records.
+  ZIMAGE_NODES_NOISE_BIAS_PREDICTOR = File of the predictor used by the nodes.
+  """
+    )
+    parser.add_argument('--no-color', action='store_true', help="Disable colored output.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    fit_parser = subparsers.add_parser('fit', help="Fit a predictor to calibration logs.")
+    fit_parser.add_argument('-o', '--output' , default="noise_bias_predictor.json",
+                            help="File where the predictor is written (default: noise_bias_predictor.json).")
+    fit_parser.add_argument('-a', '--alpha'  , type=float, default=1.0,
+                            help="Strength of the ridge regularization (default: 1.0).")
+    fit_parser.add_argument('--holdout'      , type=float, default=0.2,
+                            help="Fraction of the records left out to measure the error (default: 0.2).")
+    fit_parser.add_argument('--seed'         , type=int, default=0,
+                            help="Seed of the random split of the records (default: 0).")
+    fit_parser.add_argument('logs', nargs='+', metavar='LOG', help="Calibration logs (JSON lines).")
+
+    evaluate_parser = subparsers.add_parser('evaluate', help="Measure the error of a predictor on calibration logs.")
+    evaluate_parser.add_argument('predictor', help="The predictor file.")
+    evaluate_parser.add_argument('logs', nargs='+', metavar='LOG', help="Calibration logs (JSON lines).")
+
+    args = parser.parse_args(args=args)
+
+    # if the user requested to disable colors, call disable_colors()
+    if args.no_color:
+        disable_colors()
+
+    if args.command == "fit":
+        fit_command(args)
+    elif args.command == "evaluate":
+        evaluate_command(args)
+
+
+if __name__ == "__main__":
+    main()
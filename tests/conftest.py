@@ -0,0 +1,64 @@
+"""
+File    : conftest.py
+Purpose : Configuration of the tests, makes ComfyUI and the project nodes importable.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+
+  The tests run on CPU against the ComfyUI installation that contains this
+  project (ComfyUI/custom_nodes/ComfyUI-ZImagePowerNodes) or the one pointed
+  to by the environment variable COMFYUI_PATH (run from the project root):
+
+      COMFYUI_PATH=/path/to/ComfyUI python -m pytest -q
+
+  The "nodes" directory of the project is imported as the package
+  `zi_power_nodes`, because ComfyUI has its own top-level "nodes" module.
+  When ComfyUI cannot be imported, the tests are not collected.
+
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import os
+import sys
+import types
+import pytest
+import importlib
+import importlib.util
+from pathlib import Path
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def _find_comfyui_dir() -> Path | None:
+    """Returns the directory of the ComfyUI installation to test against, if any."""
+    candidates = [ os.getenv("COMFYUI_PATH") ] + [ str(parent) for parent in PROJECT_DIR.parents ]
+    for candidate in candidates:
+        if candidate and (Path(candidate) / "comfy" / "samplers.py").is_file():
+            return Path(candidate)
+    return None
+
+
+comfyui_dir = _find_comfyui_dir()
+if comfyui_dir is not None and str(comfyui_dir) not in sys.path:
+    sys.path.append( str(comfyui_dir) )
+
+if importlib.util.find_spec("comfy") is None:
+    collect_ignore_glob = ["test_*.py"]
+else:
+    package = types.ModuleType("zi_power_nodes")
+    package.__path__ = [ str(PROJECT_DIR / "nodes") ]
+    sys.modules.setdefault("zi_power_nodes", package)
+
+
+@pytest.fixture
+def core(monkeypatch):
+    """The module `zsampler_turbo_core` sampling `StubModel` instances, with its caches empty."""
+    from stub_model import install_stub_sampling
+    core = importlib.import_module("zi_power_nodes.core.zsampler_turbo_core")
+    install_stub_sampling(monkeypatch)
+    core._NOISE_FEATURES_CACHE.clear()
+    core._STAGE_PREFIX_CACHE.clear()
+    return core
@@ -0,0 +1,141 @@
+"""
+File    : stub_model.py
+Purpose : Small deterministic stand-in for a Z-Image model, used to run the sampler on CPU.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+
+  `install_stub_sampling(..)` replaces `comfy.sample.sample_custom(..)` with a
+  version that skips the model loading and the guider of ComfyUI and calls the
+  sampler directly with a `StubDenoiser`, so the samplers, noise samplers and
+  wrappers of the project are the ones executed, while the model is a cheap
+  function whose prediction for each image depends only on that image.
+
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import math
+import torch
+import dataclasses
+import comfy.sample
+LATENT_CHANNELS = 16
+
+
+class StubModelFailure(RuntimeError):
+    pass
+
+
+class _LatentFormat:
+    latent_channels   = LATENT_CHANNELS
+    latent_dimensions = 2
+
+
+class _ModelSampling:
+    """Flow matching sampling, as used by Z-Image."""
+    sigma_min = 0.0
+    sigma_max = 1.0
+
+    def noise_scaling(self, sigma, noise, latent_image, max_denoise=False):
+        return sigma * noise + (1.0 - sigma) * latent_image
+
+    def inverse_noise_scaling(self, sigma, latent):
+        return latent
+
+
+class StubModel:
+    """
+    Stand-in for a ComfyUI MODEL on CPU.
+
+    Args:
+        fail_after: Optional number of evaluations after which the model raises a `StubModelFailure`,
+                    simulating a generation that dies in the middle (e.g. out of memory).
+    Attributes:
+        evaluations: Number of times the model was evaluated (once per batch, as counted by the profiler).
+    """
+    load_device = torch.device("cpu")
+
+    def __init__(self, *, fail_after: int | None = None):
+        self.model         = torch.nn.Linear(4, 4)
+        self.model_options = {"transformer_options": {}}
+        self.patches_uuid  = "stub"
+        self.evaluations   = 0
+        self.fail_after    = fail_after
+        torch.nn.init.constant_(self.model.weight, 0.5)
+        torch.nn.init.constant_(self.model.bias  , 0.0)
+
+    def get_model_object(self, name: str):
+        return { "latent_format": _LatentFormat(), "model_sampling": _ModelSampling() }[name]
+
+    def memory_required(self, input_shape) -> int:
+        return 4096 * math.prod(input_shape)
+
+    def model_dtype(self) -> torch.dtype:
+        return torch.float32
+
+    def predict(self, x: torch.Tensor, sigma: torch.Tensor, context: torch.Tensor) -> torch.Tensor:
+        """Returns the denoised prediction of each image of `x`, independent of the rest of the batch."""
+        if self.fail_after is not None and self.evaluations >= self.fail_after:
+            raise StubModelFailure(f"stub model stopped after {self.evaluations} evaluations")
+        self.evaluations += 1
+        sigma = sigma.reshape(-1, *([1] * (x.ndim - 1)))
+        return torch.tanh( x * (1 - sigma) + 0.3 * torch.roll(x, 1, dims=-1) ) * 0.8 + context
+
+
+class StubDenoiser:
+    """The denoiser that `KSAMPLER.sample(..)` receives, built from a `StubModel` and its conditioning."""
+
+    def __init__(self, model: StubModel, positive: list):
+        self.model       = model
+        self.inner_model = self
+        self.model_sampling = model.get_model_object("model_sampling")
+        # the conditioning of each image is reduced to its mean
+        cond = positive[0][0].float()
+        self.context = cond.mean(dim=tuple(range(1, cond.ndim))).reshape(-1, 1, 1, 1)
+
+    def __call__(self, x: torch.Tensor, sigma: torch.Tensor, **kwargs) -> torch.Tensor:
+        context = self.context if self.context.shape[0] == x.shape[0] else self.context.mean()
+        return self.model.predict(x, sigma, context)
+
+
+def stub_sample_custom(model, noise, cfg, sampler, sigmas, positive, negative, latent_image,
+                       noise_mask=None, callback=None, disable_pbar=False, seed=None):
+    """Replacement of `comfy.sample.sample_custom(..)` that samples a `StubModel`."""
+    if sigmas.shape[-1] == 0:
+        return latent_image
+    extra_args = { "model_options": model.model_options, "seed": seed }
+    return sampler.sample(StubDenoiser(model, positive), sigmas, extra_args, callback,
+                          noise, latent_image, noise_mask, disable_pbar)
+
+
+def install_stub_sampling(monkeypatch) -> None:
+    """Makes ComfyUI sample the `StubModel` instances (the change is undone by `monkeypatch`)."""
+    monkeypatch.setattr(comfy.sample, "sample_custom", stub_sample_custom)
+
+
+def generate(core, latent: dict, model: StubModel | None = None, **options) -> dict:
+    """
+    Runs `core.zsampler_turbo_core(..)` without a sampling session.
+
+    The options not provided take small values that exercise the three stages
+    (e.g. 9 steps, noise bias estimation and the preprocessing of stage 2).
+    The fields of `SamplingOptions` can be provided as keyword arguments too.
+    """
+    from zi_power_nodes.core.progress_bar import ProgressPreview
+    model   = model if model is not None else StubModel()
+    options = { "seed": 7, "steps": 9, "initial_noise_bias_level": 2.0, "sigma_preset_name": "bravo",
+                "stage2_scramble": True, "stage2_preproc_steps": 1, "use_sampling_session": False,
+                "progress_preview": ProgressPreview(100, parent=(None, 0, 100)),
+                **options }
+    fields  = { field.name for field in dataclasses.fields(core.SamplingOptions) }
+    sampling_options = core.SamplingOptions(**{ name: options.pop(name) for name in list(options) if name in fields })
+    return core.zsampler_turbo_core(latent, model, options.pop("positive", conditioning()),
+                                    options=sampling_options, **options)
+
+
+def conditioning(value: float = 0.1, batch_size: int = 1, tokens: int = 4) -> list:
+    """Returns a ComfyUI CONDITIONING with constant embeddings."""
+    return [[ torch.full((batch_size, tokens, 8), value), {} ]]
@@ -0,0 +1,54 @@
+"""
+File    : test_batch_dedup.py
+Purpose : Tests of the batches with repeated sub-seeds, denoised only once per unique image.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import torch
+import pytest
+from stub_model import generate
+
+BATCH_INDEX = [3, 0, 3, 7, 0]
+
+
+def _latent(batch_index: list[int]) -> dict:
+    return { "samples": torch.zeros(len(batch_index), 16, 12, 16), "batch_index": list(batch_index) }
+
+
+def _denoised_batch_sizes(core, monkeypatch) -> list[int]:
+    """Records the batch size of every call to `execute_3_stage_denoising(..)`."""
+    sizes, execute = [], core.execute_3_stage_denoising
+    def spy(comfy_latent, *args, **kwargs):
+        sizes.append( comfy_latent["samples"].shape[0] )
+        return execute(comfy_latent, *args, **kwargs)
+    monkeypatch.setattr(core, "execute_3_stage_denoising", spy)
+    return sizes
+
+
+@pytest.mark.parametrize("noise_generator", ["legacy", "philox"])
+@pytest.mark.parametrize("sampler"        , ["euler", "euler_ancestral", "dpmpp_sde"])
+def test_repeated_subseeds_are_denoised_once(core, monkeypatch, sampler, noise_generator):
+    options = dict(samplers=(sampler,) * 3, noise_generator=noise_generator, extra_noise_freqs=(0, 0, 1024),
+                   extra_noise_scales=(0.0, 0.0, 0.7))
+    sizes   = _denoised_batch_sizes(core, monkeypatch)
+    deduped = generate(core, _latent(BATCH_INDEX), **options)
+    assert sizes == [3]
+
+    core._NOISE_FEATURES_CACHE.clear()
+    monkeypatch.setattr(core, "_unique_batch_rows", lambda *args, **kwargs: (None, None))
+    full = generate(core, _latent(BATCH_INDEX), **options)
+    assert sizes == [3, 5]
+    assert torch.equal(deduped["samples"], full["samples"])
+    assert deduped["batch_index"] == BATCH_INDEX
+
+
+def test_image_of_a_subseed_matches_its_single_image_generation(core):
+    batch  = generate(core, _latent(BATCH_INDEX), samplers=("euler_ancestral",) * 3)
+    single = generate(core, _latent([7]), samplers=("euler_ancestral",) * 3)
+    torch.testing.assert_close(batch["samples"][3:4], single["samples"], rtol=0, atol=1e-6)
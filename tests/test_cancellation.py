@@ -0,0 +1,88 @@
+"""
+File    : test_cancellation.py
+Purpose : Tests of the cooperative cancellation of a generation and the draft it returns.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import torch
+import pytest
+import comfy.model_management
+from stub_model import StubModel, generate
+from zi_power_nodes.core.cancellation      import CancellationToken, GenerationCancelled
+from zi_power_nodes.core.sampling_profiler import PROFILE_LATENT_KEY
+
+
+class CancellingModel(StubModel):
+    """A `StubModel` that cancels `token` once it has been evaluated `cancel_after` times."""
+
+    def __init__(self, token: CancellationToken, cancel_after: int):
+        super().__init__()
+        self.token, self.cancel_after = token, cancel_after
+
+    def predict(self, x, sigma, context):
+        denoised = super().predict(x, sigma, context)
+        if self.evaluations == self.cancel_after:
+            self.token.cancel()
+        return denoised
+
+
+def _latent() -> dict:
+    return { "samples": torch.zeros(2, 16, 12, 16) }
+
+
+def _stage1_result(core, monkeypatch) -> tuple[torch.Tensor, int]:
+    """Returns the latent completed by stage 1 in a full generation and the evaluations made up to it."""
+    completed, profiled = {}, generate(core, _latent(), profile=True)
+    sections = [ record["name"] for record in profiled[PROFILE_LATENT_KEY] ]
+    evaluations = sum( record["evaluations"] for record in profiled[PROFILE_LATENT_KEY][:sections.index("stage1")+1] )
+
+    original_completed = core._CancellationScope.completed
+    def spy_completed(self, stage, comfy_latent, *, is_denoised):
+        completed.setdefault(stage, comfy_latent["samples"].clone())
+        return original_completed(self, stage, comfy_latent, is_denoised=is_denoised)
+    monkeypatch.setattr(core._CancellationScope, "completed", spy_completed)
+    generate(core, _latent())
+    monkeypatch.setattr(core._CancellationScope, "completed", original_completed)
+    return completed[1], evaluations
+
+
+def test_cancelled_generation_raises_with_the_draft_of_the_last_stage(core, monkeypatch):
+    stage1_samples, stage1_evaluations = _stage1_result(core, monkeypatch)
+    token = CancellationToken()
+    model = CancellingModel(token, cancel_after=stage1_evaluations)
+
+    with pytest.raises(GenerationCancelled) as cancelled:
+        generate(core, _latent(), model=model, cancel_token=token)
+
+    # the generation stops at the check that follows stage 1 and carries its latent
+    assert model.evaluations == stage1_evaluations
+    assert cancelled.value.stage == 1
+    assert torch.equal(cancelled.value.latent["samples"], stage1_samples)
+
+
+def test_cancelled_generation_returns_the_draft_when_requested(core, monkeypatch):
+    stage1_samples, stage1_evaluations = _stage1_result(core, monkeypatch)
+    token = CancellationToken()
+    model = CancellingModel(token, cancel_after=stage1_evaluations)
+
+    output = generate(core, _latent(), model=model, cancel_token=token, return_draft_on_cancel=True)
+    assert model.evaluations == stage1_evaluations
+    assert torch.equal(output["samples"], stage1_samples)
+
+
+def test_reading_is_cancelled_does_not_consume_the_interrupt(monkeypatch):
+    monkeypatch.setattr(comfy.model_management, "interrupt_processing", True)
+    token = CancellationToken()
+
+    assert not token.is_cancelled
+    assert comfy.model_management.processing_interrupted()
+
+    # polling the token consumes the interrupt and cancels it
+    assert token.poll() and token.is_cancelled and token.interrupted
+    assert not comfy.model_management.processing_interrupted()
@@ -0,0 +1,56 @@
+"""
+File    : test_helpers.py
+Purpose : Tests of the general helper functions of the nodes.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import pytest
+from zi_power_nodes.core.helpers import parse_seed_list, resolve_seed
+
+
+@pytest.mark.parametrize("text, seeds", [
+    (""               , []                      ),
+    ("  "             , []                      ),
+    ("42"             , [42]                    ),
+    ("1, 5, 9-12"     , [1, 5, 9, 10, 11, 12]   ),
+    ("100..103"       , [100, 101, 102, 103]    ),
+    ("7-7"            , [7]                     ),
+    ("5-3, 1"         , [5, 4, 3, 1]            ),
+    ("3; 1 2,,4"      , [3, 1, 2, 4]            ),
+    ("2, 2, 1-2"      , [2, 2, 1, 2]            ),
+])
+def test_seed_lists_are_parsed_in_order(text, seeds):
+    assert parse_seed_list(text) == seeds
+
+
+def test_seed_lists_are_limited_to_4096_seeds():
+    assert parse_seed_list("0-4095") == list(range(4096))
+    assert len( parse_seed_list("1-4000, 5000-5095") ) == 4096
+    with pytest.raises(ValueError, match="more than 4096 seeds"):
+        parse_seed_list("0-4096")
+    with pytest.raises(ValueError, match="more than 4096 seeds"):
+        parse_seed_list("1-4000, 5000-5096")
+
+
+def test_seed_lists_respect_a_custom_limit():
+    assert parse_seed_list("1-3, 9", max_seeds=4) == [1, 2, 3, 9]
+    with pytest.raises(ValueError, match="more than 3 seeds"):
+        parse_seed_list("1-3, 9", max_seeds=3)
+
+
+@pytest.mark.parametrize("text", [ "a", "1, b", "1-", "-5", "1-2-3", "1.5", "1...3", "0x10", "+1" ])
+def test_malformed_seed_lists_are_rejected(text):
+    with pytest.raises(ValueError, match="Invalid seed"):
+        parse_seed_list(text)
+
+
+def test_an_empty_seed_list_keeps_the_seed():
+    assert resolve_seed(7, ""  ) == 7
+    assert resolve_seed(7, None) == 7
+    assert resolve_seed(7, "1, 3-4") == [1, 3, 4]
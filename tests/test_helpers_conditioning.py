@@ -0,0 +1,85 @@
+"""
+File    : test_helpers_conditioning.py
+Purpose : Tests of the helpers that stack conditionings and select their rows.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import torch
+import pytest
+from zi_power_nodes.core.helpers_conditioning import stack_conditionings, select_conditioning_rows, \
+                                                    conditioning_batch_size
+
+
+def _conditioning(value: float, tokens: int, **options) -> list:
+    return [[ torch.full((1, tokens, 8), value), options ]]
+
+
+def test_prompts_of_different_lengths_are_padded_and_masked():
+    stacked = stack_conditionings([ _conditioning(1.0, 3), _conditioning(2.0, 5), _conditioning(3.0, 4) ])
+    tensor, options = stacked[0]
+
+    assert len(stacked) == 1 and tensor.shape == (3, 5, 8)
+    assert torch.equal(tensor[0, :3], torch.full((3, 8), 1.0)) and not tensor[0, 3:].any()
+    assert torch.equal(tensor[1]    , torch.full((5, 8), 2.0))
+    assert torch.equal(tensor[2, :4], torch.full((4, 8), 3.0)) and not tensor[2, 4:].any()
+    assert options["attention_mask"].tolist() == [ [1, 1, 1, 0, 0], [1, 1, 1, 1, 1], [1, 1, 1, 1, 0] ]
+
+
+def test_prompts_of_the_same_length_have_no_mask():
+    tensor, options = stack_conditionings([ _conditioning(1.0, 4), _conditioning(2.0, 4) ])[0]
+    assert tensor.shape == (2, 4, 8)
+    assert "attention_mask" not in options
+
+
+def test_existing_masks_are_padded_with_the_sequences():
+    mask = torch.tensor([[1, 1, 0]])
+    tensor, options = stack_conditionings([ _conditioning(1.0, 3, attention_mask=mask), _conditioning(2.0, 4) ])[0]
+    assert tensor.shape == (2, 4, 8)
+    assert options["attention_mask"].tolist() == [ [1, 1, 0, 0], [1, 1, 1, 1] ]
+
+
+def test_pooled_outputs_are_stacked_and_other_options_come_from_the_first_prompt():
+    stacked = stack_conditionings([ _conditioning(1.0, 3, pooled_output=torch.full((1, 6), 1.0), guidance=2.0),
+                                    _conditioning(2.0, 3, pooled_output=torch.full((1, 6), 2.0), guidance=5.0) ])
+    options = stacked[0][1]
+    assert torch.equal(options["pooled_output"], torch.tensor([[1.0] * 6, [2.0] * 6]))
+    assert options["guidance"] == 2.0
+
+
+def test_a_single_conditioning_is_returned_as_is():
+    conditioning = _conditioning(1.0, 3)
+    assert stack_conditionings([ conditioning ]) is conditioning
+
+
+@pytest.mark.parametrize("conditionings", [
+    [],
+    [ _conditioning(1.0, 3) + _conditioning(2.0, 3), _conditioning(3.0, 3) ],
+    [ _conditioning(1.0, 3), [[ torch.zeros(1, 3, 4), {} ]] ],
+], ids=["empty", "several-entries", "different-features"])
+def test_incompatible_conditionings_are_rejected(conditionings):
+    with pytest.raises(ValueError):
+        stack_conditionings(conditionings)
+
+
+def test_selected_rows_keep_their_tensors_and_options():
+    stacked = stack_conditionings([ _conditioning(float(value), tokens, pooled_output=torch.full((1, 6), float(value)))
+                                    for value, tokens in ((1, 3), (2, 5), (3, 4)) ])
+    selected = select_conditioning_rows(stacked, [2, 0, 2], batch_size=3)
+    tensor, options = selected[0]
+
+    assert conditioning_batch_size(selected) == 3
+    assert tensor[:, 0, 0].tolist() == [3.0, 1.0, 3.0]
+    assert options["pooled_output"][:, 0].tolist() == [3.0, 1.0, 3.0]
+    assert options["attention_mask"].tolist() == [ [1, 1, 1, 1, 0], [1, 1, 1, 0, 0], [1, 1, 1, 1, 0] ]
+
+
+def test_shared_conditionings_are_not_sliced():
+    conditioning = _conditioning(1.0, 3)
+    assert select_conditioning_rows(conditioning, [1, 0], batch_size=2) is conditioning
+    assert select_conditioning_rows(None        , [1, 0], batch_size=2) is None
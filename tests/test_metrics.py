@@ -0,0 +1,69 @@
+"""
+File    : test_metrics.py
+Purpose : Tests of the metrics registry and its rendering in the Prometheus text format.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import pytest
+from zi_power_nodes.core.metrics import MetricsRegistry
+
+
+def test_histogram_buckets_are_cumulative_and_bounds_are_inclusive():
+    registry  = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Test histogram.", buckets=(2.5, 1))
+    for value in (0.5, 1, 1.5, 2.5, 7):
+        histogram.observe(value)
+
+    # a value equal to a bound is counted in that bucket ("le" = less or equal)
+    assert registry.render() == (
+        "# HELP test_seconds Test histogram.\n"
+        "# TYPE test_seconds histogram\n"
+        'test_seconds_bucket{le="1"} 2\n'
+        'test_seconds_bucket{le="2.5"} 4\n'
+        'test_seconds_bucket{le="+Inf"} 5\n'
+        "test_seconds_sum 12.5\n"
+        "test_seconds_count 5\n" )
+
+
+def test_labeled_histograms_render_the_buckets_of_each_label_value():
+    registry  = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Test histogram.", buckets=(1,), labelnames=("stage",))
+    histogram.observe(0.25, stage="stage1")
+    histogram.observe(3   , stage="stage2")
+
+    lines = registry.render().splitlines()
+    assert 'test_seconds_bucket{stage="stage1",le="1"} 1'    in lines
+    assert 'test_seconds_bucket{stage="stage2",le="1"} 0'    in lines
+    assert 'test_seconds_bucket{stage="stage2",le="+Inf"} 1' in lines
+    assert 'test_seconds_sum{stage="stage1"} 0.25'           in lines
+    assert 'test_seconds_count{stage="stage2"} 1'            in lines
+
+
+def test_label_values_and_help_texts_are_escaped():
+    registry = MetricsRegistry()
+    counter  = registry.counter("test_total", 'Help with "quotes", a \\ and a\nnew line.', labelnames=("route",))
+    counter.inc(route='a "quoted" \\path\nline')
+    counter.inc(2, route='a "quoted" \\path\nline')
+
+    lines = registry.render().splitlines()
+    assert lines[0] == '# HELP test_total Help with "quotes", a \\\\ and a\\nnew line.'
+    assert lines[2] == 'test_total{route="a \\"quoted\\" \\\\path\\nline"} 3'
+
+
+def test_wrong_labels_are_rejected():
+    counter = MetricsRegistry().counter("test_total", "Test counter.", labelnames=("route", "status"))
+    with pytest.raises(ValueError):
+        counter.inc(route="styles")
+
+
+def test_duplicate_registration_is_rejected():
+    registry = MetricsRegistry()
+    registry.counter("test_total", "Test counter.")
+    with pytest.raises(ValueError):
+        registry.histogram("test_total", "Another metric with the same name.", buckets=(1,))
@@ -0,0 +1,61 @@
+"""
+File    : test_micro_batches.py
+Purpose : Tests of the split of large batches into memory-bounded micro-batches.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import torch
+import pytest
+from stub_model import StubModel, generate
+
+# budget that fits 2 images of 12x16 in each micro-batch of the stub model
+SPLIT_BUDGET_MB = 30
+
+
+def _latent(batch_size: int, **keys) -> dict:
+    return { "samples": torch.zeros(batch_size, 16, 12, 16), **keys }
+
+
+def _assert_same_images(actual: torch.Tensor, expected: torch.Tensor) -> None:
+    torch.testing.assert_close(actual, expected, rtol=0, atol=1e-6)
+
+
+def test_batch_is_split_into_micro_batches(core):
+    micro_batches = core._split_into_micro_batches(_latent(5), StubModel(), SPLIT_BUDGET_MB)
+    assert [ rows for _, rows in micro_batches ] == [ [0, 1], [2, 3], [4] ]
+    assert [ latent["batch_index"] for latent, _ in micro_batches ] == [ [0, 1], [2, 3], [4] ]
+
+
+def test_batch_within_budget_is_not_keyed_by_subseed(core):
+    latent = _latent(3)
+    assert core._split_into_micro_batches(latent, StubModel(), 1024) == [ (latent, [0, 1, 2]) ]
+    assert "batch_index" not in latent
+
+
+@pytest.mark.parametrize("noise_generator", ["legacy", "philox"])
+def test_split_batch_matches_unsplit_batch(core, noise_generator):
+    unsplit = generate(core, _latent(5), noise_generator=noise_generator)
+    split   = generate(core, _latent(5), noise_generator=noise_generator, batch_memory_mb=SPLIT_BUDGET_MB)
+    _assert_same_images(split["samples"], unsplit["samples"])
+
+
+@pytest.mark.parametrize("sampler", ["euler_ancestral", "dpmpp_sde"])
+def test_stochastic_noise_is_unchanged_when_batch_fits(core, sampler):
+    unbounded = generate(core, _latent(3), samplers=(sampler,) * 3)
+    bounded   = generate(core, _latent(3), samplers=(sampler,) * 3, batch_memory_mb=1024)
+    _assert_same_images(bounded["samples"], unbounded["samples"])
+
+
+@pytest.mark.parametrize("batch_index", [ [0, 1, 2, 3, 4], [3, 0, 3, 7, 0] ])
+@pytest.mark.parametrize("sampler"    , ["euler_ancestral", "dpmpp_sde"])
+def test_split_batch_matches_unsplit_batch_with_subseeds(core, sampler, batch_index):
+    unsplit = generate(core, _latent(5, batch_index=batch_index), samplers=(sampler,) * 3)
+    split   = generate(core, _latent(5, batch_index=batch_index), samplers=(sampler,) * 3,
+                       batch_memory_mb=SPLIT_BUDGET_MB)
+    _assert_same_images(split["samples"], unsplit["samples"])
@@ -0,0 +1,138 @@
+"""
+File    : test_noise.py
+Purpose : Tests of the noise generators used by the Z-Sampler Turbo.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import math
+import torch
+import pytest
+from zi_power_nodes.core.zsampler_turbo_corehelp import generate_noise, offset_seed, _philox4x32, _generate_philox_noise, \
+                                                     SpectralAdjustedSampler, sampler_from_name
+
+# known-answer vectors of philox4x32-10 published with Random123 (kat_vectors)
+#   (counter), (key) -> (output)
+PHILOX4X32_10_KAT = [
+    ( (0x00000000, 0x00000000, 0x00000000, 0x00000000), (0x00000000, 0x00000000),
+      (0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8) ),
+    ( (0xffffffff, 0xffffffff, 0xffffffff, 0xffffffff), (0xffffffff, 0xffffffff),
+      (0x408f276d, 0x41c83b0e, 0xa20bc7c6, 0x6d5451fd) ),
+    ( (0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344), (0xa4093822, 0x299f31d0),
+      (0xd16cfe09, 0x94fdcceb, 0x5001e420, 0x24126ea1) ),
+]
+NOISE_SHAPE = (4, 16, 64, 64)
+
+
+def _noise(seed: int, shape: tuple[int, ...], noise_generator: str, **options) -> torch.Tensor:
+    return generate_noise(seed, shape, dtype=torch.float32, layout=torch.strided, noise_generator=noise_generator, **options)
+
+
+@pytest.mark.parametrize("counter, key, expected", PHILOX4X32_10_KAT)
+def test_philox4x32_matches_known_answers(counter, key, expected):
+    output = _philox4x32(tuple( torch.tensor([word], dtype=torch.int64) for word in counter ), key)
+    assert tuple( int(word) for word in output ) == expected
+
+
+def test_philox_noise_is_standard_normal():
+    noise = _noise(1234, NOISE_SHAPE, "philox").double()
+    n     = noise.numel()
+    mean, std = noise.mean().item(), noise.std().item()
+    assert abs(mean)      < 5 / math.sqrt(n)
+    assert abs(std - 1.0) < 5 / math.sqrt(2 * n)
+
+    # the fraction of values within 1, 2 and 3 standard deviations
+    for sigmas, expected in ((1, 0.682689), (2, 0.954500), (3, 0.997300)):
+        fraction = (noise.abs() < sigmas).double().mean().item()
+        assert abs(fraction - expected) < 5 * math.sqrt(expected * (1 - expected) / n)
+
+    # images (sub-seeds) and neighbouring elements are uncorrelated
+    flat = noise.reshape(NOISE_SHAPE[0], -1)
+    correlation = torch.corrcoef(flat)
+    assert (correlation - torch.eye(NOISE_SHAPE[0], dtype=flat.dtype)).abs().max() < 5 / math.sqrt(flat.shape[1])
+    lag1 = torch.corrcoef( torch.stack([flat[:, :-1].reshape(-1), flat[:, 1:].reshape(-1)]) )[0, 1]
+    assert abs(lag1) < 5 / math.sqrt(n)
+
+
+def test_philox_and_legacy_noise_have_the_same_distribution():
+    philox = _noise(1234, NOISE_SHAPE, "philox").double().flatten()
+    legacy = _noise(1234, NOISE_SHAPE, "legacy").double().flatten()
+    quantiles = torch.tensor([0.001, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999], dtype=torch.float64)
+    assert (torch.quantile(philox, quantiles) - torch.quantile(legacy, quantiles)).abs().max() < 0.05
+    assert abs(philox.mean() - legacy.mean()) < 0.01
+    assert abs(philox.std()  - legacy.std())  < 0.01
+
+
+def test_philox_float32_transform_stays_close_to_float64_reference():
+    # the integer stage is exact on any device, so the divergence between devices
+    # is bounded by the error of the float32 Box-Muller transform
+    seed, shape = 0x1234_5678_9ABC, (2, 16, 32, 32)
+    noise   = _generate_philox_noise(seed, shape, torch.float32)
+    blocks  = math.prod(shape[1:]) // 4
+    counter = ( torch.arange(blocks, dtype=torch.int64).expand(shape[0], -1),
+                torch.zeros(shape[0], blocks, dtype=torch.int64),
+                torch.arange(shape[0], dtype=torch.int64).unsqueeze(1).expand(-1, blocks),
+                torch.zeros(shape[0], blocks, dtype=torch.int64) )
+    x0, x1, x2, x3 = _philox4x32(counter, (seed & 0xFFFFFFFF, seed >> 32))
+
+    uniform = lambda x: ((x >> 8).double() + 0.5) / 16777216.0
+    radius1, angle1 = torch.sqrt(-2 * torch.log(uniform(x0))), 2 * math.pi * uniform(x1)
+    radius2, angle2 = torch.sqrt(-2 * torch.log(uniform(x2))), 2 * math.pi * uniform(x3)
+    reference = torch.stack([radius1 * torch.cos(angle1), radius1 * torch.sin(angle1),
+                             radius2 * torch.cos(angle2), radius2 * torch.sin(angle2)], dim=-1).reshape(shape)
+
+    error = (noise.double() - reference).abs()
+    assert error.max()  < 2e-5
+    assert error.mean() < 1e-6
+
+
+@pytest.mark.parametrize("noise_generator", ["legacy", "philox"])
+def test_noise_of_subseed_slices_concatenates_to_the_whole_batch(noise_generator):
+    shape = (6, 4, 8, 8)
+    whole = _noise(42, shape, noise_generator)
+    for rows in ( [0, 1, 2], [3, 4, 5], [2, 3], [5] ):
+        shard = _noise(42, (len(rows), *shape[1:]), noise_generator, batch_subseeds=rows)
+        torch.testing.assert_close(shard, whole[rows], rtol=0, atol=0)
+
+
+@pytest.mark.parametrize("noise_generator", ["legacy", "philox"])
+def test_noise_of_seed_list_matches_single_seed_generations(noise_generator):
+    seeds = [11, 7, 11, 300]
+    noise = _noise(seeds, (4, 4, 8, 8), noise_generator)
+    for i, seed in enumerate(seeds):
+        torch.testing.assert_close(noise[i:i+1], _noise(seed, (1, 4, 8, 8), noise_generator), rtol=0, atol=0)
+
+    # with sub-seeds, each image is keyed by its (seed, sub-seed) pair
+    keyed = _noise(seeds, (4, 4, 8, 8), noise_generator, batch_subseeds=[0, 0, 1, 0])
+    torch.testing.assert_close(keyed[[0, 1, 3]], noise[[0, 1, 3]], rtol=0, atol=0)
+    torch.testing.assert_close(keyed[2:3], _noise(11, (1, 4, 8, 8), noise_generator, batch_subseeds=[1]), rtol=0, atol=0)
+
+
+def test_offset_seed_shifts_a_seed_or_each_seed_of_a_list():
+    assert offset_seed(10, 16) == 26
+    assert offset_seed([1, 2, 3], 16) == [17, 18, 19]
+
+
+def test_noise_bank_holds_at_most_a_few_steps_of_noise(monkeypatch):
+    sampler = SpectralAdjustedSampler(inner_sampler=sampler_from_name("euler"))
+    latent  = torch.zeros(2, 16, 8, 8)
+    steps   = 3 * sampler.NOISE_BANK_MAX_STEPS
+    draws   = []
+    original_randn = torch.randn
+    def spy_randn(size, *args, **kwargs):
+        draws.append(size[0])
+        return original_randn(size, *args, **kwargs)
+    monkeypatch.setattr(torch, "randn", spy_randn)
+
+    noise_sampler = sampler._noise_bank_sampler(latent, seed=5, max_draws=steps * sampler.NOISE_DRAWS_PER_STEP)
+    served = torch.stack([ noise_sampler() for _ in range(steps) ])
+
+    # the noise is drawn in batches of a few steps and keeps the stream of the seed
+    assert max(draws) == sampler.NOISE_BANK_MAX_STEPS * sampler.NOISE_DRAWS_PER_STEP
+    expected = original_randn((steps, *latent.shape), generator=torch.Generator().manual_seed(5))
+    assert torch.equal(served, expected)
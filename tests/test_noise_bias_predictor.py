@@ -0,0 +1,79 @@
+"""
+File    : test_noise_bias_predictor.py
+Purpose : Tests of the predictor of the initial noise bias and of its JSON files.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import json
+import numpy as np
+import pytest
+from zi_power_nodes.core.noise_bias_predictor import NoiseBiasPredictor, prediction_errors
+
+CHANNELS = 4
+
+
+def _records(count: int, seed: int = 0) -> list[dict]:
+    """Returns synthetic calibration records whose bias and scale depend linearly on the noise statistics."""
+    rng     = np.random.default_rng(seed)
+    records = []
+    for _ in range(count):
+        noise_mean = rng.normal(0.0, 0.01, CHANNELS)
+        noise_std  = rng.normal(1.0, 0.01, CHANNELS)
+        width, height = (int(size) for size in rng.choice([64, 96, 128, 160], 2))
+        records.append({ "width": width, "height": height, "sigmas": [1.0, 0.95], "seed": int(rng.integers(1, 1000)),
+                         "noise_mean": noise_mean.tolist(), "noise_std": noise_std.tolist(),
+                         "cond_mean": float(rng.normal(0.0, 0.1)), "cond_std": float(rng.normal(1.0, 0.1)),
+                         "cond_abs_mean": float(rng.normal(0.8, 0.1)), "cond_tokens": int(rng.integers(8, 64)),
+                         "bias" : (0.5 * noise_mean + 0.002 * np.arange(CHANNELS)).tolist(),
+                         "scale": (0.9 * noise_std  - 0.1).tolist() })
+    return records
+
+
+def test_fitted_predictor_learns_the_calibration_data():
+    records   = _records(64)
+    predictor = NoiseBiasPredictor.fit(records, alpha=1e-3)
+    fitted_errors, baseline_errors = prediction_errors(predictor, records), prediction_errors(None, records)
+
+    assert predictor.num_channels == CHANNELS
+    assert fitted_errors["bias" ]["max"] < baseline_errors["bias" ]["max"] / 10
+    assert fitted_errors["scale"]["max"] < baseline_errors["scale"]["max"] / 10
+
+
+def test_saved_predictor_loads_with_the_same_digest_and_predictions(tmp_path):
+    predictor = NoiseBiasPredictor.fit(_records(32))
+    path      = tmp_path / "predictor.json"
+    predictor.save(path)
+    loaded    = NoiseBiasPredictor.load(path)
+
+    assert loaded.digest == predictor.digest
+    assert loaded.info   == predictor.info
+    for record in _records(8, seed=1):
+        for loaded_values, values in zip(loaded.predict(record), predictor.predict(record)):
+            np.testing.assert_array_equal(loaded_values, values)
+
+
+@pytest.mark.parametrize("change", [
+    { "features": [ "intercept", "log_pixels" ] },
+    { "format"  : "another_format" },
+    { "version" : 2 },
+], ids=["features", "format", "version"])
+def test_load_rejects_files_of_other_predictors(tmp_path, change):
+    path = tmp_path / "predictor.json"
+    NoiseBiasPredictor.fit(_records(32)).save(path)
+    path.write_text( json.dumps({ **json.loads(path.read_text()), **change }) )
+
+    with pytest.raises(ValueError):
+        NoiseBiasPredictor.load(path)
+
+
+def test_records_with_other_channels_are_rejected():
+    predictor = NoiseBiasPredictor.fit(_records(32))
+    record    = dict(_records(1)[0], noise_mean=[0.0] * 16, noise_std=[1.0] * 16)
+    with pytest.raises(ValueError):
+        predictor.predict(record)
@@ -0,0 +1,60 @@
+"""
+File    : test_sampling_profiler.py
+Purpose : Tests of the per-section timing and model-evaluation accounting of the sampler.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import torch
+import pytest
+from stub_model import StubModel, generate
+from zi_power_nodes.core.sampling_profiler import SamplingProfiler
+from zi_power_nodes.core.metrics           import SAMPLER_GENERATION_SECONDS, SAMPLER_SEGMENTS
+
+
+def _latent() -> dict:
+    return { "samples": torch.zeros(1, 16, 12, 16) }
+
+
+def _metric_value(metric, name: str, **labels: str) -> float:
+    return sum( value for sample_name, sample_labels, value in metric.samples()
+                if sample_name == name and sample_labels == labels )
+
+
+@pytest.mark.parametrize("sampler", ["euler", "dpmpp_sde"])
+def test_light_profiler_counts_the_model_evaluations(core, sampler):
+    model    = StubModel()
+    profiler = SamplingProfiler(detailed=False)
+    generate(core, _latent(), model=model, samplers=(sampler,) * 3, profiler=profiler)
+
+    assert profiler.evaluations == model.evaluations > 0
+    assert profiler.seconds == sum( record["seconds"] for record in profiler.records ) > 0
+    assert [ record["name"] for record in profiler.records ][:2] == ["estimation", "stage1"]
+
+
+def test_profiler_counts_no_evaluations_for_a_restored_generation(core, tmp_path):
+    generate(core, _latent(), checkpoint_dir=str(tmp_path))
+
+    profiler = SamplingProfiler(detailed=False)
+    generate(core, _latent(), checkpoint_dir=str(tmp_path), profiler=profiler)
+    assert profiler.evaluations == 0
+    assert [ record["name"] for record in profiler.records ] == ["restore"]
+
+
+def test_generation_time_and_segments_are_exposed_in_the_metrics(core, tmp_path):
+    generations = _metric_value(SAMPLER_GENERATION_SECONDS, "zi_power_sampler_generation_seconds_count", session="off")
+    segments    = _metric_value(SAMPLER_SEGMENTS, "zi_power_sampler_segments_total", session="off")
+
+    # noise estimation, stage 1, the pre-processing step of stage 2, stage 2 and stage 3
+    generate(core, _latent(), checkpoint_dir=str(tmp_path))
+    assert _metric_value(SAMPLER_GENERATION_SECONDS, "zi_power_sampler_generation_seconds_count", session="off") == generations + 1
+    assert _metric_value(SAMPLER_SEGMENTS, "zi_power_sampler_segments_total", session="off") == segments + 5
+
+    # a generation restored from its checkpoint samples nothing
+    generate(core, _latent(), checkpoint_dir=str(tmp_path))
+    assert _metric_value(SAMPLER_GENERATION_SECONDS, "zi_power_sampler_generation_seconds_count", session="off") == generations + 1
@@ -0,0 +1,45 @@
+"""
+File    : test_scramble.py
+Purpose : Tests of the scrambling of latent images used by stage 2.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import torch
+import pytest
+from zi_power_nodes.core.zsampler_turbo_corehelp import scramble_tensor, _random_fragment_rect, \
+                                                     _interpolate_fragments, _grid_sample_fragments
+
+
+def _latents(batch_size: int = 3, height: int = 40, width: int = 56) -> torch.Tensor:
+    return torch.randn(batch_size, 16, height, width, generator=torch.manual_seed(3))
+
+
+def test_zero_counts_leave_the_tensor_unchanged():
+    x = _latents()
+    assert scramble_tensor(x, (0,0,0,0), seed=1) is x
+
+
+@pytest.mark.parametrize("dtype, atol", [ (torch.float64, 1e-10), (torch.float32, 1e-4) ], ids=["float64", "float32"])
+@pytest.mark.parametrize("counts", [ (-2,-2,-2,-2), (1,0,3,0) ])
+def test_single_kernel_resampling_matches_the_interpolated_fragments(counts, dtype, atol):
+    x, generator = _latents().to(dtype), torch.Generator().manual_seed(5)
+    anchors   = [ anchor for anchor, count in zip(('left','top','right','bottom'), counts) for _ in range(abs(count)) ]
+    fragments = [[ _random_fragment_rect(40, 56, generator, anchor=anchor) for anchor in anchors ]]
+    torch.testing.assert_close(_grid_sample_fragments(x, fragments),
+                               _interpolate_fragments(x, fragments, per_element=False), rtol=0, atol=atol)
+
+
+def test_per_element_scramble_matches_each_element_alone():
+    x      = _latents()
+    seeds  = [ 11, 12, 13 ]
+    counts = [ (-2,-2,-2,-2), (0,0,0,0), (1,0,3,0) ]
+    result = scramble_tensor(x, counts, seed=seeds)
+    for b in range(x.shape[0]):
+        expected = scramble_tensor(x[b:b+1], counts[b], seed=seeds[b])
+        torch.testing.assert_close(result[b:b+1], expected, rtol=0, atol=0)
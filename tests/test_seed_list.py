@@ -0,0 +1,57 @@
+"""
+File    : test_seed_list.py
+Purpose : Tests of the batches filled with one image per seed of a seed list.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import torch
+import pytest
+from stub_model import StubModel, generate, conditioning
+
+
+def _latent(batch_size: int = 1) -> dict:
+    return { "samples": torch.zeros(batch_size, 16, 12, 16) }
+
+
+def _assert_same_images(actual: torch.Tensor, expected: torch.Tensor) -> None:
+    torch.testing.assert_close(actual, expected, rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize("sampler", ["euler", "euler_ancestral"])
+def test_per_image_preproc_steps_match_each_seed_alone(core, sampler):
+    seeds, preproc_steps = [3, 4, 6, 7], [0, 1, 0, 1]
+    batch  = generate(core, _latent(), seed=seeds, stage2_preproc_steps=preproc_steps, samplers=(sampler,) * 3)
+    alone  = [ generate(core, _latent(), seed=seed, stage2_preproc_steps=steps, samplers=(sampler,) * 3)
+               for seed, steps in zip(seeds, preproc_steps) ]
+    _assert_same_images(batch["samples"], torch.cat([ image["samples"] for image in alone ]))
+
+
+def test_per_image_preproc_steps_are_split_into_micro_batches(core):
+    micro_batches = core._split_into_micro_batches(_latent(5), StubModel(), 0, per_image_seeds=True,
+                                                   row_groups=[1, 0, 1, 1, 0])
+    assert [ rows for _, rows in micro_batches ] == [ [0, 2, 3], [1, 4] ]
+    assert [ latent["batch_index"] for latent, _ in micro_batches ] == [ [0, 0, 0], [0, 0] ]
+
+
+@pytest.mark.parametrize("node_name", ["zsampler_turbo_2_simple", "zsampler_turbo_X21"])
+def test_turbo_creativity_follows_each_seed_of_the_list(core, node_name):
+    pytest.importorskip("comfy_api.latest")
+    import importlib
+    node   = importlib.import_module(f"zi_power_nodes.{node_name}")
+    node   = node.ZSamplerTurbo2Simple if node_name.endswith("simple") else node.ZSamplerTurboX21
+    inputs = dict(steps=9, ibias=0.0, turbo_creativity=True, alternative_refiner=False, old_scheduler=False)
+    inputs.update( dict(noise_injection=False) if node_name.endswith("simple") else
+                   dict(spectral_tilt="none", disable_ibias=False) )
+
+    def run(seed_list: str) -> torch.Tensor:
+        output = node.execute(_latent(), StubModel(), conditioning(), seed=0, seed_list=seed_list, **inputs)
+        return output.result[0]["samples"]
+
+    # seed 3 skips the coherence step of turbo creativity while seed 4 keeps it
+    _assert_same_images(run("3, 4"), torch.cat([ run("3"), run("4") ]))
@@ -0,0 +1,50 @@
+"""
+File    : test_sharding.py
+Purpose : Tests of the generation of a logical batch split into shards with `batch_offset`.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import torch
+import pytest
+from stub_model import generate
+
+
+def _latent(batch_size: int) -> dict:
+    return { "samples": torch.zeros(batch_size, 16, 12, 16) }
+
+
+def _assert_same_images(actual: torch.Tensor, expected: torch.Tensor) -> None:
+    torch.testing.assert_close(actual, expected, rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize("noise_generator", ["legacy", "philox"])
+@pytest.mark.parametrize("sampler"        , ["euler", "euler_ancestral", "dpmpp_sde"])
+def test_shards_concatenate_to_the_unsharded_batch(core, sampler, noise_generator):
+    options = dict(samplers=(sampler,) * 3, noise_generator=noise_generator)
+    whole   = generate(core, _latent(5), batch_offset=0, **options)
+    shards  = [ generate(core, _latent(size), batch_offset=offset, **options)
+                for offset, size in ((0, 2), (2, 2), (4, 1)) ]
+    _assert_same_images(torch.cat([ shard["samples"] for shard in shards ]), whole["samples"])
+
+
+@pytest.mark.parametrize("noise_generator", ["legacy", "philox"])
+def test_shards_with_deterministic_sampler_match_the_batch_without_offset(core, noise_generator):
+    whole  = generate(core, _latent(4), noise_generator=noise_generator)
+    shards = [ generate(core, _latent(2), batch_offset=offset, noise_generator=noise_generator) for offset in (0, 2) ]
+    _assert_same_images(torch.cat([ shard["samples"] for shard in shards ]), whole["samples"])
+
+
+def test_shards_of_a_seed_list_concatenate_to_the_whole_list(core):
+    seeds  = [5, 8, 5, 13]
+    whole  = generate(core, _latent(1), seed=seeds, samplers=("euler_ancestral",) * 3)
+    shards = [ generate(core, _latent(1), seed=seeds[start:start+2], batch_offset=start,
+                        samplers=("euler_ancestral",) * 3)
+               for start in (0, 2) ]
+    _assert_same_images(torch.cat([ shard["samples"] for shard in shards ]), whole["samples"])
+    _assert_same_images(whole["samples"][0], whole["samples"][2])
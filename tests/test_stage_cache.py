@@ -0,0 +1,65 @@
+"""
+File    : test_stage_cache.py
+Purpose : Tests of the stage-prefix cache that resumes generations from the latent of stage 2.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import torch
+import pytest
+from stub_model import StubModel, generate, conditioning
+from zi_power_nodes.core.sampling_profiler import PROFILE_LATENT_KEY
+
+# memory budget large enough for the latents of all the tests
+CACHE_MB = 64
+
+# changes that only affect the stage 3 (refiner)
+STAGE3_CHANGES = {
+    "positive_stg3": dict(positive_stg3=conditioning(0.4)),
+    "sampler3"     : dict(samplers=("euler", "euler", "euler_ancestral")),
+}
+
+
+def _latent() -> dict:
+    return { "samples": torch.zeros(2, 16, 12, 16) }
+
+
+def _sections(output: dict) -> dict[str, int]:
+    """Returns the model evaluations of each section of a profiled generation."""
+    return { record["name"]: record["evaluations"] for record in output[PROFILE_LATENT_KEY] }
+
+
+@pytest.mark.parametrize("change", STAGE3_CHANGES.values(), ids=STAGE3_CHANGES.keys())
+def test_resumed_generation_is_identical_to_the_uncached_generation(core, change):
+    model = StubModel()
+    generate(core, _latent(), model=model, stage_cache_mb=CACHE_MB)
+    evaluations = model.evaluations
+    resumed = generate(core, _latent(), model=model, stage_cache_mb=CACHE_MB, profile=True, **change)
+    resumed_evaluations = model.evaluations - evaluations
+
+    core._NOISE_FEATURES_CACHE.clear()
+    uncached_model = StubModel()
+    uncached = generate(core, _latent(), model=uncached_model, profile=True, **change)
+
+    # only the stage 3 is denoised again, the estimation and stages 1-2 are skipped
+    assert torch.equal(resumed["samples"], uncached["samples"])
+    assert list(_sections(resumed)) == ["stage3"]
+    assert resumed_evaluations == _sections(uncached)["stage3"] < uncached_model.evaluations
+
+
+def test_generation_changing_stage2_resumes_from_stage1(core):
+    model = StubModel()
+    generate(core, _latent(), model=model, stage_cache_mb=CACHE_MB)
+    changed = generate(core, _latent(), model=model, stage_cache_mb=CACHE_MB, profile=True,
+                       positive_stg2=conditioning(0.4))
+
+    core._NOISE_FEATURES_CACHE.clear()
+    uncached = generate(core, _latent(), profile=True, positive_stg2=conditioning(0.4))
+
+    assert torch.equal(changed["samples"], uncached["samples"])
+    assert "stage1" not in _sections(changed) and "stage2" in _sections(changed)
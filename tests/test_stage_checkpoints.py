@@ -0,0 +1,60 @@
+"""
+File    : test_stage_checkpoints.py
+Purpose : Tests of the generations resumed from the on-disk stage checkpoints.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import torch
+import pytest
+from stub_model import StubModel, StubModelFailure, generate
+from zi_power_nodes.core.metrics           import SAMPLER_GENERATIONS
+from zi_power_nodes.core.sampling_profiler import PROFILE_LATENT_KEY
+
+
+def _latent() -> dict:
+    return { "samples": torch.zeros(2, 16, 12, 16) }
+
+
+def _sections(output: dict) -> dict[str, int]:
+    """Returns the model evaluations of each section of a profiled generation."""
+    return { record["name"]: record["evaluations"] for record in output[PROFILE_LATENT_KEY] }
+
+
+def _completed_generations() -> float:
+    return dict( (labels["outcome"], value) for _, labels, value in SAMPLER_GENERATIONS.samples() ).get("completed", 0)
+
+
+def test_generation_stopped_after_stage1_resumes_from_its_checkpoint(core, tmp_path):
+    full_model = StubModel()
+    full       = generate(core, _latent(), model=full_model, profile=True)
+    sections   = _sections(full)
+    stage1_evaluations = sections["estimation"] + sections["stage1"]
+
+    # the first evaluation of stage 2 fails, leaving only the checkpoint of stage 1
+    with pytest.raises(StubModelFailure):
+        generate(core, _latent(), model=StubModel(fail_after=stage1_evaluations), checkpoint_dir=str(tmp_path))
+    core._NOISE_FEATURES_CACHE.clear()
+
+    resumed_model = StubModel()
+    resumed = generate(core, _latent(), model=resumed_model, checkpoint_dir=str(tmp_path))
+    torch.testing.assert_close(resumed["samples"], full["samples"], rtol=0, atol=1e-6)
+    assert resumed_model.evaluations == full_model.evaluations - stage1_evaluations
+
+
+def test_generation_with_final_checkpoint_is_restored_with_bookkeeping(core, tmp_path):
+    first = generate(core, _latent(), checkpoint_dir=str(tmp_path))
+
+    restored_model = StubModel()
+    completed      = _completed_generations()
+    restored = generate(core, _latent(), model=restored_model, checkpoint_dir=str(tmp_path), profile=True)
+
+    torch.testing.assert_close(restored["samples"], first["samples"], rtol=0, atol=0)
+    assert restored_model.evaluations == 0
+    assert list(_sections(restored)) == ["restore"]
+    assert _completed_generations() == completed + 1
@@ -0,0 +1,101 @@
+"""
+File    : test_tensor_cache.py
+Purpose : Tests of the bounded LRU cache of tensors.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import torch
+from zi_power_nodes.core.tensor_cache import TensorCache
+
+# size in bytes of the tensors returned by `_tensor(..)`
+TENSOR_BYTES = 16 * 4
+
+
+def _tensor(value: float) -> torch.Tensor:
+    return torch.full((16,), value, dtype=torch.float32)
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = TensorCache("test", max_entries=2)
+    cache.put("a", _tensor(1))
+    cache.put("b", _tensor(2))
+    assert cache.get("a") is not None    #< "a" becomes the most recently used
+    cache.put("c", _tensor(3))
+
+    assert cache.get("b") is None
+    assert torch.equal(cache.get("a"), _tensor(1))
+    assert torch.equal(cache.get("c"), _tensor(3))
+    assert len(cache) == 2 and cache.evictions == 1
+
+
+def test_entries_are_evicted_to_stay_within_max_bytes():
+    cache = TensorCache("test", max_bytes=3 * TENSOR_BYTES)
+    for index in range(4):
+        cache.put(index, _tensor(index))
+
+    assert cache.get(0) is None
+    assert [ key for key in range(4) if cache.get(key) is not None ] == [1, 2, 3]
+    assert cache.nbytes == 3 * TENSOR_BYTES and cache.evictions == 1
+
+
+def test_tuples_count_the_bytes_of_all_their_tensors():
+    cache = TensorCache("test", max_bytes=3 * TENSOR_BYTES)
+    cache.put("pair", (_tensor(1), _tensor(2)))
+    cache.put("single", _tensor(3))
+    assert cache.nbytes == 3 * TENSOR_BYTES
+
+    cache.put("another", _tensor(4))
+    assert cache.get("pair") is None and cache.nbytes == 2 * TENSOR_BYTES
+
+
+def test_values_larger_than_max_bytes_are_not_stored():
+    cache = TensorCache("test", max_bytes=TENSOR_BYTES)
+    cache.put("small", _tensor(1))
+    cache.put("large", torch.zeros(32))
+
+    assert cache.get("large") is None
+    assert torch.equal(cache.get("small"), _tensor(1))
+    assert cache.evictions == 0
+
+
+def test_replacing_an_entry_updates_its_size():
+    cache = TensorCache("test")
+    cache.put("a", _tensor(1))
+    cache.put("a", torch.zeros(4))
+    assert len(cache) == 1 and cache.nbytes == 4 * 4
+
+
+def test_lower_limits_evict_the_oldest_entries():
+    cache = TensorCache("test")
+    for index in range(4):
+        cache.put(index, _tensor(index))
+    cache.set_limits(max_entries=1)
+    assert len(cache) == 1 and cache.get(3) is not None and cache.evictions == 3
+
+
+def test_hits_and_misses_are_counted():
+    cache = TensorCache("test")
+    cache.put("a", _tensor(1))
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    cache.get(None)    #< a key that could not be built is always a miss
+
+    assert cache.stats() == { "entries": 1, "bytes": TENSOR_BYTES, "hits": 2, "misses": 2, "evictions": 0 }
+    cache.clear()
+    assert cache.stats() == { "entries": 0, "bytes": 0, "hits": 2, "misses": 2, "evictions": 0 }
+
+
+def test_stored_and_returned_values_are_copies():
+    cache  = TensorCache("test")
+    tensor = _tensor(1)
+    cache.put("a", tensor)
+    tensor.fill_(5)
+    cache.get("a").fill_(7)
+    assert torch.equal(cache.get("a"), _tensor(1))
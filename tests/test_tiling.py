@@ -0,0 +1,89 @@
+"""
+File    : test_tiling.py
+Purpose : Tests of the tiled evaluation of the model (TiledSampler and its tile layout).
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import torch
+import pytest
+from comfy.samplers import ksampler
+from zi_power_nodes.core.zsampler_turbo_corehelp import TiledSampler, _TiledDenoiser, tile_layout, _tile_spans
+
+# (size, tile, overlap), most of them with a size that is not a multiple of the tile
+SPANS_CASES = [ (100, 32, 8), (37, 16, 4), (65, 32, 8), (130, 48, 16), (33, 32, 40), (64, 64, 8), (20, 32, 8) ]
+
+
+class _PointwiseDenoiser:
+    """Denoiser whose prediction for each pixel depends only on that pixel."""
+    def __init__(self):
+        self.inner_model    = self
+        self.model_sampling = self
+        self.sigma_max      = 1.0
+        self.calls          = 0
+
+    def noise_scaling(self, sigma, noise, latent_image, max_denoise=False):
+        return sigma * noise + (1.0 - sigma) * latent_image
+
+    def inverse_noise_scaling(self, sigma, latent):
+        return latent
+
+    def __call__(self, x, sigma, **kwargs):
+        self.calls += 1
+        return torch.tanh(x) * 0.8
+
+
+@pytest.mark.parametrize("size, tile, overlap", SPANS_CASES)
+def test_tile_spans_cover_the_whole_size(size, tile, overlap):
+    spans = _tile_spans(size, tile, overlap)
+    if size <= tile:
+        assert spans == [ (0, size) ]
+        return
+
+    min_overlap = min(max(overlap, 2), tile - 2)
+    assert spans[0][0] == 0 and spans[-1][1] == size
+    assert all( end - start == tile for start, end in spans )
+    assert all( start % 2 == 0 for start, _ in spans[:-1] )
+    for (start, end), (next_start, next_end) in zip(spans, spans[1:]):
+        assert start < next_start and end < next_end
+        assert end - next_start >= min_overlap
+
+
+@pytest.mark.parametrize("size, tile_size", [ ((37, 45), (16, 16)), ((64, 100), (32, 48)), ((20, 33), (16, 32)) ])
+def test_tile_weights_sum_to_one_at_every_pixel(size, tile_size):
+    coverage = torch.zeros(size)
+    for rows, cols, weight in tile_layout(size, tile_size, 6):
+        assert weight.shape == (1, 1, rows.stop - rows.start, cols.stop - cols.start)
+        assert (weight > 0).all()
+        coverage[rows, cols] += weight[0, 0]
+    torch.testing.assert_close(coverage, torch.ones(size), rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize("size, tile_size", [ ((37, 45), (16, 16)), ((50, 30), (24, 24)) ])
+def test_feathered_tiles_of_identity_denoiser_reproduce_the_input(size, tile_size):
+    x     = torch.randn(2, 4, *size, generator=torch.manual_seed(0))
+    tiles = tile_layout(size, tile_size, 8)
+    calls = []
+    identity = lambda x, sigma: calls.append(x.shape) or x
+
+    output = _TiledDenoiser(identity, tiles)(x, torch.ones(2))
+    assert len(calls) == len(tiles) > 1
+    torch.testing.assert_close(output, x, rtol=0, atol=1e-6)
+
+
+def test_tiled_sampler_matches_untiled_sampler_for_a_pointwise_denoiser():
+    noise  = torch.randn(1, 4, 36, 44, generator=torch.manual_seed(1))
+    latent = torch.zeros_like(noise)
+    sigmas = torch.tensor([1.0, 0.75, 0.5, 0.25, 0.0])
+
+    untiled_denoiser, tiled_denoiser = _PointwiseDenoiser(), _PointwiseDenoiser()
+    untiled = ksampler("euler").sample(untiled_denoiser, sigmas, {}, None, noise, latent)
+    tiled   = TiledSampler(ksampler("euler"), (16, 16), 8).sample(tiled_denoiser, sigmas, {}, None, noise, latent)
+
+    torch.testing.assert_close(tiled, untiled, rtol=0, atol=1e-5)
+    assert tiled_denoiser.calls == untiled_denoiser.calls * len(tile_layout((36, 44), (16, 16), 8))
@@ -0,0 +1,53 @@
+"""
+File    : test_variations.py
+Purpose : Tests of the stage 3 variations that share the first two stages of a generation.
+Author  : Martin Rizzo | <martinrizzo@gmail.com>
+Date    : Oct 17, 2026
+Repo    : https://github.com/martin-rizzo/ComfyUI-ZImagePowerNodes
+License : MIT
+- - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+                          ComfyUI-ZImagePowerNodes
+         ComfyUI nodes designed specifically for the "Z-Image" model.
+_ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _ _
+"""
+import torch
+import pytest
+from stub_model import StubModel, generate
+
+
+def _latent(batch_size: int = 1) -> dict:
+    latent = { "samples": torch.zeros(batch_size, 16, 12, 16) }
+    # the variations of a batch key the noise of stochastic samplers by sub-seed,
+    # so the separate generations need a batch index to draw the same noise
+    if batch_size > 1:
+        latent["batch_index"] = list(range(batch_size))
+    return latent
+
+
+def _assert_same_images(actual: torch.Tensor, expected: torch.Tensor) -> None:
+    torch.testing.assert_close(actual, expected, rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize("batch_size", [1, 2])
+def test_each_variation_is_identical_to_its_separate_generation(core, batch_size):
+    variations = [ core.Stage3Variation(), core.Stage3Variation(sampler="dpmpp_sde") ]
+    fanned_out = generate(core, _latent(batch_size), stage3_variations=variations)["samples"]
+
+    default_refiner     = generate(core, _latent(batch_size))["samples"]
+    alternative_refiner = generate(core, _latent(batch_size), samplers=("euler", "euler", "dpmpp_sde"))["samples"]
+
+    # the variations of each image are contiguous in the batch
+    assert fanned_out.shape[0] == batch_size * len(variations)
+    _assert_same_images(fanned_out[0::2], default_refiner    )
+    _assert_same_images(fanned_out[1::2], alternative_refiner)
+
+
+def test_variations_denoise_the_first_two_stages_once(core):
+    variations = [ core.Stage3Variation(), core.Stage3Variation(sampler="dpmpp_sde") ]
+    fanned_out_model, separate_model = StubModel(), StubModel()
+    generate(core, _latent(), model=fanned_out_model, stage3_variations=variations)
+    core._NOISE_FEATURES_CACHE.clear()
+    generate(core, _latent(), model=separate_model)
+    generate(core, _latent(), model=separate_model, samplers=("euler", "euler", "dpmpp_sde"))
+
+    assert fanned_out_model.evaluations < separate_model.evaluations